@@ -1,22 +1,68 @@
+class CameraError(Exception):
+    def __init__(self, msg):
+        super(CameraError, self).__init__(msg)
+        self.msg = msg
+
 
 class BaseCamera(object):
+    """Base class for cameras
+
+    Taking a picture is split in three steps so they can overlap between
+    frames: trigger() starts an exposure, wait_for_exposure() returns once
+    the shutter closed and download_image() transfers the picture.
+    """
 
     _mirror_delay = 0;
+    _exposure = 1.0
+    file_extension = '.jpg'
 
     def __init__(self):
         pass
 
+    def trigger(self):
+        """Starts an exposure
+
+        :return handle identifying the exposure
+        """
+        raise NotImplementedError
+
+    def wait_for_exposure(self, handle):
+        """Waits until the exposure started by trigger() is finished
+
+        :param handle: handle returned by trigger()
+        :return reference to the picture, to be passed to download_image()
+        """
+        raise NotImplementedError
+
     def capture_image(self):
-        pass
+        """Takes a picture
+
+        :return reference to the picture, to be passed to download_image()
+        """
+        return self.wait_for_exposure(self.trigger())
 
     def reset(self):
         pass
 
-    def download_image(self):
-        pass
+    def download_image(self, image):
+        """Transfers a picture from the camera
 
-    def set_exposure(self):
-        pass
+        :param image: reference returned by wait_for_exposure()
+        :return content of the picture file as bytes
+        """
+        raise NotImplementedError
+
+    def image_extension(self, image):
+        """File name extension of the picture referenced by image"""
+        return self.file_extension
+
+    @property
+    def exposure(self):
+        """Exposure time in seconds, see set_exposure()"""
+        return self._exposure
+
+    def set_exposure(self, seconds):
+        self._exposure = seconds
 
     def set_trigger_delay(self, delay):
         self._mirror_delay = delay
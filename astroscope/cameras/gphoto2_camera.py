@@ -0,0 +1,133 @@
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+
+from astroscope.cameras.cameras import BaseCamera
+from astroscope.cameras.cameras import CameraError
+
+_FILE_ADDED = re.compile(r'FILEADDED\s+(\S+)\s+(\S+)')
+
+
+class GPhoto2Camera(BaseCamera):
+    """Camera driven through the gphoto2 command line tool
+
+    Pictures are stored on the camera's card and downloaded separately,
+    so the previous picture can be downloaded while the next one is being
+    exposed. gphoto2 invocations are serialized since only one process
+    can talk to the camera at a time, but no invocation is running while
+    the shutter is open.
+    """
+
+    def __init__(self, gphoto2='gphoto2', port=None, timeout=60.0):
+        """
+        :param gphoto2: gphoto2 executable
+        :param port: camera port, as listed by gphoto2 --auto-detect. Default
+                     is the first camera found.
+        :param timeout: longest time in seconds to wait for a picture to be
+                        written to the card once the exposure ended
+        """
+        super(GPhoto2Camera, self).__init__()
+        self.gphoto2 = gphoto2
+        self.port = port
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+    def run(self, *args, **kwargs):
+        """Runs gphoto2 with args and returns its output
+
+        Accepts a timeout keyword argument, in seconds.
+        """
+        command = [self.gphoto2]
+        if self.port:
+            command += ['--port', self.port]
+        command += list(args)
+        with self._lock:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                       stderr=subprocess.STDOUT)
+            try:
+                output = process.communicate(timeout=kwargs.get('timeout'))[0]
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                raise CameraError('{} timed out'.format(' '.join(command)))
+            output = output.decode('utf-8', 'replace')
+        if process.returncode != 0:
+            raise CameraError('{} failed: {}'.format(' '.join(command),
+                                                     output.strip()))
+        return output
+
+    @staticmethod
+    def _shutterspeed(seconds):
+        if seconds >= 1.0:
+            return '%g' % seconds
+        return '1/%d' % round(1.0 / seconds)
+
+    def set_exposure(self, seconds):
+        super(GPhoto2Camera, self).set_exposure(seconds)
+        self.run('--set-config-value',
+                 'shutterspeed=' + self._shutterspeed(seconds))
+
+    def reset(self):
+        self.run('--reset')
+
+    def trigger(self):
+        self.run('--set-config', 'capturetarget=1', '--trigger-capture')
+        return time.monotonic()
+
+    def wait_for_exposure(self, handle):
+        """Waits for the picture started at handle to reach the card
+
+        :return (folder, filename) of the picture on the camera
+        """
+        remaining = handle + self._mirror_delay + self._exposure - \
+                    time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+        return self.wait_for_image()
+
+    def wait_for_image(self):
+        """Waits for the camera to write a picture to its card
+
+        :return (folder, filename) of the picture on the camera
+        """
+        output = self.run('--wait-event=FILEADDED', timeout=self.timeout)
+        match = _FILE_ADDED.search(output)
+        if match is None:
+            raise CameraError('no picture was written to the camera card')
+        return match.group(2), match.group(1)
+
+    def set_bulb(self):
+        """Puts the camera in bulb mode, storing pictures on its card"""
+        self.run('--set-config', 'capturetarget=1',
+                 '--set-config', 'autoexposuremode=Bulb')
+
+    # eosremoterelease values: 0 None, 2 Press Full, 4 Release Full
+    def mirror_up(self):
+        """Flips the mirror up. Requires mirror lock enabled on the camera"""
+        self.run('--set-config', 'eosremoterelease=2',
+                 '--set-config', 'eosremoterelease=4')
+
+    def open_shutter(self):
+        self.run('--set-config', 'eosremoterelease=2')
+
+    def close_shutter(self):
+        self.run('--set-config', 'eosremoterelease=4',
+                 '--set-config', 'eosremoterelease=0')
+
+    def image_extension(self, image):
+        return os.path.splitext(image[1])[1].lower() or self.file_extension
+
+    def download_image(self, image):
+        folder, filename = image
+        fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(filename)[1])
+        os.close(fd)
+        try:
+            self.run('--folder', folder, '--get-file', filename,
+                     '--filename', tmp_path, '--force-overwrite')
+            with open(tmp_path, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(tmp_path)
@@ -0,0 +1,193 @@
+import os
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class Frame(object):
+    """A frame going through a CapturePipeline
+
+    The timestamps are time.monotonic() values taken as the frame leaves
+    each stage.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.filename = None
+        self.image = None
+        self.triggered = None
+        self.exposed = None
+        self.downloaded = None
+        self.written = None
+
+    def __repr__(self):
+        return 'Frame({}, {!r})'.format(self.index, self.filename)
+
+
+class CapturePipeline(object):
+    """Takes a series of pictures with overlapping stages
+
+    Triggering, exposure, download and writing to disk each run in their
+    own thread, connected by bounded queues. The next exposure is started
+    as soon as the shutter closed, so frame N is downloaded and written
+    while frame N+1 is being exposed and the cadence is set by the
+    exposure time instead of the download time.
+
+    Written frames are recorded to observing_log when it is set, tagged
+    with observing_target.
+    """
+
+    # ObservingLog the written frames are recorded to
+    observing_log = None
+    observing_target = None
+
+    def __init__(self, camera, output_directory,
+                 filename_format='frame_{:04d}', queue_size=2,
+                 frame_consumers=()):
+        """
+        :param camera: BaseCamera taking the pictures
+        :param output_directory: directory the pictures are written to
+        :param filename_format: format of the picture file names, without
+                                extension. Gets the frame index.
+        :param queue_size: frames waiting between two stages before the
+                           earlier stage blocks
+        :param frame_consumers: callables called with (frame, data) once a
+                                frame is written, in the writing thread
+        """
+        self.camera = camera
+        self.output_directory = output_directory
+        self.filename_format = filename_format
+        self.queue_size = queue_size
+        self.frame_consumers = list(frame_consumers)
+        self.frames = []
+        self._threads = []
+        self._error = None
+        self._stop = threading.Event()
+
+    def _fail(self, error):
+        if self._error is None:
+            self._error = error
+        self._stop.set()
+
+    def _trigger_stage(self, count, shutter_free, exposing):
+        try:
+            for index in range(count):
+                shutter_free.acquire()
+                if self._stop.is_set():
+                    break
+                frame = Frame(index)
+                handle = self.camera.trigger()
+                frame.triggered = time.monotonic()
+                self.frames.append(frame)
+                exposing.put((frame, handle))
+        except Exception as e:
+            self._fail(e)
+        exposing.put(_DONE)
+
+    def _exposure_stage(self, shutter_free, exposing, downloading):
+        while True:
+            item = exposing.get()
+            if item is _DONE:
+                break
+            frame, handle = item
+            try:
+                if not self._stop.is_set():
+                    frame.image = self.camera.wait_for_exposure(handle)
+                    frame.exposed = time.monotonic()
+                    downloading.put(frame)
+            except Exception as e:
+                self._fail(e)
+            finally:
+                shutter_free.release()
+        downloading.put(_DONE)
+
+    def _download_stage(self, downloading, writing):
+        while True:
+            frame = downloading.get()
+            if frame is _DONE:
+                break
+            try:
+                if not self._stop.is_set():
+                    data = self.camera.download_image(frame.image)
+                    frame.downloaded = time.monotonic()
+                    writing.put((frame, data))
+            except Exception as e:
+                self._fail(e)
+        writing.put(_DONE)
+
+    def _write_stage(self, writing):
+        while True:
+            item = writing.get()
+            if item is _DONE:
+                break
+            frame, data = item
+            try:
+                if self._stop.is_set():
+                    continue
+                filename = os.path.join(
+                    self.output_directory,
+                    self.filename_format.format(frame.index) +
+                    self.camera.image_extension(frame.image))
+                tmp_filename = filename + '.part'
+                with open(tmp_filename, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_filename, filename)
+                frame.filename = filename
+                frame.written = time.monotonic()
+                if self.observing_log is not None:
+                    self.observing_log.log_frame(
+                        filename, self.camera.exposure,
+                        target=self.observing_target)
+                for consumer in self.frame_consumers:
+                    consumer(frame, data)
+            except Exception as e:
+                self._fail(e)
+
+    def start(self, count):
+        """Starts taking count pictures in the background"""
+        if not os.path.isdir(self.output_directory):
+            os.makedirs(self.output_directory)
+        self.frames = []
+        self._error = None
+        self._stop.clear()
+        shutter_free = threading.Semaphore(1)
+        exposing = queue.Queue(1)
+        downloading = queue.Queue(self.queue_size)
+        writing = queue.Queue(self.queue_size)
+        self._threads = [
+            threading.Thread(target=self._trigger_stage,
+                             args=(count, shutter_free, exposing)),
+            threading.Thread(target=self._exposure_stage,
+                             args=(shutter_free, exposing, downloading)),
+            threading.Thread(target=self._download_stage,
+                             args=(downloading, writing)),
+            threading.Thread(target=self._write_stage, args=(writing,))]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def stop(self):
+        """Stops after the exposure in progress, dropping pending frames"""
+        self._stop.set()
+
+    def join(self):
+        """Waits for the pipeline to finish
+
+        :return list of the frames written
+        :raises the first error raised by any stage
+        """
+        for thread in self._threads:
+            thread.join()
+        if self._error is not None:
+            raise self._error
+        return [frame for frame in self.frames if frame.written is not None]
+
+    def run(self, count):
+        """Takes count pictures and waits until they are written
+
+        :return list of the frames written
+        """
+        self.start(count)
+        return self.join()
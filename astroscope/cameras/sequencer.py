@@ -0,0 +1,184 @@
+import collections
+import time
+
+TimingEvent = collections.namedtuple('TimingEvent',
+                                     'frame name planned actual')
+
+
+def sleep_until(deadline, spin=0.002):
+    """Sleeps until time.monotonic() reaches deadline
+
+    Sleeps coarsely and busy waits the last spin seconds, since sleep()
+    alone can overshoot by a scheduler tick.
+
+    :return time.monotonic() when the deadline was reached
+    """
+    while True:
+        now = time.monotonic()
+        remaining = deadline - now
+        if remaining <= 0:
+            return now
+        if remaining > spin:
+            time.sleep(remaining - spin)
+
+
+class ExposureSequencer(object):
+    """Runs mirror lock bulb exposures against a monotonic clock
+
+    Every step of an exposure (mirror up, shutter open, shutter close) is
+    scheduled relative to the start of the exposure, instead of chaining
+    sleeps, so delays do not accumulate. The planned and actual time of
+    every step is recorded in events for timing error telemetry.
+
+    The camera must implement mirror_up(), open_shutter(), close_shutter()
+    and wait_for_image(), as GPhoto2Camera and FakeCamera do.
+
+    Downloaded frames are recorded to observing_log when it is set, with
+    the filename consumer returns. Without a consumer returning a filename
+    the frames have no file.
+    """
+
+    # ObservingLog the downloaded frames are recorded to
+    observing_log = None
+    observing_target = None
+
+    def __init__(self, camera, exposure, mirror_delay=None,
+                 clock=time.monotonic, sleep_until=sleep_until,
+                 consumer=None):
+        """
+        :param camera: camera taking the pictures
+        :param exposure: seconds the shutter stays open
+        :param mirror_delay: seconds between mirror up and opening the
+                             shutter. Default is the camera's trigger delay.
+        :param clock: monotonic clock returning seconds
+        :param sleep_until: function sleeping until clock reaches its
+                            argument, returning the clock reading
+        :param consumer: called with (frame, data) for every downloaded
+                         picture. It may return the filename the picture
+                         was saved to.
+        """
+        self.camera = camera
+        self.exposure = exposure
+        if mirror_delay is None:
+            mirror_delay = camera._mirror_delay
+        self.mirror_delay = mirror_delay
+        self.clock = clock
+        self.sleep_until = sleep_until
+        self.consumer = consumer
+        self.events = []
+
+    def _step(self, frame, name, planned, action):
+        """Runs action at planned
+
+        :return clock time at which action returned, which is what the
+                event records, so the latency of the camera commands shows
+                in the timing errors
+        """
+        self.sleep_until(planned)
+        action()
+        actual = self.clock()
+        self.events.append(TimingEvent(frame, name, planned, actual))
+        return actual
+
+    def expose(self, frame=0, start=None):
+        """Takes one exposure
+
+        :param frame: number of the frame, used in the recorded events
+        :param start: clock time at which the mirror goes up. Default now.
+        :return reference to the picture, to be passed to download_image()
+        """
+        if start is None:
+            start = self.clock()
+        if self.mirror_delay:
+            self._step(frame, 'mirror_up', start, self.camera.mirror_up)
+        opened = self._step(frame, 'shutter_open', start + self.mirror_delay,
+                            self.camera.open_shutter)
+        # the shutter close is scheduled from when open_shutter returned,
+        # so the exposure time is right even if opening was late or slow
+        self._step(frame, 'shutter_close', opened + self.exposure,
+                   self.camera.close_shutter)
+        return self.camera.wait_for_image()
+
+    def wait_for_mount(self, telescope, poll_interval=0.2, timeout=None):
+        """Waits until the mount reports no goto in progress
+
+        :return clock time at which the mount was found idle
+        :raises RuntimeError if the goto did not finish within timeout
+        """
+        started = self.clock()
+        while telescope.goto_in_progress():
+            if timeout is not None and self.clock() - started > timeout:
+                raise RuntimeError('goto did not finish in {}s'.format(
+                    timeout))
+            time.sleep(poll_interval)
+        return self.clock()
+
+    def run(self, count, telescope=None, download=True, interval=0.0):
+        """Takes count exposures
+
+        :param count: number of exposures
+        :param telescope: if given, every exposure starts as soon as this
+                          telescope reports its goto finished
+        :param download: download every picture after its exposure
+        :param interval: seconds between the start of two exposures. 0 starts
+                         the next exposure as soon as the previous finished.
+        :return list of the downloaded pictures, or of the references to
+                them if download is False
+        """
+        images = []
+        start = None
+        for frame in range(count):
+            if telescope is not None:
+                start = self.wait_for_mount(telescope)
+            elif start is None or not interval:
+                start = self.clock()
+            image = self.expose(frame, start)
+            if download:
+                planned = self.clock()
+                image = self.camera.download_image(image)
+                self.events.append(TimingEvent(frame, 'downloaded', planned,
+                                               self.clock()))
+                filename = None
+                if self.consumer is not None:
+                    filename = self.consumer(frame, image)
+                if self.observing_log is not None:
+                    self.observing_log.log_frame(
+                        filename, self.exposure,
+                        target=self.observing_target)
+            images.append(image)
+            if interval:
+                start += interval
+        return images
+
+    def timing_errors(self, name=None):
+        """Returns the timing errors in seconds of the recorded steps
+
+        :param name: only consider steps with this name
+        """
+        return [event.actual - event.planned for event in self.events
+                if event.name != 'downloaded' and
+                (name is None or event.name == name)]
+
+    def statistics(self):
+        """Summary of the timing errors, per step name
+
+        :return dictionary of name -> dict(count, mean, max) in seconds
+        """
+        summary = {}
+        names = set(event.name for event in self.events) - {'downloaded'}
+        for name in names:
+            errors = self.timing_errors(name)
+            summary[name] = dict(count=len(errors),
+                                 mean=sum(errors) / len(errors),
+                                 max=max(errors))
+        exposures = [close.actual - opened.actual
+                     for opened, close in zip(
+                         [e for e in self.events if e.name == 'shutter_open'],
+                         [e for e in self.events
+                          if e.name == 'shutter_close'])]
+        if exposures:
+            summary['exposure'] = dict(
+                count=len(exposures),
+                mean=sum(exposures) / len(exposures) - self.exposure,
+                max=max(abs(e - self.exposure) for e in exposures))
+        return summary
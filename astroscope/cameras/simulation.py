@@ -0,0 +1,98 @@
+import io
+import threading
+import time
+
+import numpy as np
+
+from astroscope.cameras.cameras import BaseCamera
+
+
+class FakeCamera(BaseCamera):
+    """Camera producing synthetic star fields with simulated timing
+
+    Exposures take the configured exposure time (plus the mirror delay)
+    and downloads take download_time, so pipelines can be exercised without
+    hardware. Pictures are numpy arrays saved in .npy format.
+    """
+
+    file_extension = '.npy'
+
+    def __init__(self, shape=(64, 64), download_time=0.0, stars=None,
+                 background=100.0, noise=5.0, seed=None):
+        """
+        :param shape: (height, width) of the pictures in pixels
+        :param download_time: seconds a download takes
+        :param stars: list of (x, y, flux) of the stars in the pictures.
+                      Default is a few random stars.
+        :param background: mean sky level of the pictures
+        :param noise: standard deviation of the pixel noise
+        :param seed: seed of the random number generator
+        """
+        super(FakeCamera, self).__init__()
+        self.shape = shape
+        self.download_time = download_time
+        self.background = background
+        self.noise = noise
+        self._random = np.random.RandomState(seed)
+        if stars is None:
+            stars = [(self._random.uniform(5, shape[1] - 5),
+                      self._random.uniform(5, shape[0] - 5),
+                      self._random.uniform(500.0, 5000.0))
+                     for _ in range(5)]
+        self.stars = list(stars)
+        # offset of the field in pixels, moved by tests to simulate drift
+        self.offset = (0.0, 0.0)
+        self._lock = threading.Lock()
+        self._count = 0
+        self.triggered = []
+        self.mirror_ups = 0
+
+    def trigger(self):
+        with self._lock:
+            self._count += 1
+            handle = (self._count, time.monotonic())
+        self.triggered.append(handle[1])
+        return handle
+
+    def wait_for_exposure(self, handle):
+        remaining = handle[1] + self._mirror_delay + self._exposure - \
+                    time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+        return handle[0], self.render()
+
+    def mirror_up(self):
+        self.mirror_ups += 1
+
+    def open_shutter(self):
+        self._opened = time.monotonic()
+        self.triggered.append(self._opened)
+
+    def close_shutter(self):
+        self.last_exposure = time.monotonic() - self._opened
+
+    def wait_for_image(self):
+        with self._lock:
+            self._count += 1
+            count = self._count
+        return count, self.render()
+
+    def render(self, sigma=1.5):
+        """Returns a synthetic picture of the star field"""
+        with self._lock:
+            image = self._random.normal(self.background, self.noise,
+                                        self.shape)
+        y, x = np.indices(self.shape)
+        for star_x, star_y, flux in self.stars:
+            star_x += self.offset[0]
+            star_y += self.offset[1]
+            image += flux / (2 * np.pi * sigma ** 2) * np.exp(
+                -((x - star_x) ** 2 + (y - star_y) ** 2) / (2 * sigma ** 2))
+        return image.astype(np.float32)
+
+    def download_image(self, image):
+        if self.download_time:
+            time.sleep(self.download_time)
+        output = io.BytesIO()
+        np.save(output, image[1])
+        return output.getvalue()
@@ -0,0 +1,136 @@
+import io
+import json
+import os
+import threading
+
+import numpy as np
+
+
+def load_npy(data):
+    """Decodes a picture saved in .npy format, as FakeCamera produces"""
+    return np.load(io.BytesIO(data))
+
+
+class StreamingStacker(object):
+    """Stacks frames one at a time into memory mapped accumulators
+
+    Per pixel count, mean and sum of squared deviations are updated with
+    Welford's algorithm, so the stack can be previewed at any time and
+    memory use does not depend on the number of frames. Once warmup frames
+    are stacked, pixels further than sigma standard deviations from the
+    running mean (satellite trails, hot pixels, cosmic rays) are rejected.
+    Frames are processed in blocks of rows to bound temporary memory.
+    """
+
+    _FILES = ('count', 'mean', 'm2')
+
+    def __init__(self, directory, shape, sigma=3.0, warmup=5,
+                 block_rows=256, resume=False):
+        """
+        :param directory: directory holding the accumulators
+        :param shape: shape of the frames
+        :param sigma: rejection threshold in standard deviations. None
+                      disables rejection.
+        :param warmup: frames stacked before rejection starts
+        :param block_rows: rows processed at once
+        :param resume: continue the stack found in directory
+        """
+        self.directory = directory
+        self.shape = tuple(shape)
+        self.sigma = sigma
+        self.warmup = warmup
+        self.block_rows = block_rows
+        self.frames = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        meta_filename = os.path.join(directory, 'stack.json')
+        mode = 'w+'
+        if resume and os.path.exists(meta_filename):
+            with open(meta_filename) as f:
+                meta = json.load(f)
+            if tuple(meta['shape']) != self.shape:
+                raise ValueError('stack in {} has shape {}'.format(
+                    directory, meta['shape']))
+            self.frames = meta['frames']
+            self.rejected = meta['rejected']
+            mode = 'r+'
+        self._count, self._mean, self._m2 = (
+            np.memmap(os.path.join(directory, name + '.dat'),
+                      dtype=np.float64, mode=mode, shape=self.shape)
+            for name in self._FILES)
+
+    def add(self, frame):
+        """Adds a frame to the stack"""
+        frame = np.asarray(frame)
+        if frame.shape != self.shape:
+            raise ValueError('frame has shape {}, stack has {}'.format(
+                frame.shape, self.shape))
+        with self._lock:
+            clip = self.sigma is not None and self.frames >= self.warmup
+            for start in range(0, self.shape[0], self.block_rows):
+                rows = slice(start, start + self.block_rows)
+                self._add_block(frame[rows].astype(np.float64),
+                                self._count[rows], self._mean[rows],
+                                self._m2[rows], clip)
+            self.frames += 1
+
+    def _add_block(self, x, count, mean, m2, clip):
+        delta = x - mean
+        if clip:
+            variance = m2 / np.maximum(count - 1, 1)
+            # per pixel variances from few frames are noisy. Flooring them
+            # at the typical variance of the block keeps underestimated
+            # pixels from rejecting good values.
+            variance = np.maximum(variance, np.median(variance))
+            accept = delta ** 2 <= self.sigma ** 2 * variance
+            accept |= variance == 0
+            self.rejected += int(accept.size - np.count_nonzero(accept))
+        else:
+            accept = np.ones(x.shape, dtype=bool)
+        count += accept
+        mean += np.where(accept, delta / np.maximum(count, 1), 0.0)
+        m2 += np.where(accept, delta * (x - mean), 0.0)
+
+    @property
+    def mean(self):
+        """Stacked picture, the memory mapped per pixel mean"""
+        return self._mean
+
+    def std(self):
+        """Per pixel standard deviation of the accepted values"""
+        with self._lock:
+            return np.sqrt(self._m2 / np.maximum(self._count - 1, 1))
+
+    def preview(self, low=0.5, high=99.5):
+        """Returns the stack stretched to 8 bits for display
+
+        :param low: percentile shown black
+        :param high: percentile shown white
+        """
+        with self._lock:
+            mean = np.array(self._mean)
+        black, white = np.percentile(mean, (low, high))
+        scaled = (mean - black) / max(white - black, 1e-12)
+        return (np.clip(scaled, 0.0, 1.0) * 255).astype(np.uint8)
+
+    def frame_consumer(self, decoder=load_npy):
+        """Returns a callable stacking the frames of a CapturePipeline
+
+        :param decoder: converts the downloaded bytes into an array
+        """
+        return lambda frame, data: self.add(decoder(data))
+
+    def flush(self):
+        """Writes the accumulators and the stack state to disk"""
+        with self._lock:
+            for array in (self._count, self._mean, self._m2):
+                array.flush()
+            with open(os.path.join(self.directory, 'stack.json'), 'w') as f:
+                json.dump(dict(shape=self.shape, frames=self.frames,
+                               rejected=self.rejected), f)
+
+    def save(self, filename):
+        """Saves the stacked picture in .npy format"""
+        np.save(filename, np.asarray(self.mean, dtype=np.float32))
@@ -0,0 +1,454 @@
+import argparse
+import collections
+import itertools
+import json
+import math
+import os
+
+import numpy as np
+
+from astroscope import tracing
+from astroscope.catalogs.star_catalog import StarCatalog
+from astroscope.catalogs.star_catalog import _cell_ids
+from astroscope.catalogs.star_catalog import _zone_cells
+from astroscope.catalogs.star_catalog import build_catalog
+from astroscope.guiding.detection import find_stars
+
+PlateSolution = collections.namedtuple(
+    'PlateSolution', 'ra dec rotation scale parity matches rms')
+
+_FORMAT_VERSION = 1
+_ARRAYS = ('quads', 'codes', 'quad_offsets')
+
+# the six pairs of stars of a quad, and the two other stars of each pair
+_PAIRS_I = np.array([0, 0, 0, 1, 1, 2])
+_PAIRS_J = np.array([1, 2, 3, 2, 3, 3])
+_OTHERS_K = np.array([2, 1, 1, 0, 0, 0])
+_OTHERS_L = np.array([3, 3, 2, 3, 2, 1])
+
+
+class PlateSolveError(Exception):
+    def __init__(self, msg):
+        super(PlateSolveError, self).__init__(msg)
+        self.msg = msg
+
+
+def _radec_to_tangent(ra, dec, ra0, dec0):
+    """Gnomonic projection in degrees, vectorized over its arguments"""
+    ra, dec, ra0, dec0 = (np.radians(x) for x in (ra, dec, ra0, dec0))
+    cos_dra = np.cos(ra - ra0)
+    cos_c = np.sin(dec0) * np.sin(dec) + np.cos(dec0) * np.cos(dec) * cos_dra
+    xi = np.cos(dec) * np.sin(ra - ra0) / cos_c
+    eta = (np.cos(dec0) * np.sin(dec) -
+           np.sin(dec0) * np.cos(dec) * cos_dra) / cos_c
+    return np.degrees(xi), np.degrees(eta)
+
+
+def _tangent_to_radec(xi, eta, ra0, dec0):
+    """Inverse gnomonic projection of tangent plane offsets in degrees"""
+    xi, eta, ra0, dec0 = (np.radians(x) for x in (xi, eta, ra0, dec0))
+    denominator = np.cos(dec0) - eta * np.sin(dec0)
+    ra = ra0 + np.arctan2(xi, denominator)
+    dec = np.arctan2(np.sin(dec0) + eta * np.cos(dec0),
+                     np.hypot(xi, denominator))
+    return np.degrees(ra) % 360.0, np.degrees(dec)
+
+
+def quad_codes(x, y):
+    """Geometric hash codes of quads of stars
+
+    The two most distant stars A and B of a quad are moved to 0 and 1 of
+    the complex plane; the positions of the two others, C and D, are the
+    code. Codes do not change when a quad is moved, rotated or scaled, and
+    mirroring a quad negates their imaginary parts. A and B, then C and D,
+    are ordered so the same quad always gets the same code.
+
+    :param x: (n, 4) array of x coordinates of the stars of n quads
+    :param y: (n, 4) array of y coordinates
+    :return (codes, order, diameters) where codes is a (n, 4) array of
+            (C real, C imaginary, D real, D imaginary), order is a (n, 4)
+            array of the column of A, B, C and D, and diameters are the
+            distances from A to B
+    """
+    z = np.asarray(x, dtype=np.float64) + 1j * np.asarray(y,
+                                                          dtype=np.float64)
+    distances = np.abs(z[:, _PAIRS_I] - z[:, _PAIRS_J])
+    widest = np.argmax(distances, axis=1)
+    order = np.column_stack((_PAIRS_I[widest], _PAIRS_J[widest],
+                             _OTHERS_K[widest], _OTHERS_L[widest]))
+    z = np.take_along_axis(z, order, axis=1)
+    w = (z[:, 2:] - z[:, :1]) / (z[:, 1:2] - z[:, :1])
+    # swapping A and B moves C and D to 1 - C and 1 - D
+    swap = w.real.sum(axis=1) > 1.0
+    w[swap] = 1.0 - w[swap]
+    order[swap] = order[swap][:, [1, 0, 2, 3]]
+    swap = w[:, 0].real > w[:, 1].real
+    w[swap] = w[swap][:, ::-1]
+    order[swap] = order[swap][:, [0, 1, 3, 2]]
+    codes = np.column_stack((w[:, 0].real, w[:, 0].imag, w[:, 1].real,
+                             w[:, 1].imag))
+    return codes, order, distances.max(axis=1)
+
+
+def _expand(starts, counts):
+    """Concatenation of the ranges starts[i]:starts[i] + counts[i]"""
+    total = counts.sum()
+    first = np.cumsum(counts) - counts
+    return np.repeat(starts - first, counts) + np.arange(total)
+
+
+def _brightest_per_cell(catalog, cell_size, stars_per_cell):
+    """Indices of the brightest stars of every cell of the sky"""
+    arrays = catalog._load()
+    zone_cells = _zone_cells(cell_size)
+    zone_first_cell = np.concatenate(([0], np.cumsum(zone_cells)[:-1]))
+    cells = _cell_ids(arrays['ra'], arrays['dec'], cell_size, zone_cells,
+                      zone_first_cell)
+    mag = np.asarray(arrays['mag'], dtype=np.float64)
+    mag = np.where(np.isnan(mag), np.inf, mag)
+    order = np.lexsort((mag, cells))
+    sorted_cells = cells[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_cells,
+                                                   sorted_cells)
+    return np.sort(order[rank < stars_per_cell])
+
+
+def build_quad_index(catalog, directory, field_size, stars_per_cell=8,
+                     neighbours=6):
+    """Writes the quad index used by PlateSolver to directory
+
+    The brightest stars of every field_size / 2 wide cell of catalog are
+    kept, as a StarCatalog in directory, so the stars are evenly spread
+    whatever the depth of catalog. Every kept star makes quads with all
+    triples of its nearest neighbours. Quads are sorted by their A star,
+    which is sorted by cell, so the quads near a position are found with a
+    cone search of the stars.
+
+    :param catalog: StarCatalog the index is built from
+    :param directory: directory the index is written to
+    :param field_size: smaller side of the camera field in degrees. Quads
+                       are between a tenth and nine tenths of it wide.
+    :param stars_per_cell: number of stars kept in every cell
+    :param neighbours: number of neighbours a star makes quads with
+    """
+    cell_size = field_size / 2.0
+    min_size, max_size = 0.1 * field_size, 0.9 * field_size
+    arrays = catalog._load()
+    kept = _brightest_per_cell(catalog, cell_size, stars_per_cell)
+    build_catalog(directory, arrays['ra'][kept], arrays['dec'][kept],
+                  arrays['mag'][kept],
+                  [name.decode('ascii') for name in arrays['names'][kept]],
+                  zone_height=cell_size)
+    stars = StarCatalog(directory)
+    ra, dec = stars._load()['ra'], stars._load()['dec']
+    quads = []
+    for i in range(len(ra)):
+        indices, _ = stars.cone_search_indices(ra[i], dec[i], max_size)
+        indices = indices[indices != i][:neighbours]
+        for triple in itertools.combinations(indices, 3):
+            quads.append((i, ) + triple)
+    quads = np.unique(np.sort(np.array(quads, dtype=np.int64).reshape(-1, 4),
+                              axis=1), axis=0)
+    # every quad is projected on the plane tangent at its first star
+    xi, eta = _radec_to_tangent(ra[quads], dec[quads], ra[quads[:, :1]],
+                                dec[quads[:, :1]])
+    codes, order, diameters = quad_codes(xi, eta)
+    quads = np.take_along_axis(quads, order, axis=1)
+    inside = (diameters >= min_size) & (diameters <= max_size)
+    quads, codes = quads[inside], codes[inside]
+    by_star = np.argsort(quads[:, 0], kind='stable')
+    quads, codes = quads[by_star], codes[by_star]
+    arrays = dict(quads=quads.astype(np.int32),
+                  codes=codes.astype(np.float32),
+                  quad_offsets=np.searchsorted(
+                      quads[:, 0], np.arange(len(ra) + 1)).astype(np.int64))
+    for name in _ARRAYS:
+        np.save(os.path.join(directory, name + '.npy'), arrays[name])
+    with open(os.path.join(directory, 'quad_index.json'), 'w') as f:
+        json.dump(dict(version=_FORMAT_VERSION, count=len(quads),
+                       field_size=field_size, min_size=min_size,
+                       max_size=max_size), f)
+
+
+class PlateSolver(object):
+    """Finds where a picture was taken from the patterns of its stars
+
+    The quads of the brightest stars of the picture are looked up in a
+    quad index built by build_quad_index, restricted to the stars around
+    where the telescope believes it points. Every quad matching by code is
+    a guess of the transform from pixels to the sky, which is kept when
+    it also brings enough other stars onto catalog stars. Nothing needs a
+    network connection.
+
+    Like StarCatalog, nothing is read from disk until the first solve.
+    """
+
+    def __init__(self, directory, arcsec_per_pixel=None, radius=5.0,
+                 scale_tolerance=0.1, code_tolerance=0.01, quad_stars=12,
+                 max_stars=40, match_radius=3.0, min_matches=6,
+                 max_guesses=200):
+        """
+        :param directory: directory written by build_quad_index
+        :param arcsec_per_pixel: expected scale of the pictures. Quads of
+                                 the wrong size are skipped when given.
+        :param radius: how far in degrees the picture may be from the
+                       position given to solve()
+        :param scale_tolerance: relative error of arcsec_per_pixel
+        :param code_tolerance: largest distance between matching codes
+        :param quad_stars: number of the brightest stars making quads
+        :param max_stars: number of stars detected in the picture
+        :param match_radius: distance in pixels of a star from its catalog
+                             position for it to match
+        :param min_matches: number of matching stars a solution needs
+        :param max_guesses: number of matching quads tried before giving up
+        """
+        self.directory = directory
+        self.stars = StarCatalog(directory)
+        self.arcsec_per_pixel = arcsec_per_pixel
+        self.radius = radius
+        self.scale_tolerance = scale_tolerance
+        self.code_tolerance = code_tolerance
+        self.quad_stars = quad_stars
+        self.max_stars = max_stars
+        self.match_radius = match_radius
+        self.min_matches = min_matches
+        self.max_guesses = max_guesses
+        self._arrays = None
+
+    def _load(self):
+        if self._arrays is not None:
+            return self._arrays
+        try:
+            with open(os.path.join(self.directory, 'quad_index.json')) as f:
+                meta = json.load(f)
+        except (IOError, OSError, ValueError):
+            raise PlateSolveError('{} is not a quad index'.format(
+                self.directory))
+        if meta.get('version') != _FORMAT_VERSION:
+            raise PlateSolveError('unsupported quad index version {}'.format(
+                meta.get('version')))
+        arrays = dict((name, np.load(os.path.join(self.directory,
+                                                  name + '.npy'),
+                                     mmap_mode='r'))
+                      for name in _ARRAYS)
+        arrays.update(self.stars._load())
+        self.field_size = meta['field_size']
+        self._arrays = arrays
+        return arrays
+
+    def _candidate_quads(self, ra, dec):
+        """Indices of the quads whose A star is within radius of ra, dec"""
+        arrays = self._load()
+        stars, _ = self.stars.cone_search_indices(ra, dec, self.radius)
+        offsets = arrays['quad_offsets']
+        return _expand(offsets[stars], offsets[stars + 1] - offsets[stars])
+
+    def _image_quads(self, x, y):
+        """Quads of the brightest detected stars of the right size
+
+        :return (stars, codes, diameters) with stars the (n, 4) array of
+                the detected stars of every quad, ordered like its code
+        """
+        stars = np.array(list(itertools.combinations(
+            range(min(len(x), self.quad_stars)), 4)), dtype=np.int64)
+        if not len(stars):
+            return stars.reshape(0, 4), np.empty((0, 4)), np.empty(0)
+        codes, order, diameters = quad_codes(x[stars], y[stars])
+        stars = np.take_along_axis(stars, order, axis=1)
+        if self.arcsec_per_pixel:
+            # quads of the index are 0.1 to 0.9 field_size wide
+            pixels = self.field_size * 3600.0 / self.arcsec_per_pixel
+            inside = ((diameters >= 0.1 * pixels /
+                       (1 + self.scale_tolerance)) &
+                      (diameters <= 0.9 * pixels *
+                       (1 + self.scale_tolerance)))
+            stars, codes = stars[inside], codes[inside]
+            diameters = diameters[inside]
+        return stars, codes, diameters
+
+    def _matching_quads(self, codes, candidates):
+        """Pairs of picture and index quads with close codes, both parities
+
+        :return (picture quads, index quads, parities), closest codes first
+        """
+        index_codes = self._arrays['codes'][candidates]
+        by_code = np.argsort(index_codes[:, 0], kind='stable')
+        index_codes, candidates = index_codes[by_code], candidates[by_code]
+        # a mirrored picture has the complex conjugate codes
+        codes = np.concatenate((codes, codes * [1.0, -1.0, 1.0, -1.0]))
+        parities = np.repeat([1, -1], len(codes) // 2)
+        tolerance = self.code_tolerance
+        lower = np.searchsorted(index_codes[:, 0], codes[:, 0] - tolerance)
+        upper = np.searchsorted(index_codes[:, 0], codes[:, 0] + tolerance,
+                                side='right')
+        counts = upper - lower
+        picture = np.repeat(np.arange(len(codes)), counts)
+        index = _expand(lower, counts)
+        # most pairs differ in the second value already
+        close = np.abs(codes[picture, 1] - index_codes[index, 1]) <= \
+            tolerance
+        picture, index = picture[close], index[close]
+        distance = np.sum((codes[picture] - index_codes[index]) ** 2,
+                          axis=1)
+        close = distance <= tolerance ** 2
+        picture, index = picture[close], index[close]
+        order = np.argsort(distance[close], kind='stable')
+        picture, index = picture[order], index[order]
+        return (picture % (len(codes) // 2), candidates[index],
+                parities[picture])
+
+    def _fit(self, x, y, xi, eta):
+        """Least squares affine transform from pixels to the tangent plane
+
+        :return (3, 2) matrix m with [xi eta] = [x y 1] m
+        """
+        design = np.column_stack((x, y, np.ones(len(x))))
+        return np.linalg.lstsq(design, np.column_stack((xi, eta)),
+                               rcond=None)[0]
+
+    def _matches(self, transform, x, y, xi, eta):
+        """Detected stars falling on catalog stars
+
+        :return (detected indices, catalog indices)
+        """
+        linear = transform[:2]
+        try:
+            inverse = np.linalg.inv(linear)
+        except np.linalg.LinAlgError:
+            return np.empty(0, dtype=int), np.empty(0, dtype=int)
+        projected = (np.column_stack((xi, eta)) - transform[2]).dot(inverse)
+        distance = np.hypot(x[:, None] - projected[:, 0],
+                            y[:, None] - projected[:, 1])
+        closest = np.argmin(distance, axis=1)
+        matched = distance[np.arange(len(x)), closest] <= self.match_radius
+        return np.nonzero(matched)[0], closest[matched]
+
+    def solve(self, image, ra, dec):
+        """Finds the sky coordinates of the centre of image
+
+        :param image: 2d array of the picture
+        :param ra: right ascension in degrees the telescope believes it
+                   points at
+        :param dec: declination in degrees
+        :return PlateSolution, with ra and dec of the centre of the picture
+                in degrees, rotation of its x axis from east towards north
+                in degrees, scale in arcseconds per pixel, parity 1 if
+                north is counter-clockwise from east, matches the number
+                of matching stars and rms their residual in arcseconds
+        :raises PlateSolveError if no solution is found
+        """
+        with tracing.span('plate solve', 'solver'):
+            image = np.asarray(image)
+            arrays = self._load()
+            detected = find_stars(image, max_stars=self.max_stars)
+            x, y = np.asarray(detected.x), np.asarray(detected.y)
+            if len(x) < self.min_matches:
+                raise PlateSolveError('only {} stars found'.format(len(x)))
+            stars, codes, diameters = self._image_quads(x, y)
+            candidates = self._candidate_quads(ra, dec)
+            picture, index, parities = self._matching_quads(codes,
+                                                            candidates)
+            # the catalog stars a solution may bring into the picture
+            reach = self.radius + self.field_size * 2
+            nearby, _ = self.stars.cone_search_indices(ra, dec, reach)
+            star_xi, star_eta = _radec_to_tangent(
+                arrays['ra'][nearby], arrays['dec'][nearby], ra, dec)
+            position = dict((star, i) for i, star in enumerate(nearby))
+            quads = arrays['quads']
+            for p, q in zip(picture[:self.max_guesses],
+                            index[:self.max_guesses]):
+                catalog = [position.get(star) for star in quads[q]]
+                if None in catalog:
+                    continue
+                transform = self._fit(x[stars[p]], y[stars[p]],
+                                      star_xi[catalog], star_eta[catalog])
+                if self.arcsec_per_pixel and abs(
+                        self._scale(transform) / self.arcsec_per_pixel -
+                        1.0) > self.scale_tolerance:
+                    continue
+                found, matched = self._matches(transform, x, y, star_xi,
+                                               star_eta)
+                if len(found) >= self.min_matches:
+                    return self._refine(image.shape, x[found], y[found],
+                                        nearby[matched], transform, ra, dec)
+        raise PlateSolveError('no match near {:.3f} {:.3f}'.format(ra, dec))
+
+    def _scale(self, transform):
+        return math.sqrt(abs(np.linalg.det(transform[:2]))) * 3600.0
+
+    def _refine(self, shape, x, y, stars, transform, ra, dec, iterations=2):
+        """Fits the matched stars on the plane tangent at the solution
+
+        :param transform: transform of the matched quad, on the plane
+                          tangent at ra and dec, which gives the first
+                          guess of the centre of the picture
+        """
+        arrays = self._arrays
+        star_ra, star_dec = arrays['ra'][stars], arrays['dec'][stars]
+        center_x, center_y = (shape[1] - 1) / 2.0, (shape[0] - 1) / 2.0
+        # averaging right ascensions fails on fields across ra 0
+        center = np.array([center_x, center_y, 1.0]).dot(transform)
+        ra, dec = _tangent_to_radec(center[0], center[1], ra, dec)
+        ra, dec = float(ra), float(dec)
+        for _ in range(iterations + 1):
+            xi, eta = _radec_to_tangent(star_ra, star_dec, ra, dec)
+            transform = self._fit(x, y, xi, eta)
+            center = np.array([center_x, center_y, 1.0]).dot(transform)
+            ra, dec = _tangent_to_radec(center[0], center[1], ra, dec)
+            ra, dec = float(ra), float(dec)
+        residuals = np.column_stack((x, y, np.ones(len(x)))).dot(
+            transform) - np.column_stack((xi, eta))
+        rms = math.sqrt(np.mean(np.sum(residuals ** 2, axis=1))) * 3600.0
+        rotation = math.degrees(math.atan2(transform[0, 1],
+                                           transform[0, 0])) % 360.0
+        parity = 1 if np.linalg.det(transform[:2]) > 0 else -1
+        return PlateSolution(ra, dec, rotation, self._scale(transform),
+                             parity, len(x), rms)
+
+
+def solve_and_sync(telescope, camera, solver, decoder=None):
+    """Takes a picture, solves it and syncs the telescope on its centre
+
+    Replaces centring a known star by hand before a sync: the telescope
+    can point anywhere, as long as it is within the solver radius of where
+    it believes it points.
+
+    :param telescope: telescope to sync
+    :param camera: camera looking through the telescope
+    :param solver: PlateSolver
+    :param decoder: converts downloaded bytes into a 2d array. Default
+                    reads .npy pictures.
+    :return PlateSolution
+    :raises PlateSolveError if the picture could not be solved
+    """
+    if decoder is None:
+        from astroscope.cameras.stacking import load_npy
+        decoder = load_npy
+    ra, dec = telescope.get_ra_dec()
+    image = decoder(camera.download_image(camera.capture_image()))
+    solution = solver.solve(image, ra, dec)
+    telescope.sync(solution.ra, solution.dec)
+    return solution
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Builds the quad index used by the --solve_and_sync "
+                    "flag of the telescope command.")
+    parser.add_argument("catalog",
+                        help="Catalog directory written by star_catalog.")
+    parser.add_argument("directory",
+                        help="Directory the index is written to.")
+    parser.add_argument("--field_size", type=float, required=True,
+                        help="Smaller side of the camera field in degrees.")
+    parser.add_argument("--stars_per_cell", type=int, default=8,
+                        help="Stars kept per half field wide cell.")
+    parser.add_argument("--neighbours", type=int, default=6,
+                        help="Neighbours every star makes quads with.")
+    args = parser.parse_args()
+    build_quad_index(StarCatalog(args.catalog), args.directory,
+                     args.field_size, args.stars_per_cell, args.neighbours)
+
+
+if __name__ == '__main__':
+    main()
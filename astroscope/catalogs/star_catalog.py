@@ -0,0 +1,275 @@
+import argparse
+import collections
+import csv
+import json
+import math
+import os
+
+import numpy as np
+
+CatalogEntry = collections.namedtuple('CatalogEntry',
+                                      'name ra dec mag separation')
+
+_FORMAT_VERSION = 1
+_NAME_LENGTH = 32
+_ARRAYS = ('ra', 'dec', 'mag', 'names', 'cell_offsets', 'sorted_names',
+           'name_order')
+
+
+class CatalogError(Exception):
+    def __init__(self, msg):
+        super(CatalogError, self).__init__(msg)
+        self.msg = msg
+
+
+def _zone_cells(zone_height):
+    """Number of ra cells of every declination zone
+
+    Cells are roughly zone_height wide on the sky, so cells of all zones
+    cover about the same area.
+    """
+    n_zones = int(round(180.0 / zone_height))
+    lower = -90.0 + zone_height * np.arange(n_zones)
+    widest = np.maximum(np.cos(np.radians(lower)),
+                        np.cos(np.radians(lower + zone_height)))
+    widest[(lower < 0) & (lower + zone_height > 0)] = 1.0
+    return np.maximum(1, np.ceil(360.0 * widest / zone_height)).astype(int)
+
+
+def _cell_ids(ra, dec, zone_height, zone_cells, zone_first_cell):
+    zone = np.clip(((np.asarray(dec) + 90.0) // zone_height).astype(int),
+                   0, len(zone_cells) - 1)
+    ra_cell = (np.mod(ra, 360.0) / 360.0 * zone_cells[zone]).astype(int)
+    ra_cell = np.minimum(ra_cell, zone_cells[zone] - 1)
+    return zone_first_cell[zone] + ra_cell
+
+
+def angular_separation(ra1, dec1, ra2, dec2):
+    """Angular separation in degrees, vectorized over its arguments"""
+    ra1, dec1, ra2, dec2 = (np.radians(x) for x in (ra1, dec1, ra2, dec2))
+    sin_ddec = np.sin((dec2 - dec1) / 2.0)
+    sin_dra = np.sin((ra2 - ra1) / 2.0)
+    a = sin_ddec ** 2 + np.cos(dec1) * np.cos(dec2) * sin_dra ** 2
+    return np.degrees(2.0 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0))))
+
+
+def build_catalog(directory, ra, dec, mag, names, zone_height=1.0):
+    """Writes a catalog and its index to directory
+
+    Objects are sorted by index cell, so the objects of a cell are one
+    contiguous slice of every array.
+
+    :param directory: directory the catalog is written to
+    :param ra: right ascensions in degrees
+    :param dec: declinations in degrees
+    :param mag: magnitudes
+    :param names: names of the objects. At most 32 ascii characters are
+                  kept.
+    :param zone_height: height of the declination zones of the index in
+                        degrees
+    """
+    ra = np.mod(np.asarray(ra, dtype=np.float64), 360.0)
+    dec = np.asarray(dec, dtype=np.float64)
+    mag = np.asarray(mag, dtype=np.float32)
+    names = np.array([str(n).encode('ascii', 'replace')[:_NAME_LENGTH]
+                      for n in names], dtype='S%d' % _NAME_LENGTH)
+    if not len(ra) == len(dec) == len(mag) == len(names):
+        raise CatalogError('catalog columns differ in length')
+    zone_cells = _zone_cells(zone_height)
+    zone_first_cell = np.concatenate(([0], np.cumsum(zone_cells)[:-1]))
+    cells = _cell_ids(ra, dec, zone_height, zone_cells, zone_first_cell)
+    order = np.argsort(cells, kind='stable')
+    cell_offsets = np.searchsorted(cells[order],
+                                   np.arange(zone_cells.sum() + 1))
+    names = names[order]
+    upper_names = np.char.upper(names)
+    name_order = np.argsort(upper_names, kind='stable')
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    arrays = dict(ra=ra[order], dec=dec[order], mag=mag[order], names=names,
+                  cell_offsets=cell_offsets.astype(np.int64),
+                  sorted_names=upper_names[name_order],
+                  name_order=name_order.astype(np.int64))
+    for name in _ARRAYS:
+        np.save(os.path.join(directory, name + '.npy'), arrays[name])
+    with open(os.path.join(directory, 'catalog.json'), 'w') as f:
+        json.dump(dict(version=_FORMAT_VERSION, count=len(ra),
+                       zone_height=zone_height), f)
+
+
+def build_catalog_from_csv(csv_filename, directory, zone_height=1.0):
+    """Builds a catalog from a csv file with name, ra, dec, mag columns
+
+    ra and dec are in degrees. A header row naming the columns is required.
+    """
+    names, ra, dec, mag = [], [], [], []
+    with open(csv_filename) as f:
+        for row in csv.DictReader(f):
+            names.append(row['name'].strip())
+            ra.append(float(row['ra']))
+            dec.append(float(row['dec']))
+            mag.append(float(row.get('mag') or 'nan'))
+    build_catalog(directory, ra, dec, mag, names, zone_height)
+
+
+class StarCatalog(object):
+    """Memory mapped catalog with a zone index for cone searches
+
+    Nothing is read from disk until the first query, so creating a
+    StarCatalog costs nothing at startup.
+    """
+
+    def __init__(self, directory):
+        """
+        :param directory: directory written by build_catalog
+        """
+        self.directory = directory
+        self._arrays = None
+
+    def _load(self):
+        if self._arrays is not None:
+            return self._arrays
+        try:
+            with open(os.path.join(self.directory, 'catalog.json')) as f:
+                meta = json.load(f)
+        except (IOError, OSError, ValueError):
+            raise CatalogError('{} is not a catalog'.format(self.directory))
+        if meta.get('version') != _FORMAT_VERSION:
+            raise CatalogError('unsupported catalog version {}'.format(
+                meta.get('version')))
+        arrays = dict((name, np.load(os.path.join(self.directory,
+                                                  name + '.npy'),
+                                     mmap_mode='r'))
+                      for name in _ARRAYS)
+        self.zone_height = meta['zone_height']
+        self._zone_cells = _zone_cells(self.zone_height)
+        self._zone_first_cell = np.concatenate(
+            ([0], np.cumsum(self._zone_cells)[:-1]))
+        self._arrays = arrays
+        return arrays
+
+    def __len__(self):
+        return len(self._load()['ra'])
+
+    def _entry(self, i, separation=float('nan')):
+        arrays = self._load()
+        return CatalogEntry(arrays['names'][i].decode('ascii'),
+                            float(arrays['ra'][i]), float(arrays['dec'][i]),
+                            float(arrays['mag'][i]), float(separation))
+
+    def _candidates(self, ra, dec, radius):
+        """Indices of the objects in the cells touching the search cone"""
+        arrays = self._load()
+        offsets = arrays['cell_offsets']
+        zone_height = self.zone_height
+        first_zone = max(0, int((dec - radius + 90.0) // zone_height))
+        last_zone = min(len(self._zone_cells) - 1,
+                        int((dec + radius + 90.0) // zone_height))
+        slices = []
+        for zone in range(first_zone, last_zone + 1):
+            n_cells = self._zone_cells[zone]
+            first_cell = self._zone_first_cell[zone]
+            lower = -90.0 + zone * zone_height
+            widest = max(abs(lower), abs(lower + zone_height))
+            # declination at which the cone is widest in this zone,
+            # rounded towards the pole so cells are never missed
+            closest = max(abs(dec), min(widest, abs(dec) + radius))
+            half_width = 180.0
+            if closest < 90.0 and radius < 90.0:
+                ratio = (math.sin(math.radians(radius)) /
+                         math.cos(math.radians(closest)))
+                if ratio < 1.0:
+                    half_width = math.degrees(math.asin(ratio))
+            if half_width >= 180.0 or n_cells == 1:
+                slices.append((offsets[first_cell],
+                               offsets[first_cell + n_cells]))
+                continue
+            cell_width = 360.0 / n_cells
+            start = int(math.floor((ra - half_width) / cell_width))
+            stop = int(math.floor((ra + half_width) / cell_width))
+            if stop - start + 1 >= n_cells:
+                start, stop = 0, n_cells - 1
+            for cell in range(start, stop + 1):
+                cell = first_cell + cell % n_cells
+                slices.append((offsets[cell], offsets[cell + 1]))
+        slices = [s for s in slices if s[1] > s[0]]
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(s[0], s[1]) for s in slices])
+
+    def cone_search_indices(self, ra, dec, radius):
+        """Returns (indices, separations) of objects within radius
+
+        Sorted by increasing separation.
+        """
+        arrays = self._load()
+        candidates = self._candidates(float(ra) % 360.0, float(dec),
+                                      float(radius))
+        separation = angular_separation(ra, dec, arrays['ra'][candidates],
+                                        arrays['dec'][candidates])
+        inside = separation <= radius
+        candidates, separation = candidates[inside], separation[inside]
+        order = np.argsort(separation, kind='stable')
+        return candidates[order], separation[order]
+
+    def cone_search(self, ra, dec, radius, limit=None):
+        """Returns the objects within radius of ra, dec
+
+        :param ra: right ascension in degrees
+        :param dec: declination in degrees
+        :param radius: search radius in degrees
+        :param limit: maximum number of objects returned
+        :return list of CatalogEntry, closest first
+        """
+        indices, separations = self.cone_search_indices(ra, dec, radius)
+        return [self._entry(i, s)
+                for i, s in zip(indices[:limit], separations[:limit])]
+
+    def nearest(self, ra, dec, count=1):
+        """Returns the count objects closest to ra, dec
+
+        :return list of CatalogEntry, closest first
+        """
+        self._load()
+        count = min(count, len(self))
+        radius = self.zone_height
+        while True:
+            indices, separations = self.cone_search_indices(ra, dec, radius)
+            if len(indices) >= count or radius >= 180.0:
+                break
+            radius = min(180.0, radius * 4)
+        return [self._entry(i, s)
+                for i, s in zip(indices[:count], separations[:count])]
+
+    def find(self, name):
+        """Returns the CatalogEntry of the object called name or None
+
+        Names are compared case insensitively.
+        """
+        arrays = self._load()
+        key = name.strip().upper().encode('ascii', 'replace')[:_NAME_LENGTH]
+        sorted_names = arrays['sorted_names']
+        i = np.searchsorted(sorted_names, key)
+        if i >= len(sorted_names) or sorted_names[i] != key:
+            return None
+        return self._entry(arrays['name_order'][i])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Builds a catalog usable by the --catalog flag of the "
+                    "astroscope and telescope commands.")
+    parser.add_argument("csv_filename",
+                        help="csv file with name, ra, dec and mag columns. "
+                             "ra and dec are in degrees.")
+    parser.add_argument("directory",
+                        help="Directory the catalog is written to.")
+    parser.add_argument("--zone_height", type=float, default=1.0,
+                        help="Height of the index zones in degrees.")
+    args = parser.parse_args()
+    build_catalog_from_csv(args.csv_filename, args.directory,
+                           args.zone_height)
+
+
+if __name__ == '__main__':
+    main()
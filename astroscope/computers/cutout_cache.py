@@ -0,0 +1,171 @@
+import collections
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+
+CUTOUT_BASE_URL = 'http://skyservice.pha.jhu.edu/DR12/ImgCutout/getjpeg.aspx'
+
+
+def cutout_params(ra, dec, impix=1024, imsize_arcmin=12.0):
+    """Returns the query parameters of the SDSS ImgCutout service
+
+    :param ra: right ascension of the centre of the picture in degrees
+    :param dec: declination of the centre of the picture in degrees
+    :param impix: width and height of the picture in pixels
+    :param imsize_arcmin: width and height of the picture in arc minutes
+    """
+    return dict(ra=ra, dec=dec, width=impix, height=impix,
+                scale=imsize_arcmin * 60.0 / impix)
+
+
+class CutoutCache(object):
+    """Disk cache of catalog cutouts with least recently used eviction
+
+    Cutouts are keyed by their query parameters, with the position
+    quantized so that pointing near the same field again hits the same
+    entry. Entries are written atomically, so an interrupted download
+    never leaves a truncated picture behind, and read through mmap.
+    """
+
+    _SUFFIX = '.jpg'
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024,
+                 quantum_arcsec=30.0):
+        """
+        :param directory: directory holding the cached cutouts
+        :param max_bytes: size limit of the cache
+        :param quantum_arcsec: step ra and dec are rounded to
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.quantum = quantum_arcsec / 3600.0
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._load_entries()
+
+    def _load_entries(self):
+        found = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.part'):
+                os.remove(path)
+            elif name.endswith(self._SUFFIX):
+                stat = os.stat(path)
+                found.append((stat.st_mtime, name, stat.st_size))
+        for _mtime, name, size in sorted(found):
+            self._entries[name] = size
+            self._size += size
+
+    def quantize(self, params):
+        """Returns a copy of params with ra and dec rounded to the quantum
+
+        Downloading the quantized position makes the cached picture valid
+        for every position rounding to it.
+        """
+        params = dict(params)
+        params['ra'] = round(round(params['ra'] / self.quantum) *
+                             self.quantum, 6) % 360.0
+        params['dec'] = round(round(params['dec'] / self.quantum) *
+                              self.quantum, 6)
+        return params
+
+    def _name(self, params):
+        params = self.quantize(params)
+        key = '{ra:.6f},{dec:.6f},{width},{height},{scale:.6f}'.format(
+            **params)
+        return hashlib.sha1(key.encode()).hexdigest() + self._SUFFIX
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, params):
+        return self._name(params) in self._entries
+
+    @property
+    def size(self):
+        """Bytes used by the cached cutouts"""
+        return self._size
+
+    def get(self, params):
+        """Returns a read only mmap of the cached cutout or None
+
+        The caller owns the returned mmap and should close it, for example
+        by using it in a with statement.
+        """
+        name = self._name(params)
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+            try:
+                os.utime(self._path(name), None)
+                with open(self._path(name), 'rb') as f:
+                    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # removed behind our back or empty
+                self._size -= self._entries.pop(name)
+                return None
+
+    def copy_to(self, params, output_filename):
+        """Writes the cached cutout to output_filename
+
+        :return True if the cutout was cached, False otherwise
+        """
+        mapped = self.get(params)
+        if mapped is None:
+            return False
+        with mapped, open(output_filename, 'wb') as f:
+            f.write(mapped)
+        return True
+
+    def put(self, params, chunks):
+        """Stores a cutout, evicting the least recently used ones
+
+        :param params: query parameters of the cutout
+        :param chunks: iterable of bytes making up the picture
+        :return number of bytes stored
+        """
+        name = self._name(params)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, self._path(name))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._size += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+            self._evict()
+        return size
+
+    def _evict(self):
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            for name in self._entries:
+                try:
+                    os.remove(self._path(name))
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._size = 0
@@ -4,24 +4,79 @@ from astropy import units as u
 from astropy.time import Time
 from astropy.coordinates import EarthLocation
 
+from astroscope import tracing
+from astroscope.computers.cutout_cache import CUTOUT_BASE_URL
+from astroscope.computers.cutout_cache import cutout_params
+from astroscope.computers.prefetch import CutoutPrefetcher
+from astroscope.computers.prefetch import PrefetchError
+
+
+def _written(chunks, f):
+    """Yields chunks once written to f"""
+    for chunk in chunks:
+        f.write(chunk)
+        yield chunk
+
+
 class LocalComputer(object):
 
+    # CutoutCache used by find_view_in_catalog. None disables caching.
+    cutout_cache = None
+
+    @tracing.traced(category='computer')
     def find_view_in_catalog(self, output_filename):
         """Fetches picture from online catalogs of current location telescope is pointing to
-        
+
+        If cutout_cache is set, pictures already downloaded for the same
+        field are served from the cache instead.
+
         :param output_filename: the filename to save picture to
         """
         _radec = self.get_radec()
         impix = 1024
         imsize = 12 * u.arcmin
-        cutoutbaseurl = 'http://skyservice.pha.jhu.edu/DR12/ImgCutout/' \
-                        'getjpeg.aspx'
-        userdata = dict(ra=_radec.ra.deg, dec=_radec.dec.deg, width=impix,
-                        height=impix, scale=imsize.to(u.arcsec).value / impix)
-        resp = requests.get(cutoutbaseurl, userdata)
-        with open(output_filename, 'wb') as f:
-            for chunck in resp:
-                f.write(chunck)
+        userdata = cutout_params(_radec.ra.deg, _radec.dec.deg, impix,
+                                 imsize.to(u.arcmin).value)
+        if self.cutout_cache is None:
+            with tracing.span('cutout download', 'http'):
+                resp = requests.get(CUTOUT_BASE_URL, userdata)
+                with open(output_filename, 'wb') as f:
+                    for chunck in resp:
+                        f.write(chunck)
+            return
+        userdata = self.cutout_cache.quantize(userdata)
+        if self.cutout_cache.copy_to(userdata, output_filename):
+            return
+        with tracing.span('cutout download', 'http'):
+            resp = requests.get(CUTOUT_BASE_URL, userdata, stream=True)
+            resp.raise_for_status()
+            # written while cached, a prefetch may evict the entry right
+            # after put()
+            with open(output_filename, 'wb') as f:
+                self.cutout_cache.put(
+                    userdata, _written(resp.iter_content(64 * 1024), f))
+
+    @tracing.traced(category='computer')
+    def prefetch_views_in_catalog(self, targets, **kwargs):
+        """Downloads catalog pictures of targets into cutout_cache
+
+        Pictures are downloaded concurrently so a night's target list is
+        ready before the first slew. Keyword arguments are passed to
+        CutoutPrefetcher.
+
+        :param targets: iterable of (ra, dec) in degrees
+        :return list with the number of bytes downloaded, or the error, for
+                every target
+        :raises PrefetchError if cutout_cache is not set
+        """
+        if self.cutout_cache is None:
+            raise PrefetchError('no cutout_cache to prefetch into, set '
+                                'cutout_cache to a CutoutCache first')
+        prefetcher = CutoutPrefetcher(self.cutout_cache, **kwargs)
+        try:
+            return prefetcher.prefetch(targets)
+        finally:
+            prefetcher.close()
 
     def SkyCoordRaDec(self, ra, dec):
         return SkyCoord(ra=_ra * u.deg, dec=_dec * u.deg, frame="icrs")
@@ -0,0 +1,107 @@
+import concurrent.futures
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from astroscope.computers.cutout_cache import CUTOUT_BASE_URL
+from astroscope.computers.cutout_cache import cutout_params
+
+
+class PrefetchError(Exception):
+    def __init__(self, msg):
+        super(PrefetchError, self).__init__(msg)
+        self.msg = msg
+
+
+class CutoutPrefetcher(object):
+    """Downloads catalog cutouts for many targets into a CutoutCache
+
+    Downloads run on a bounded pool of threads sharing one keep-alive
+    session, are streamed into the cache chunk by chunk and are retried
+    with exponential backoff on connection errors and server errors.
+    """
+
+    def __init__(self, cache, base_url=CUTOUT_BASE_URL, max_workers=4,
+                 retries=3, backoff=0.5, timeout=30.0, impix=1024,
+                 imsize_arcmin=12.0, session=None):
+        """
+        :param cache: CutoutCache the cutouts are stored in
+        :param base_url: url of the cutout service
+        :param max_workers: number of concurrent downloads
+        :param retries: attempts after the first failed one
+        :param backoff: delay in seconds before the first retry. Doubles
+                        with every further retry.
+        :param timeout: connect and read timeout in seconds
+        :param impix: width and height of the cutouts in pixels
+        :param imsize_arcmin: width and height of the cutouts in arc minutes
+        :param session: requests.Session to use instead of a new one
+        """
+        self.cache = cache
+        self.base_url = base_url
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.impix = impix
+        self.imsize_arcmin = imsize_arcmin
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1,
+                                  pool_maxsize=max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+
+    def _download(self, params):
+        response = self.session.get(self.base_url, params=params,
+                                    stream=True, timeout=self.timeout)
+        try:
+            if response.status_code >= 500:
+                raise PrefetchError('{} answered {}'.format(
+                    self.base_url, response.status_code))
+            response.raise_for_status()
+            return self.cache.put(params, response.iter_content(64 * 1024))
+        finally:
+            response.close()
+
+    def fetch(self, ra, dec):
+        """Downloads the cutout centred on ra, dec unless already cached
+
+        :return number of bytes downloaded, 0 if the cutout was cached
+        """
+        params = self.cache.quantize(cutout_params(ra, dec, self.impix,
+                                                   self.imsize_arcmin))
+        if params in self.cache:
+            return 0
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                return self._download(params)
+            except (requests.ConnectionError, requests.Timeout,
+                    PrefetchError):
+                if attempt == self.retries:
+                    raise
+            time.sleep(delay)
+            delay *= 2
+
+    def prefetch(self, targets):
+        """Downloads the cutouts of all targets concurrently
+
+        :param targets: iterable of (ra, dec) in degrees
+        :return list with, for every target in order, the number of bytes
+                downloaded or the exception which made the download fail
+        """
+        targets = list(targets)
+        with concurrent.futures.ThreadPoolExecutor(self.max_workers) as pool:
+            futures = [pool.submit(self.fetch, ra, dec) for ra, dec in targets]
+        results = []
+        for future in futures:
+            if future.exception() is not None:
+                results.append(future.exception())
+            else:
+                results.append(future.result())
+        return results
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,94 @@
+import collections
+
+import numpy as np
+
+Stars = collections.namedtuple('Stars', 'x y flux')
+
+
+def estimate_background(image, box=32):
+    """Estimates the sky background and its noise
+
+    The background is the median of every box x box tile, repeated over
+    the tile. The noise is derived from the median absolute deviation of
+    the background subtracted image, sampled every other pixel.
+
+    :return (background array, noise)
+    """
+    image = np.asarray(image, dtype=np.float64)
+    height, width = image.shape
+    rows, columns = -(-height // box), -(-width // box)
+    padded = np.pad(image, ((0, rows * box - height),
+                            (0, columns * box - width)), mode='edge')
+    tiles = padded.reshape(rows, box, columns, box).swapaxes(1, 2)
+    medians = np.median(tiles.reshape(rows, columns, box * box), axis=2)
+    background = np.repeat(np.repeat(medians, box, axis=0), box,
+                           axis=1)[:height, :width]
+    # every other pixel is plenty for the noise estimate
+    residual = (image - background)[::2, ::2]
+    noise = 1.4826 * np.median(np.abs(residual - np.median(residual)))
+    return background, noise
+
+
+def _local_maxima(image):
+    """Mask of the pixels larger than or equal to their 8 neighbours"""
+    padded = np.pad(image, 1, mode='constant', constant_values=-np.inf)
+    center = padded[1:-1, 1:-1]
+    mask = np.ones(image.shape, dtype=bool)
+    height, width = image.shape
+    for dy in (0, 1, 2):
+        for dx in (0, 1, 2):
+            if dy == 1 and dx == 1:
+                continue
+            mask &= center >= padded[dy:dy + height, dx:dx + width]
+    return mask
+
+
+def centroid(image, x, y, radius=3):
+    """Refines star positions to sub-pixel accuracy
+
+    Computes the intensity weighted centre of the (2 * radius + 1) square
+    window around every position, all windows at once.
+
+    :param image: background subtracted image
+    :param x: integer column of every star
+    :param y: integer row of every star
+    :return Stars with the refined positions and the summed flux
+    """
+    image = np.asarray(image, dtype=np.float64)
+    x = np.asarray(x, dtype=int)
+    y = np.asarray(y, dtype=int)
+    offsets = np.arange(-radius, radius + 1)
+    rows = np.clip(y[:, None] + offsets, 0, image.shape[0] - 1)
+    columns = np.clip(x[:, None] + offsets, 0, image.shape[1] - 1)
+    windows = image[rows[:, :, None], columns[:, None, :]]
+    windows = np.clip(windows, 0.0, None)
+    flux = windows.sum(axis=(1, 2))
+    total = np.where(flux > 0, flux, 1.0)
+    center_y = (windows.sum(axis=2) * offsets).sum(axis=1) / total
+    center_x = (windows.sum(axis=1) * offsets).sum(axis=1) / total
+    return Stars(x + center_x, y + center_y, flux)
+
+
+def find_stars(image, threshold=5.0, box=32, radius=3, max_stars=50):
+    """Detects and centroids the stars of an image
+
+    :param image: 2d array
+    :param threshold: detection threshold in units of background noise
+    :param box: size of the background tiles in pixels
+    :param radius: half size of the centroid window in pixels
+    :param max_stars: number of stars returned, brightest first
+    :return Stars sorted by decreasing flux
+    """
+    background, noise = estimate_background(image, box)
+    subtracted = np.asarray(image, dtype=np.float64) - background
+    peaks = _local_maxima(subtracted) & \
+        (subtracted > threshold * max(noise, 1e-12))
+    # ignore stars whose centroid window does not fit in the image
+    if radius:
+        peaks[:radius, :] = peaks[-radius:, :] = False
+        peaks[:, :radius] = peaks[:, -radius:] = False
+    y, x = np.nonzero(peaks)
+    order = np.argsort(subtracted[y, x])[::-1][:max_stars]
+    stars = centroid(subtracted, x[order], y[order], radius)
+    order = np.argsort(stars.flux)[::-1]
+    return Stars(stars.x[order], stars.y[order], stars.flux[order])
@@ -0,0 +1,224 @@
+import collections
+import math
+import threading
+import time
+
+import numpy as np
+
+from astroscope.cameras.stacking import load_npy
+from astroscope.guiding.detection import find_stars
+
+GuideStep = collections.namedtuple(
+    'GuideStep', 'x y dx dy az_rate alt_rate timings')
+
+
+class GuideController(object):
+    """Turns guide star drift into slew rate pulses
+
+    Drift measured in pixels is rotated and scaled into azimuth and
+    altitude offsets on the sky. Each correction slews the axes with
+    telescope.slew_var for pulse seconds, at the rate removing gain times
+    the offset, and then sets the rates back to 0.
+    """
+
+    def __init__(self, telescope, arcsec_per_pixel, angle=0.0, gain=0.7,
+                 pulse=1.0, max_rate=30.0, altitude=45.0):
+        """
+        :param telescope: telescope implementing slew_var(az_rate, el_rate)
+        :param arcsec_per_pixel: image scale of the guide camera
+        :param angle: angle in degrees from the azimuth axis to the image x
+                      axis
+        :param gain: fraction of the measured offset corrected per step
+        :param pulse: duration of a correction in seconds
+        :param max_rate: largest rate sent, in arcseconds per second
+        :param altitude: altitude of the target in degrees. Azimuth rates are
+                         divided by cos(altitude).
+        """
+        self.telescope = telescope
+        self.arcsec_per_pixel = arcsec_per_pixel
+        self.angle = angle
+        self.gain = gain
+        self.pulse = pulse
+        self.max_rate = max_rate
+        self.altitude = altitude
+        self._timer = None
+        self._pulse = 0
+        self._lock = threading.Lock()
+
+    def offsets(self, dx, dy):
+        """Converts a drift in pixels to (az, alt) offsets on the sky
+
+        :return (az, alt) in arcseconds
+        """
+        angle = math.radians(self.angle)
+        az = (dx * math.cos(angle) - dy * math.sin(angle)) * \
+            self.arcsec_per_pixel
+        alt = (dx * math.sin(angle) + dy * math.cos(angle)) * \
+            self.arcsec_per_pixel
+        return az, alt
+
+    def rates(self, dx, dy):
+        """Returns the (az, alt) rates correcting a drift in pixels"""
+        az, alt = self.offsets(dx, dy)
+        az /= max(math.cos(math.radians(self.altitude)), 0.01)
+        limit = self.max_rate
+        az_rate = -self.gain * az / self.pulse
+        alt_rate = -self.gain * alt / self.pulse
+        return (max(-limit, min(limit, az_rate)),
+                max(-limit, min(limit, alt_rate)))
+
+    def correct(self, dx, dy):
+        """Starts a correction pulse for a drift of dx, dy pixels
+
+        :return (az_rate, alt_rate) sent to the telescope
+        """
+        az_rate, alt_rate = self.rates(dx, dy)
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self.telescope.slew_var(az_rate, alt_rate)
+            self._pulse += 1
+            self._timer = threading.Timer(self.pulse, self._end_pulse,
+                                          args=(self._pulse, ))
+            self._timer.daemon = True
+            self._timer.start()
+        return az_rate, alt_rate
+
+    def _end_pulse(self, pulse):
+        """Ends the pulse numbered pulse, unless a newer correction replaced it
+
+        A timer may already run when correct() cancels it, and must not
+        stop the pulse started after it.
+        """
+        with self._lock:
+            if pulse != self._pulse:
+                return
+            self._timer = None
+            self.telescope.slew_var(0, 0)
+
+    def stop(self):
+        """Ends the correction in progress"""
+        with self._lock:
+            self._pulse += 1
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self.telescope.slew_var(0, 0)
+
+
+class Guider(object):
+    """Guide loop: capture, find the guide star, correct the drift
+
+    The time spent capturing, downloading, detecting and correcting is
+    recorded for every step, see latency().
+    """
+
+    def __init__(self, camera, controller, decoder=load_npy, threshold=5.0,
+                 search_radius=20.0):
+        """
+        :param camera: BaseCamera taking the guide frames
+        :param controller: GuideController applying the corrections
+        :param decoder: converts downloaded bytes into a 2d array
+        :param threshold: detection threshold in units of background noise
+        :param search_radius: pixels the guide star may move between frames
+        """
+        self.camera = camera
+        self.controller = controller
+        self.decoder = decoder
+        self.threshold = threshold
+        self.search_radius = search_radius
+        self.reference = None
+        self.position = None
+        self.steps = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _locate(self, image):
+        stars = find_stars(image, self.threshold)
+        if not len(stars.x):
+            return None
+        if self.position is None:
+            return stars.x[0], stars.y[0]
+        distance = np.hypot(stars.x - self.position[0],
+                            stars.y - self.position[1])
+        closest = np.argmin(distance)
+        if distance[closest] > self.search_radius:
+            return None
+        return stars.x[closest], stars.y[closest]
+
+    def step(self):
+        """Runs one iteration of the guide loop
+
+        The first star found becomes the reference position.
+
+        :return GuideStep, or None if the guide star was lost
+        """
+        timings = {}
+        start = time.perf_counter()
+        image = self.camera.capture_image()
+        timings['capture'] = time.perf_counter() - start
+        mark = time.perf_counter()
+        image = self.decoder(self.camera.download_image(image))
+        timings['download'] = time.perf_counter() - mark
+        mark = time.perf_counter()
+        position = self._locate(image)
+        timings['detect'] = time.perf_counter() - mark
+        if position is None:
+            return None
+        self.position = position
+        if self.reference is None:
+            self.reference = position
+        dx = position[0] - self.reference[0]
+        dy = position[1] - self.reference[1]
+        mark = time.perf_counter()
+        az_rate, alt_rate = self.controller.correct(dx, dy)
+        timings['correct'] = time.perf_counter() - mark
+        timings['total'] = time.perf_counter() - start
+        guide_step = GuideStep(position[0], position[1], dx, dy,
+                               az_rate, alt_rate, timings)
+        self.steps.append(guide_step)
+        return guide_step
+
+    def run(self, iterations=None, interval=0.0):
+        """Runs the guide loop until stop() or for iterations steps
+
+        :param interval: seconds between the start of two steps
+        """
+        self._stop.clear()
+        count = 0
+        while not self._stop.is_set():
+            if iterations is not None and count >= iterations:
+                break
+            started = time.monotonic()
+            self.step()
+            count += 1
+            remaining = started + interval - time.monotonic()
+            if remaining > 0:
+                self._stop.wait(remaining)
+
+    def start(self, interval=0.0):
+        """Runs the guide loop in a background thread"""
+        self._thread = threading.Thread(target=self.run,
+                                        kwargs=dict(interval=interval))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.controller.stop()
+
+    def latency(self):
+        """Loop latency statistics per stage
+
+        :return dictionary of stage -> dict(mean, max) in seconds
+        """
+        summary = {}
+        for name in ('capture', 'download', 'detect', 'correct', 'total'):
+            values = [s.timings[name] for s in self.steps]
+            if values:
+                summary[name] = dict(mean=sum(values) / len(values),
+                                     max=max(values))
+        return summary
@@ -0,0 +1,193 @@
+import bisect
+import json
+import os
+
+import numpy as np
+from astropy import units as u
+from astropy.coordinates import AltAz
+from astropy.coordinates import SkyCoord
+from astropy.time import Time
+
+
+class HorizonMask(object):
+    """Local horizon: lowest visible altitude for every azimuth
+
+    Altitudes are interpolated linearly between the measured points and
+    wrap around at 360 degrees.
+    """
+
+    def __init__(self, azimuths=(0.0,), altitudes=(0.0,)):
+        """
+        :param azimuths: azimuths in degrees of the measured points
+        :param altitudes: lowest visible altitude in degrees at each azimuth
+        """
+        azimuths = np.mod(np.asarray(azimuths, dtype=float), 360.0)
+        order = np.argsort(azimuths)
+        self.azimuths = azimuths[order]
+        self.altitudes = np.asarray(altitudes, dtype=float)[order]
+
+    @classmethod
+    def flat(cls, altitude=0.0):
+        """Horizon at the same altitude in every direction"""
+        return cls((0.0,), (altitude,))
+
+    @classmethod
+    def load(cls, filename):
+        """Reads a horizon file with one "azimuth altitude" pair per line
+
+        Empty lines and lines starting with # are ignored.
+        """
+        azimuths, altitudes = [], []
+        with open(filename) as f:
+            for line in f:
+                line = line.split('#')[0].strip()
+                if not line:
+                    continue
+                az, alt = line.replace(',', ' ').split()[:2]
+                azimuths.append(float(az))
+                altitudes.append(float(alt))
+        if not azimuths:
+            raise ValueError('{} has no horizon points'.format(filename))
+        return cls(azimuths, altitudes)
+
+    def min_altitude(self, az):
+        """Lowest visible altitude at azimuths az, in degrees"""
+        return np.interp(np.mod(az, 360.0), self.azimuths, self.altitudes,
+                         period=360.0)
+
+    def is_visible(self, az, alt):
+        return np.asarray(alt) > self.min_altitude(az)
+
+
+def altaz_grid(ra, dec, unix_times, location):
+    """Horizontal coordinates of every target at every time
+
+    All targets and times are transformed with a single astropy call.
+
+    :param ra: right ascensions of the targets in degrees
+    :param dec: declinations of the targets in degrees
+    :param unix_times: times as unix timestamps
+    :param location: astropy EarthLocation of the observer
+    :return (az, alt) arrays of shape (targets, times) in degrees
+    """
+    targets = SkyCoord(ra=np.asarray(ra, dtype=float)[:, None] * u.deg,
+                       dec=np.asarray(dec, dtype=float)[:, None] * u.deg)
+    frame = AltAz(obstime=Time(np.asarray(unix_times, dtype=float)[None, :],
+                               format='unix'),
+                  location=location)
+    _altaz = targets.transform_to(frame)
+    return _altaz.az.deg, _altaz.alt.deg
+
+
+def _intervals(times, margin):
+    """Intervals where margin > 0, with crossings interpolated linearly"""
+    visible = margin > 0
+    changes = np.flatnonzero(visible[1:] != visible[:-1])
+    crossings = times[changes] + (times[changes + 1] - times[changes]) * \
+        margin[changes] / (margin[changes] - margin[changes + 1])
+    edges = list(crossings)
+    if visible[0]:
+        edges.insert(0, times[0])
+    if visible[-1]:
+        edges.append(times[-1])
+    return [(float(edges[i]), float(edges[i + 1]))
+            for i in range(0, len(edges), 2)]
+
+
+class VisibilityIndex(object):
+    """When each target is above the horizon, as lists of time intervals
+
+    Built once per night from a vectorized transform of all targets, so
+    queries only compare times against the stored intervals.
+    """
+
+    def __init__(self, intervals, start, end):
+        """
+        :param intervals: dictionary of target name -> list of
+                          (rise, set) unix times
+        :param start: unix time the index starts at
+        :param end: unix time the index ends at
+        """
+        self.intervals = dict((name, [tuple(i) for i in value])
+                              for name, value in intervals.items())
+        self.start = start
+        self.end = end
+        names, rises, sets = [], [], []
+        for name, value in self.intervals.items():
+            for rise, _set in value:
+                names.append(name)
+                rises.append(rise)
+                sets.append(_set)
+        self._names = np.array(names, dtype=object)
+        self._rises = np.array(rises, dtype=float)
+        self._sets = np.array(sets, dtype=float)
+
+    @classmethod
+    def build(cls, targets, location, start, duration=12 * 3600.0,
+              step=300.0, horizon=None, min_altitude=0.0):
+        """Computes the visibility of targets over duration seconds
+
+        :param targets: dictionary of name -> (ra, dec) in degrees
+        :param location: astropy EarthLocation of the observer
+        :param start: unix time of the start of the index
+        :param step: sampling interval in seconds. Rise and set times are
+                     interpolated between samples.
+        :param horizon: HorizonMask, default is a flat horizon
+        :param min_altitude: lowest useful altitude in degrees, applied
+                             on top of the horizon
+        """
+        if horizon is None:
+            horizon = HorizonMask.flat()
+        names = list(targets)
+        times = np.arange(start, start + duration + step / 2, step)
+        intervals = {}
+        if names:
+            ra, dec = np.array([targets[name] for name in names],
+                               dtype=float).T
+            az, alt = altaz_grid(ra, dec, times, location)
+            margin = alt - np.maximum(horizon.min_altitude(az), min_altitude)
+            for name, row in zip(names, margin):
+                intervals[name] = _intervals(times, row)
+        return cls(intervals, float(times[0]), float(times[-1]))
+
+    def is_visible(self, name, unix_time):
+        intervals = self.intervals[name]
+        i = bisect.bisect_right(intervals, (unix_time, float('inf'))) - 1
+        return i >= 0 and intervals[i][0] <= unix_time < intervals[i][1]
+
+    def observable(self, unix_time, until=None, min_duration=0.0):
+        """Names of the targets visible at unix_time
+
+        :param until: instead, names of the targets visible for at least
+                      min_duration seconds between unix_time and until
+        :return sorted list of names
+        """
+        if until is None:
+            mask = (self._rises <= unix_time) & (unix_time < self._sets)
+        else:
+            overlap = np.minimum(self._sets, until) - \
+                np.maximum(self._rises, unix_time)
+            mask = overlap > max(min_duration, 0.0)
+        return sorted(set(self._names[mask]))
+
+    def next_rise(self, name, unix_time):
+        """Start of the next visibility interval of name, or unix_time if
+        it is visible now. None if it does not rise before the index ends.
+        """
+        for rise, _set in self.intervals[name]:
+            if _set > unix_time:
+                return max(rise, unix_time)
+        return None
+
+    def save(self, filename):
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'w') as f:
+            json.dump(dict(start=self.start, end=self.end,
+                           intervals=self.intervals), f)
+        os.replace(tmp_filename, filename)
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename) as f:
+            content = json.load(f)
+        return cls(content['intervals'], content['start'], content['end'])
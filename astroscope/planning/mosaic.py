@@ -0,0 +1,246 @@
+import collections
+import json
+import math
+import os
+import time
+
+import numpy as np
+from astropy import units as u
+from astropy.coordinates import SkyCoord
+
+from astroscope import tracing
+
+Tile = collections.namedtuple('Tile', 'index row column ra dec')
+
+
+class MosaicError(Exception):
+    def __init__(self, msg):
+        super(MosaicError, self).__init__(msg)
+        self.msg = msg
+
+
+def camera_fov(sensor_size, focal_length):
+    """Field of view in degrees along a sensor side
+
+    :param sensor_size: length of the sensor side in mm
+    :param focal_length: focal length of the telescope in mm
+    """
+    return math.degrees(2 * math.atan(sensor_size / (2.0 * focal_length)))
+
+
+def _tangent_to_radec(xi, eta, ra, dec):
+    """Inverse gnomonic projection of tangent plane offsets in degrees"""
+    xi, eta = np.radians(xi), np.radians(eta)
+    ra0, dec0 = math.radians(ra), math.radians(dec)
+    denominator = math.cos(dec0) - eta * math.sin(dec0)
+    _ra = ra0 + np.arctan2(xi, denominator)
+    _dec = np.arctan2(math.sin(dec0) + eta * math.cos(dec0),
+                      np.hypot(xi, denominator))
+    return np.degrees(_ra) % 360.0, np.degrees(_dec)
+
+
+def tile_region(ra, dec, width, height, fov_width, fov_height,
+                overlap=0.2):
+    """Covers a region of the sky with overlapping frames
+
+    The tiles are laid out on the plane tangent to the sky at the centre
+    of the region, so they keep their overlap away from the equator.
+
+    :param ra: right ascension of the centre of the region in degrees
+    :param dec: declination of the centre of the region in degrees
+    :param width: width of the region in degrees, along right ascension
+    :param height: height of the region in degrees, along declination
+    :param fov_width: field of view of the camera along the width
+    :param fov_height: field of view of the camera along the height
+    :param overlap: fraction of a frame shared with each neighbour
+    :return list of Tile, row by row
+    """
+    if not 0.0 <= overlap < 1.0:
+        raise ValueError('overlap must be in [0, 1)')
+    step_x = fov_width * (1.0 - overlap)
+    step_y = fov_height * (1.0 - overlap)
+    columns = max(1, int(math.ceil((width - fov_width) / step_x - 1e-9)) + 1)
+    rows = max(1, int(math.ceil((height - fov_height) / step_y - 1e-9)) + 1)
+    xi = (np.arange(columns) - (columns - 1) / 2.0) * step_x
+    eta = (np.arange(rows) - (rows - 1) / 2.0) * step_y
+    xi, eta = np.meshgrid(xi, eta)
+    _ra, _dec = _tangent_to_radec(xi.ravel(), eta.ravel(), ra, dec)
+    return [Tile(i, i // columns, i % columns, float(_ra[i]), float(_dec[i]))
+            for i in range(rows * columns)]
+
+
+def serpentine(tiles):
+    """Orders tiles row by row, reversing every other row
+
+    Consecutive tiles are always neighbours, so every slew is one step.
+    """
+    rows = collections.defaultdict(list)
+    for tile in tiles:
+        rows[tile.row].append(tile)
+    ordered = []
+    for i, row in enumerate(sorted(rows)):
+        row_tiles = sorted(rows[row], key=lambda t: t.column)
+        ordered.extend(reversed(row_tiles) if i % 2 else row_tiles)
+    return ordered
+
+
+def _separation(ra1, dec1, ra2, dec2):
+    ra1, dec1, ra2, dec2 = (np.radians(x) for x in (ra1, dec1, ra2, dec2))
+    cos = (np.sin(dec1) * np.sin(dec2) +
+           np.cos(dec1) * np.cos(dec2) * np.cos(ra1 - ra2))
+    return np.degrees(np.arccos(np.clip(cos, -1.0, 1.0)))
+
+
+def nearest_neighbour(tiles, ra=None, dec=None):
+    """Orders tiles by always slewing to the closest remaining one
+
+    Useful for irregular sets of tiles, where serpentine() does not apply.
+
+    :param ra: right ascension the mount starts from. Default is the first
+               tile.
+    :param dec: declination the mount starts from
+    """
+    remaining = list(tiles)
+    if not remaining:
+        return []
+    if ra is None:
+        ra, dec = remaining[0].ra, remaining[0].dec
+    ordered = []
+    while remaining:
+        distances = _separation(ra, dec, [t.ra for t in remaining],
+                                [t.dec for t in remaining])
+        tile = remaining.pop(int(np.argmin(distances)))
+        ordered.append(tile)
+        ra, dec = tile.ra, tile.dec
+    return ordered
+
+
+def path_length(tiles):
+    """Total slew distance in degrees going through tiles in order"""
+    if len(tiles) < 2:
+        return 0.0
+    return float(np.sum(_separation([t.ra for t in tiles[:-1]],
+                                    [t.dec for t in tiles[:-1]],
+                                    [t.ra for t in tiles[1:]],
+                                    [t.dec for t in tiles[1:]])))
+
+
+def wait_for_settle(telescope, settle_time=2.0, poll_interval=0.5,
+                    timeout=300.0, sleep=time.sleep, clock=time.monotonic):
+    """Waits for a goto to finish and the mount to stop vibrating
+
+    :param settle_time: seconds waited after the goto finished
+    :return seconds spent waiting
+    :raises MosaicError if the goto did not finish within timeout
+    """
+    started = clock()
+    with tracing.span('wait for settle', 'mount'):
+        while telescope.goto_in_progress():
+            if clock() - started > timeout:
+                raise MosaicError(
+                    'goto did not finish in {}s'.format(timeout))
+            sleep(poll_interval)
+        if settle_time:
+            sleep(settle_time)
+    return clock() - started
+
+
+class Mosaic(object):
+    """Drives the mount and camera through the tiles of a mosaic
+
+    Progress is saved to a checkpoint file after every tile, so running
+    an interrupted mosaic again only takes the missing tiles.
+
+    Written pictures are recorded, with their tile centre, to
+    observing_log, which defaults to the observing log of a
+    LoggingTelescope.
+    """
+
+    # ObservingLog the written pictures are recorded to
+    observing_log = None
+
+    def __init__(self, tiles, checkpoint_filename=None):
+        """
+        :param tiles: tiles in the order they are taken
+        :param checkpoint_filename: JSON file recording the completed tiles
+        """
+        self.tiles = list(tiles)
+        self.checkpoint_filename = checkpoint_filename
+        self.completed = {}
+        if checkpoint_filename and os.path.exists(checkpoint_filename):
+            self._load_checkpoint()
+
+    def _centres(self):
+        return [[t.ra, t.dec] for t in sorted(self.tiles,
+                                              key=lambda t: t.index)]
+
+    def _load_checkpoint(self):
+        with open(self.checkpoint_filename) as f:
+            checkpoint = json.load(f)
+        centres = self._centres()
+        if len(checkpoint['tiles']) != len(centres) or \
+                not np.allclose(checkpoint['tiles'], centres, atol=1e-9):
+            raise MosaicError('{} belongs to a different mosaic'.format(
+                self.checkpoint_filename))
+        self.completed = dict((int(index), files) for index, files in
+                              checkpoint['completed'].items())
+
+    def _save_checkpoint(self):
+        if not self.checkpoint_filename:
+            return
+        centres = self._centres()
+        tmp_filename = self.checkpoint_filename + '.tmp'
+        with open(tmp_filename, 'w') as f:
+            json.dump(dict(tiles=centres, completed=self.completed), f)
+        os.replace(tmp_filename, self.checkpoint_filename)
+
+    def remaining(self):
+        return [t for t in self.tiles if t.index not in self.completed]
+
+    def run(self, telescope, camera, output_directory, exposures=1,
+            filename_format='tile_{row:02d}_{column:02d}_{exposure:02d}',
+            settle_time=2.0, poll_interval=0.5, timeout=300.0,
+            sleep=time.sleep, clock=time.monotonic):
+        """Takes the remaining tiles
+
+        :param telescope: telescope implementing goto_radec and
+                          goto_in_progress
+        :param camera: BaseCamera taking the pictures
+        :param output_directory: directory the pictures are written to
+        :param exposures: pictures taken per tile
+        :param filename_format: name of the pictures, formatted with the
+                                row, column and exposure numbers
+        :param settle_time: seconds waited after each goto before exposing
+        :param sleep: function used to wait, for simulated clocks
+        :param clock: clock used to measure timeouts
+        :return dictionary of tile index -> list of the files written
+        """
+        if not os.path.isdir(output_directory):
+            os.makedirs(output_directory)
+        log = self.observing_log or getattr(telescope, 'observing_log', None)
+        for tile in self.remaining():
+            telescope.goto_radec(SkyCoord(ra=tile.ra * u.deg,
+                                          dec=tile.dec * u.deg))
+            wait_for_settle(telescope, settle_time, poll_interval, timeout,
+                            sleep, clock)
+            files = []
+            for exposure in range(exposures):
+                image = camera.capture_image()
+                data = camera.download_image(image)
+                filename = os.path.join(
+                    output_directory,
+                    filename_format.format(row=tile.row, column=tile.column,
+                                           exposure=exposure) +
+                    camera.image_extension(image))
+                tmp_filename = filename + '.part'
+                with open(tmp_filename, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_filename, filename)
+                files.append(filename)
+                if log is not None:
+                    log.log_frame(filename, camera.exposure, tile.ra,
+                                  tile.dec, getattr(telescope,
+                                                    'observing_target', None))
+            self.completed[tile.index] = files
+            self._save_checkpoint()
+        return self.completed
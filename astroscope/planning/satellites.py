@@ -0,0 +1,323 @@
+import collections
+import math
+import time
+
+import numpy as np
+
+try:
+    from sgp4.api import Satrec
+    from sgp4.api import SatrecArray
+except ImportError:
+    Satrec = SatrecArray = None
+
+Pass = collections.namedtuple('Pass', 'satellite rise culmination set '
+                                      'max_altitude')
+
+# times in unix seconds, az and alt in degrees, rates in arcsec/s
+Track = collections.namedtuple('Track', 'times az alt az_rate alt_rate')
+
+# fastest rate slew_var can send, 16 bits in quarter arcseconds per second
+MAX_VAR_RATE = 16383.75
+
+_WGS84_RADIUS = 6378.137
+_WGS84_FLATTENING = 1 / 298.257223563
+
+
+def load_tles(filename):
+    """Reads a file of two line elements
+
+    Both the three line format, with a name line before each element set,
+    and bare two line element sets are read. Satellites without a name are
+    named after their catalog number.
+
+    :return list of (name, line1, line2)
+    """
+    with open(filename) as f:
+        lines = [line.rstrip() for line in f if line.strip()]
+    tles = []
+    name = None
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith('1 ') and i + 1 < len(lines) and \
+                lines[i + 1].startswith('2 '):
+            tles.append((name or line[2:7].strip(), line, lines[i + 1]))
+            name = None
+            i += 2
+            continue
+        name = line[2:].strip() if line.startswith('0 ') else line.strip()
+        i += 1
+    return tles
+
+
+def _julian_dates(unix_times):
+    """Splits unix times into the whole and fractional julian dates sgp4
+    takes, keeping full precision"""
+    unix_times = np.asarray(unix_times, dtype=float)
+    days = np.floor(unix_times / 86400.0)
+    return days + 2440587.5, (unix_times - days * 86400.0) / 86400.0
+
+
+def _gmst(jd, fr):
+    """Greenwich mean sidereal time in radians, IAU 1982 as used by TEME"""
+    t = (jd - 2451545.0 + fr) / 36525.0
+    seconds = (67310.54841 + (876600.0 * 3600 + 8640184.812866) * t +
+               0.093104 * t ** 2 - 6.2e-6 * t ** 3)
+    return np.radians(np.mod(seconds / 240.0, 360.0))
+
+
+def _observer(lat, lon, height):
+    """Observer position on the WGS84 ellipsoid in km, Earth fixed"""
+    phi, lam = math.radians(lat), math.radians(lon)
+    e2 = _WGS84_FLATTENING * (2 - _WGS84_FLATTENING)
+    n = _WGS84_RADIUS / math.sqrt(1 - e2 * math.sin(phi) ** 2)
+    h = height / 1000.0
+    return np.array([(n + h) * math.cos(phi) * math.cos(lam),
+                     (n + h) * math.cos(phi) * math.sin(lam),
+                     (n * (1 - e2) + h) * math.sin(phi)])
+
+
+def teme_to_azalt(r, jd, fr, lat, lon, height=0.0):
+    """Converts TEME positions to topocentric Horizontal coordinates
+
+    Polar motion and UT1 - UTC are neglected, which moves a low earth
+    orbit satellite by about ten arcseconds.
+
+    :param r: positions in km, shape (..., 3) with time along the axis
+              before the last
+    :param jd: whole julian dates of the positions
+    :param fr: fractions of day of the positions
+    :param lat: latitude of the observer in degrees
+    :param lon: longitude of the observer in degrees
+    :param height: height of the observer in meters
+    :return (az, alt) arrays in degrees
+    """
+    theta = _gmst(jd, fr)
+    cos, sin = np.cos(theta), np.sin(theta)
+    x = cos * r[..., 0] + sin * r[..., 1]
+    y = -sin * r[..., 0] + cos * r[..., 1]
+    observer = _observer(lat, lon, height)
+    dx, dy, dz = x - observer[0], y - observer[1], r[..., 2] - observer[2]
+    phi, lam = math.radians(lat), math.radians(lon)
+    east = -math.sin(lam) * dx + math.cos(lam) * dy
+    north = (-math.sin(phi) * math.cos(lam) * dx -
+             math.sin(phi) * math.sin(lam) * dy + math.cos(phi) * dz)
+    up = (math.cos(phi) * math.cos(lam) * dx +
+          math.cos(phi) * math.sin(lam) * dy + math.sin(phi) * dz)
+    az = np.degrees(np.arctan2(east, north)) % 360.0
+    alt = np.degrees(np.arctan2(up, np.hypot(east, north)))
+    return az, alt
+
+
+def _wrap(degrees):
+    return (degrees + 180.0) % 360.0 - 180.0
+
+
+class PassPredictor(object):
+    """Predicts satellite passes from two line elements, offline
+
+    All satellites are propagated over a time grid with one sgp4 call,
+    then the horizon crossings and culminations found on the grid are
+    refined by bisection and golden section search. Needs the sgp4
+    package.
+    """
+
+    def __init__(self, tles, location):
+        """
+        :param tles: list of (name, line1, line2), see load_tles()
+        :param location: EarthLocation or (lat, lon[, height]) in degrees
+                         and meters
+        """
+        if SatrecArray is None:
+            raise ImportError('PassPredictor needs the sgp4 package. Install '
+                              'it with pip install astroscope[satellites] '
+                              'or pip install sgp4')
+        self.names = [tle[0] for tle in tles]
+        self._satrecs = [Satrec.twoline2rv(tle[1], tle[2]) for tle in tles]
+        self._array = SatrecArray(self._satrecs)
+        if hasattr(location, 'lat'):
+            location = (location.lat.deg, location.lon.deg,
+                        location.height.to_value('m'))
+        location = tuple(float(x) for x in location)
+        self.location = location if len(location) == 3 else \
+            location + (0.0,)
+
+    @classmethod
+    def from_file(cls, filename, location):
+        return cls(load_tles(filename), location)
+
+    def _index(self, satellite):
+        if isinstance(satellite, int):
+            return satellite
+        return self.names.index(satellite)
+
+    def azalt(self, unix_times, satellite=None):
+        """Positions of the satellites at unix_times
+
+        :param satellite: name or index of one satellite. Default is all.
+        :return (az, alt) arrays in degrees, of shape (satellites, times)
+                or (times,) for one satellite. Positions sgp4 could not
+                compute are NaN.
+        """
+        jd, fr = _julian_dates(np.atleast_1d(unix_times))
+        if satellite is None:
+            errors, r, _ = self._array.sgp4(jd, fr)
+        else:
+            errors, r, _ = self._satrecs[self._index(satellite)].sgp4_array(
+                jd, fr)
+        az, alt = teme_to_azalt(r, jd, fr, *self.location)
+        failed = errors != 0
+        az[failed] = np.nan
+        alt[failed] = np.nan
+        return az, alt
+
+    def _altitude(self, index, unix_times, min_altitude):
+        return self.azalt(unix_times, index)[1] - min_altitude
+
+    def _crossings(self, index, lo, hi, min_altitude, tolerance):
+        """Bisects all the horizon crossings of one satellite at once"""
+        lo, hi = np.array(lo, dtype=float), np.array(hi, dtype=float)
+        rising = self._altitude(index, lo, min_altitude) < 0
+        while np.max(hi - lo) > tolerance:
+            middle = (lo + hi) / 2
+            below = self._altitude(index, middle, min_altitude) < 0
+            # the crossing is after middle if middle is still on the side
+            # of lo
+            after = below == rising
+            lo = np.where(after, middle, lo)
+            hi = np.where(after, hi, middle)
+        return (lo + hi) / 2
+
+    def _culminations(self, index, lo, hi, tolerance):
+        """Golden section search of the highest point of several passes"""
+        lo, hi = np.array(lo, dtype=float), np.array(hi, dtype=float)
+        ratio = (math.sqrt(5) - 1) / 2
+        while np.max(hi - lo) > tolerance:
+            a = hi - ratio * (hi - lo)
+            b = lo + ratio * (hi - lo)
+            alt = self.azalt(np.concatenate([a, b]), index)[1]
+            higher_a = alt[:len(a)] > alt[len(a):]
+            hi = np.where(higher_a, b, hi)
+            lo = np.where(higher_a, lo, a)
+        middle = (lo + hi) / 2
+        return middle, self.azalt(middle, index)[1]
+
+    def passes(self, start, duration=86400.0, step=30.0, min_altitude=0.0,
+               tolerance=0.01):
+        """Passes of all satellites above min_altitude
+
+        A pass shorter than step can be missed.
+
+        :param start: unix time the search starts
+        :param duration: seconds searched
+        :param step: seconds between the samples of the grid
+        :param min_altitude: altitude in degrees a pass must be above
+        :param tolerance: precision of the event times in seconds
+        :return list of Pass ordered by culmination. rise or set are None
+                when the satellite is already up at start or still up at
+                the end.
+        """
+        times = start + np.arange(0.0, duration + step, step)
+        _, alt = self.azalt(times)
+        above = np.nan_to_num(alt, nan=-90.0) > min_altitude
+        passes = []
+        for index, name in enumerate(self.names):
+            edges = np.diff(above[index].astype(np.int8))
+            rises = np.flatnonzero(edges == 1)
+            sets = np.flatnonzero(edges == -1)
+            if above[index, 0]:
+                rises = np.concatenate([[-1], rises])
+            if above[index, -1]:
+                sets = np.concatenate([sets, [len(times) - 1]])
+            if not len(rises):
+                continue
+            crossings = [k for k in rises if k >= 0] + \
+                [k for k in sets if k < len(times) - 1]
+            refined = dict(zip(crossings, self._crossings(
+                index, times[crossings], times[np.add(crossings, 1)],
+                min_altitude, tolerance))) if crossings else {}
+            # highest sample of each pass, searched one step around
+            peaks = [r + 1 + int(np.argmax(alt[index, r + 1:s + 1]))
+                     for r, s in zip(rises, sets)]
+            culminations, max_altitudes = self._culminations(
+                index, np.maximum(times[peaks] - step, times[0]),
+                np.minimum(times[peaks] + step, times[-1]), tolerance)
+            for r, s, culmination, max_altitude in zip(
+                    rises, sets, culminations, max_altitudes):
+                passes.append(Pass(
+                    name,
+                    float(refined[r]) if r >= 0 else None,
+                    float(culmination),
+                    float(refined[s]) if s < len(times) - 1 else None,
+                    float(max_altitude)))
+        passes.sort(key=lambda p: p.culmination)
+        return passes
+
+    def track(self, satellite, start, end, step=1.0):
+        """Positions and axis rates to follow a satellite
+
+        :param satellite: name or index of the satellite
+        :param start: unix time the track starts
+        :param end: unix time the track ends
+        :param step: seconds between rows
+        :return Track with rates in arcseconds per second, as taken by
+                slew_var
+        """
+        times = np.arange(start, end + step / 2, step)
+        index = self._index(satellite)
+        az, alt = self.azalt(times, index)
+        # centred differences over one second
+        before_az, before_alt = self.azalt(times - 0.5, index)
+        after_az, after_alt = self.azalt(times + 0.5, index)
+        az_rate = _wrap(after_az - before_az) * 3600.0
+        alt_rate = (after_alt - before_alt) * 3600.0
+        return Track(times, az, alt, az_rate, alt_rate)
+
+
+def follow_track(telescope, track, gain=0.5, sleep=time.sleep,
+                 clock=time.time):
+    """Follows a track with variable rate slews
+
+    The mount is pointed at the start of the track, then every row sends
+    the track's rates plus a correction of gain times the pointing error
+    per step.
+
+    :param telescope: telescope implementing goto_az_alt, goto_in_progress,
+                      get_az_alt and slew_var
+    :param track: Track from PassPredictor.track()
+    :param gain: fraction of the pointing error corrected per step
+    :param sleep: function used to wait, for simulated clocks
+    :param clock: returns the current unix time
+    :return array of the pointing errors in degrees at each row
+    """
+    telescope.goto_az_alt(float(track.az[0]), float(track.alt[0]))
+    while telescope.goto_in_progress():
+        sleep(0.5)
+    if clock() < track.times[0]:
+        sleep(track.times[0] - clock())
+    # azimuths unwrapped so interpolating across north does not swing
+    # around; np.unwrap(period=) needs numpy 1.21
+    track_az = track.az[0] + np.concatenate(
+        ([0.0], np.cumsum(_wrap(np.diff(track.az)))))
+    errors = []
+    for i in range(len(track.times) - 1):
+        now = clock()
+        step = track.times[i + 1] - now
+        if step <= 0:
+            # fell behind, skip to the current row
+            continue
+        target_az = np.interp(now, track.times, track_az) % 360.0
+        target_alt = np.interp(now, track.times, track.alt)
+        az, alt = telescope.get_az_alt()
+        az_error = _wrap(target_az - az)
+        alt_error = target_alt - alt
+        errors.append(math.hypot(az_error * math.cos(math.radians(alt)),
+                                 alt_error))
+        az_rate = track.az_rate[i] + gain * az_error * 3600.0 / step
+        alt_rate = track.alt_rate[i] + gain * alt_error * 3600.0 / step
+        telescope.slew_var(
+            float(np.clip(az_rate, -MAX_VAR_RATE, MAX_VAR_RATE)),
+            float(np.clip(alt_rate, -MAX_VAR_RATE, MAX_VAR_RATE)))
+        sleep(max(0.0, track.times[i + 1] - clock()))
+    telescope.slew_var(0.0, 0.0)
+    return np.array(errors)
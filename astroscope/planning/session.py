@@ -0,0 +1,201 @@
+import collections
+import concurrent.futures
+import math
+import time
+
+import numpy as np
+
+from astroscope import tracing
+from astroscope.planning.mosaic import wait_for_settle
+
+Pointing = collections.namedtuple('Pointing', 'kind a b')
+
+FrameRecord = collections.namedtuple(
+    'FrameRecord', 'index pointing slew_start settled exposure_start '
+                   'exposure_end download_start download_end mount_wait '
+                   'download_wait')
+
+
+def radec(ra, dec):
+    """Pointing to spherical coordinates in degrees"""
+    return Pointing('radec', ra, dec)
+
+
+def azalt(az, alt):
+    """Pointing to Horizontal coordinates in degrees"""
+    return Pointing('azalt', az, alt)
+
+
+def dithered(ra, dec, count, radius=20.0, seed=None):
+    """Pointings randomly offset around ra, dec
+
+    :param count: number of pointings
+    :param radius: largest offset in arcseconds
+    :param seed: seed of the random number generator
+    :return list of radec Pointing
+    """
+    random = np.random.RandomState(seed)
+    distance = radius * np.sqrt(random.uniform(0.0, 1.0, count)) / 3600.0
+    angle = random.uniform(0.0, 2 * np.pi, count)
+    cos_dec = max(math.cos(math.radians(dec)), 1e-6)
+    return [radec((ra + d * math.cos(a) / cos_dec) % 360.0,
+                  dec + d * math.sin(a))
+            for d, a in zip(distance, angle)]
+
+
+class SessionOrchestrator(object):
+    """Overlaps mount slews with camera downloads
+
+    As soon as the shutter closes, the picture is downloaded in the
+    background and the mount starts moving to the next pointing. The next
+    exposure starts when the mount has settled and, unless the camera can
+    expose while downloading, the download finished.
+
+    Every frame is recorded as a FrameRecord. Its mount_wait and
+    download_wait are the dead time between the end of the previous
+    exposure and the start of this one, split by what was waited for.
+
+    Downloaded frames are recorded, with their pointing and the filename
+    the consumer returns, to observing_log, which defaults to the observing
+    log of a LoggingTelescope. Frames are recorded once the consumer
+    returns, so the file is written; without a consumer returning a
+    filename the frame has no file.
+    """
+
+    # ObservingLog the downloaded frames are recorded to
+    observing_log = None
+
+    def __init__(self, telescope, camera, consumer=None, settle_time=1.0,
+                 poll_interval=0.2, timeout=300.0,
+                 expose_while_downloading=False, sleep=time.sleep,
+                 clock=time.monotonic):
+        """
+        :param telescope: telescope implementing goto_ra_dec, goto_az_alt
+                          and goto_in_progress
+        :param camera: BaseCamera taking the pictures
+        :param consumer: called with (index, data) for every downloaded
+                         picture, in the download thread. It may return
+                         the filename the picture was saved to.
+        :param settle_time: seconds waited after each goto before exposing
+        :param expose_while_downloading: the camera can start an exposure
+                                         before the previous download ends
+        :param sleep: function used to wait for the mount
+        :param clock: monotonic clock
+        """
+        self.telescope = telescope
+        self.camera = camera
+        self.consumer = consumer
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.expose_while_downloading = expose_while_downloading
+        self.sleep = sleep
+        self.clock = clock
+        self.records = []
+
+    def _goto(self, pointing):
+        if pointing.kind == 'radec':
+            self.telescope.goto_ra_dec(pointing.a, pointing.b)
+        elif pointing.kind == 'azalt':
+            self.telescope.goto_az_alt(pointing.a, pointing.b)
+        else:
+            raise ValueError('unknown pointing {}'.format(pointing.kind))
+        return self.clock()
+
+    def _log_frame(self, pointing, exposure, filename):
+        log = self.observing_log or getattr(self.telescope, 'observing_log',
+                                            None)
+        if log is None:
+            return
+        ra, dec = (pointing.a, pointing.b) if pointing.kind == 'radec' \
+            else (None, None)
+        log.log_frame(filename, exposure, ra, dec,
+                      getattr(self.telescope, 'observing_target', None))
+
+    def _download(self, index, image, pointing=None, exposure=None):
+        started = self.clock()
+        with tracing.span('camera download', 'camera', frame=index):
+            data = self.camera.download_image(image)
+        filename = None
+        if self.consumer is not None:
+            filename = self.consumer(index, data)
+        if pointing is not None:
+            self._log_frame(pointing, exposure, filename)
+        return started, self.clock()
+
+    def run(self, pointings):
+        """Takes one picture at each pointing
+
+        :param pointings: sequence of Pointing, see radec(), azalt() and
+                          dithered()
+        :return list of FrameRecord
+        """
+        pointings = list(pointings)
+        if not pointings:
+            return []
+        executor = concurrent.futures.ThreadPoolExecutor(1)
+        downloads = []
+        records = []
+        try:
+            slew_start = self._goto(pointings[0])
+            previous_end = None
+            for index, pointing in enumerate(pointings):
+                wait_for_settle(self.telescope, self.settle_time,
+                                self.poll_interval, self.timeout, self.sleep,
+                                self.clock)
+                settled = self.clock()
+                if downloads and not self.expose_while_downloading:
+                    with tracing.span('wait for download', 'camera'):
+                        downloads[-1].result()
+                exposure_start = self.clock()
+                with tracing.span('exposure', 'camera', frame=index):
+                    image = self.camera.wait_for_exposure(
+                        self.camera.trigger())
+                exposure_end = self.clock()
+                downloads.append(executor.submit(
+                    self._download, index, image, pointing,
+                    exposure_end - exposure_start))
+                # the mount moves on while the picture downloads
+                next_slew_start = None
+                if index + 1 < len(pointings):
+                    next_slew_start = self._goto(pointings[index + 1])
+                if previous_end is None:
+                    mount_wait = settled - slew_start
+                else:
+                    mount_wait = max(0.0, settled - previous_end)
+                records.append([index, pointing, slew_start, settled,
+                                exposure_start, exposure_end, None, None,
+                                mount_wait, exposure_start - settled])
+                previous_end = exposure_end
+                slew_start = next_slew_start
+            for record, download in zip(records, downloads):
+                record[6], record[7] = download.result()
+        finally:
+            executor.shutdown(wait=True)
+        self.records = [FrameRecord(*record) for record in records]
+        return self.records
+
+    def statistics(self):
+        """Dead time accounting of the last run
+
+        dead_time is the time spent not exposing, from the first slew to
+        the last download. sequential_dead_time is what the same slews,
+        settles and downloads would have cost done one after the other.
+
+        :return dictionary of durations in seconds
+        """
+        records = self.records
+        if not records:
+            return {}
+        exposure = sum(r.exposure_end - r.exposure_start for r in records)
+        downloads = sum(r.download_end - r.download_start for r in records)
+        slews = sum(r.settled - r.slew_start for r in records)
+        total = records[-1].download_end - records[0].slew_start
+        # everything but exposing, including the last download
+        dead = total - exposure
+        return dict(frames=len(records), total=total, exposure=exposure,
+                    dead_time=dead,
+                    mount_wait=sum(r.mount_wait for r in records),
+                    download_wait=sum(r.download_wait for r in records),
+                    sequential_dead_time=slews + downloads,
+                    saved=slews + downloads - dead)
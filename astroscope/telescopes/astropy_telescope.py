@@ -1,10 +1,25 @@
-from astropy.coordinates import SkyCoord
+import functools
+import time
+
 from astropy import units as u
 from astropy.time import Time
 from astropy.coordinates import EarthLocation
 
+from astroscope import tracing
+from astroscope.planning.horizon import VisibilityIndex
+from astroscope.telescopes.positions import HorizontalPosition
+
+
+def _earth_location(latitude, longitude):
+    return EarthLocation(lat=latitude * u.deg, lon=longitude * u.deg)
+
+
 class AstropyTelescope(object):
 
+    # HorizonMask of the obstructions around the telescope
+    horizon = None
+
+    @tracing.traced(category='astropy')
     def get_time(self):
         """Get astropy Time object based on telescope settings
         
@@ -15,30 +30,79 @@ class AstropyTelescope(object):
         return Time(self.get_time_initializer(),
                     location=self.get_earth_location())
 
+    @tracing.traced(category='astropy')
     def get_earth_location(self):
         """Returns astropy EarthLocation object of telescope
 
         :return astropy EarthLocation object
         """
         latitude, longitude = self.get_location_lat_long()
-        return EarthLocation(lat=latitude * u.deg, lon=longitude * u.deg)
+        return _earth_location(latitude, longitude)
 
+    @tracing.traced(category='astropy')
     def get_azalt(self):
-        """Returns Horizontal SkyCoord telescope is pointing to
+        """Returns Horizontal coordinates telescope is pointing to
 
-         :return Astropy Horizontal SkyCoord
-         """
+        The telescope's position and location are both queried here, in
+        the calling thread and in this order, so no serial command is sent
+        later from whichever thread first uses the result. Only the
+        EarthLocation and the SkyCoord are built when an astropy attribute
+        of the result is used, so reading az.deg and alt.deg costs no
+        astropy work.
+
+        :return HorizontalPosition, usable as an Astropy Horizontal SkyCoord
+        """
         _az, _alt = self.get_az_alt()
-        _altaz = SkyCoord(alt=_alt * u.deg,
-                          az=_az * u.deg,
-                          frame='altaz',
-                          obstime=Time.now(),
-                          location=self.get_earth_location())
-        return _altaz
+        latitude, longitude = self.get_location_lat_long()
+        return HorizontalPosition(_az, _alt, time.time(),
+                                  functools.partial(_earth_location,
+                                                    latitude, longitude))
 
+    @tracing.traced(category='astropy')
     def goto_azalt(self, altaz):
         """Points telescope to given Horizontal SkyCoord coordinates
         
         :param altaz: astropy SkyCoordinate object representing the coordinates
         """
         self.goto_az_alt(altaz.az.degree, altaz.alt.degree)
+
+    def get_radec_future(self, transform_service, location=None):
+        """Reads Horizontal coordinates and converts them in the background
+
+        The telescope is queried in the calling thread, the conversion to
+        ICRS is done by transform_service so the caller does not wait for it.
+
+        :param transform_service: TransformService doing the conversion
+        :param location: (lat, lon) of the telescope. Queried from the
+                         telescope if not given.
+        :return future resolving to (ra, dec) in degrees
+        """
+        _az, _alt = self.get_az_alt()
+        if location is None:
+            location = self.get_location_lat_long()
+        return transform_service.submit(_az, _alt, location)
+
+    @tracing.traced(category='astropy')
+    def visibility_index(self, targets, duration=12 * 3600.0, step=300.0,
+                         min_altitude=0.0):
+        """Computes when targets are above the horizon of the telescope
+
+        The index starts at the telescope's time and uses its location and
+        horizon.
+
+        :param targets: dictionary of name -> (ra, dec) in degrees
+        :param duration: seconds covered by the index
+        :return VisibilityIndex
+        """
+        return VisibilityIndex.build(targets, self.get_earth_location(),
+                                     self.get_time().unix, duration, step,
+                                     self.horizon, min_altitude)
+
+    @tracing.traced(category='astropy')
+    def goto_body(self, body, ephemeris):
+        """Points telescope to a solar system body
+
+        :param body: name of the body, for example 'moon'
+        :param ephemeris: EphemerisCache covering the current time
+        """
+        self.goto_radec(ephemeris.skycoord(body, time.time()))
@@ -0,0 +1,172 @@
+import concurrent.futures
+import threading
+import time
+
+import numpy as np
+from astropy import units as u
+from astropy.coordinates import EarthLocation
+from astropy.coordinates import SkyCoord
+from astropy.time import Time
+
+
+def altaz_to_icrs(az, alt, unix_times, lat, lon, height=0.0):
+    """Converts arrays of Horizontal coordinates to ICRS in one call
+
+    Module level so it can be sent to worker processes.
+
+    :param az: azimuths in degrees
+    :param alt: altitudes in degrees
+    :param unix_times: observation times as unix timestamps
+    :param lat: latitude of the observer in degrees
+    :param lon: longitude of the observer in degrees
+    :param height: height of the observer in meters
+    :return (ra, dec) arrays in degrees
+    """
+    location = EarthLocation(lat=lat * u.deg, lon=lon * u.deg,
+                             height=height * u.m)
+    _altaz = SkyCoord(az=np.asarray(az, dtype=float) * u.deg,
+                      alt=np.asarray(alt, dtype=float) * u.deg,
+                      frame='altaz',
+                      obstime=Time(np.asarray(unix_times, dtype=float),
+                                   format='unix'),
+                      location=location)
+    _radec = _altaz.transform_to('icrs')
+    return _radec.ra.deg, _radec.dec.deg
+
+
+class TransformService(object):
+    """Converts Horizontal coordinates to ICRS outside the calling thread
+
+    Samples submitted one at a time are collected into batches, which are
+    converted with a single vectorized astropy call in a worker process.
+    Submitting only queues the sample and returns a future, so a serial
+    polling loop keeps its cadence while coordinates are computed.
+    """
+
+    def __init__(self, executor=None, max_workers=1, batch_size=64,
+                 max_delay=0.05):
+        """
+        :param executor: concurrent.futures executor running the
+                         transforms. Default is a ProcessPoolExecutor.
+        :param max_workers: workers of the default executor
+        :param batch_size: number of queued samples which triggers a batch
+        :param max_delay: longest time in seconds a sample waits for its
+                          batch to fill up
+        """
+        if executor is None:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers)
+        self._executor = executor
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._condition = threading.Condition()
+        self._pending = {}
+        self._pending_count = 0
+        self._oldest = None
+        self._closed = False
+        self._batcher = threading.Thread(target=self._run,
+                                         name='transform-batcher')
+        self._batcher.daemon = True
+        self._batcher.start()
+
+    @staticmethod
+    def _location_key(location):
+        if hasattr(location, 'lat'):
+            return (location.lat.deg, location.lon.deg,
+                    location.height.to(u.m).value)
+        location = tuple(float(x) for x in location)
+        return location if len(location) == 3 else location + (0.0,)
+
+    def submit(self, az, alt, location, obstime=None):
+        """Queues one Horizontal coordinate for conversion
+
+        :param az: azimuth in degrees
+        :param alt: altitude in degrees
+        :param location: EarthLocation or (lat, lon[, height]) in degrees
+                         and meters
+        :param obstime: unix time of the sample. Default is now.
+        :return future resolving to (ra, dec) in degrees
+        """
+        future = concurrent.futures.Future()
+        if obstime is None:
+            obstime = time.time()
+        key = self._location_key(location)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('TransformService is shut down')
+            self._pending.setdefault(key, []).append(
+                (float(az), float(alt), float(obstime), future))
+            self._pending_count += 1
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self._condition.notify()
+        return future
+
+    def submit_many(self, az, alt, location, obstimes):
+        """Converts arrays of samples as one batch
+
+        :return future resolving to (ra, dec) arrays in degrees
+        """
+        lat, lon, height = self._location_key(location)
+        return self._executor.submit(altaz_to_icrs, az, alt, obstimes,
+                                     lat, lon, height)
+
+    def flush(self):
+        """Sends all queued samples to the workers without waiting"""
+        with self._condition:
+            batches = self._take_pending()
+        self._dispatch(batches)
+
+    def _take_pending(self):
+        batches, self._pending = self._pending, {}
+        self._pending_count = 0
+        self._oldest = None
+        return batches
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed and self._oldest is None:
+                    self._condition.wait()
+                while (not self._closed and self._oldest is not None and
+                       self._pending_count < self.batch_size):
+                    remaining = self._oldest + self.max_delay - \
+                                time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batches = self._take_pending()
+                closed = self._closed
+            self._dispatch(batches)
+            if closed:
+                return
+
+    def _dispatch(self, batches):
+        for (lat, lon, height), samples in batches.items():
+            az, alt, obstimes, futures = zip(*samples)
+            try:
+                job = self._executor.submit(altaz_to_icrs, az, alt, obstimes,
+                                            lat, lon, height)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            job.add_done_callback(
+                lambda job, futures=futures: self._resolve(job, futures))
+
+    @staticmethod
+    def _resolve(job, futures):
+        if job.exception() is not None:
+            for future in futures:
+                future.set_exception(job.exception())
+            return
+        ra, dec = job.result()
+        for i, future in enumerate(futures):
+            future.set_result((float(ra[i]), float(dec[i])))
+
+    def shutdown(self, wait=True):
+        """Converts the samples still queued and stops the service"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._batcher.join()
+        self._executor.shutdown(wait=wait)
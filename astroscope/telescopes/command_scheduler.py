@@ -0,0 +1,256 @@
+import heapq
+import itertools
+import threading
+import time
+
+from astroscope.telescopes.nextstar_telescopes import NexStarSLT130
+
+EMERGENCY = 0
+MOTION = 1
+GUIDING = 2
+TELEMETRY = 3
+HOUSEKEEPING = 4
+
+CLASS_NAMES = ('emergency', 'motion', 'guiding', 'telemetry', 'housekeeping')
+
+# seconds a command of each class may wait before it is late
+DEFAULT_DEADLINES = {EMERGENCY: 0.05, MOTION: 0.25, GUIDING: 0.5,
+                     TELEMETRY: 2.0, HOUSEKEEPING: 10.0}
+
+# (commands per second, burst) allowed for the low priority classes
+DEFAULT_RATE_LIMITS = {TELEMETRY: (10.0, 5), HOUSEKEEPING: (2.0, 2)}
+
+# first character of a NexStar command -> priority class
+_COMMAND_CLASSES = {
+    'M': EMERGENCY,
+    'b': MOTION, 'B': MOTION, 'r': MOTION, 'R': MOTION, 's': MOTION,
+    'S': MOTION, 'T': MOTION,
+    'e': TELEMETRY, 'E': TELEMETRY, 'z': TELEMETRY, 'Z': TELEMETRY,
+    'L': TELEMETRY, 't': TELEMETRY, 'J': TELEMETRY,
+}
+
+# variable rate slews are what the guider sends
+_VARIABLE_SLEW = 'P' + chr(3)
+_FIXED_SLEW = 'P' + chr(2)
+
+
+def classify(command):
+    """Priority class of a NexStar command
+
+    Variable rate slews are guide corrections and fixed rate slews are
+    motion. Commands not known otherwise are housekeeping.
+    """
+    if command.startswith(_VARIABLE_SLEW):
+        return GUIDING
+    if command.startswith(_FIXED_SLEW):
+        return MOTION
+    return _COMMAND_CLASSES.get(command[:1], HOUSEKEEPING)
+
+
+class _TokenBucket(object):
+
+    def __init__(self, rate, burst, now):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = now
+
+    def _refill(self, now):
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until a token is available"""
+        self._refill(now)
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1.0
+
+
+class CommandScheduler(object):
+    """Orders commands from several threads sharing one telescope
+
+    Only one command runs at a time. When it finishes, the next one is the
+    waiting command of the most urgent priority class, and within a class
+    the one with the earliest deadline. Telemetry and housekeeping are rate
+    limited, so a burst of status polls cannot delay a cancel or a guide
+    correction by more than the command already on the wire.
+
+    Commands run in the calling thread; a caller blocks until its turn
+    comes and gets the result or the exception of its command.
+    """
+
+    def __init__(self, deadlines=None, rate_limits=None,
+                 clock=time.monotonic):
+        """
+        :param deadlines: dictionary of class -> seconds a command may
+                          wait, default DEFAULT_DEADLINES
+        :param rate_limits: dictionary of class -> (commands per second,
+                            burst), default DEFAULT_RATE_LIMITS
+        :param clock: monotonic clock
+        """
+        self.deadlines = dict(DEFAULT_DEADLINES)
+        self.deadlines.update(deadlines or {})
+        if rate_limits is None:
+            rate_limits = DEFAULT_RATE_LIMITS
+        self.clock = clock
+        now = clock()
+        self._buckets = dict((priority, _TokenBucket(rate, burst, now))
+                             for priority, (rate, burst)
+                             in rate_limits.items())
+        self._condition = threading.Condition()
+        self._queues = [[] for _ in CLASS_NAMES]
+        self._sequence = itertools.count()
+        self._busy = False
+        self._local = threading.local()
+        self._statistics = [dict(count=0, delay=0.0, max_delay=0.0, late=0)
+                            for _ in CLASS_NAMES]
+
+    def _next(self, now):
+        """Most urgent entry allowed to run now
+
+        :return (entry, wait) where entry is None and wait the seconds
+                until a rate limited entry may run, if none can run now
+        """
+        wait = None
+        for priority, waiting in enumerate(self._queues):
+            if not waiting:
+                continue
+            bucket = self._buckets.get(priority)
+            if bucket is not None:
+                bucket_wait = bucket.wait_time(now)
+                if bucket_wait > 0:
+                    wait = bucket_wait if wait is None else \
+                        min(wait, bucket_wait)
+                    continue
+            return waiting[0], None
+        return None, wait
+
+    def run(self, priority, function, deadline=None):
+        """Runs function when its turn comes
+
+        :param priority: one of EMERGENCY, MOTION, GUIDING, TELEMETRY and
+                         HOUSEKEEPING
+        :param function: callable sending the command
+        :param deadline: seconds the command may wait. Default is the
+                         deadline of its class.
+        :return what function returns
+        """
+        if getattr(self._local, 'running', False):
+            # a command sending commands itself already has the line
+            return function()
+        if deadline is None:
+            deadline = self.deadlines[priority]
+        with self._condition:
+            queued = self.clock()
+            entry = (queued + deadline, next(self._sequence), priority)
+            heapq.heappush(self._queues[priority], entry)
+            while True:
+                if not self._busy:
+                    now = self.clock()
+                    head, wait = self._next(now)
+                    if head is entry:
+                        break
+                    if head is not None:
+                        # another command goes first, let it know
+                        self._condition.notify_all()
+                        wait = None
+                else:
+                    wait = None
+                self._condition.wait(wait)
+            heapq.heappop(self._queues[priority])
+            bucket = self._buckets.get(priority)
+            if bucket is not None:
+                bucket.take(now)
+            self._busy = True
+            self._record(priority, now - queued, now > entry[0])
+        self._local.running = True
+        try:
+            return function()
+        finally:
+            self._local.running = False
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
+
+    def _record(self, priority, delay, late):
+        statistics = self._statistics[priority]
+        statistics['count'] += 1
+        statistics['delay'] += delay
+        statistics['max_delay'] = max(statistics['max_delay'], delay)
+        statistics['late'] += int(late)
+
+    def waiting(self):
+        """Number of commands waiting per class name"""
+        with self._condition:
+            return dict((name, len(self._queues[priority]))
+                        for priority, name in enumerate(CLASS_NAMES))
+
+    def statistics(self):
+        """Queueing delay per class
+
+        :return dictionary of class name -> dict(count, mean_delay,
+                max_delay, late) with delays in seconds. late counts the
+                commands which started after their deadline.
+        """
+        with self._condition:
+            summary = {}
+            for priority, name in enumerate(CLASS_NAMES):
+                statistics = self._statistics[priority]
+                if not statistics['count']:
+                    continue
+                summary[name] = dict(
+                    count=statistics['count'],
+                    mean_delay=statistics['delay'] / statistics['count'],
+                    max_delay=statistics['max_delay'],
+                    late=statistics['late'])
+            return summary
+
+
+class ScheduledTelescope(object):
+    """Telescope mixin sending its commands through a CommandScheduler
+
+    Every command is classified with classify(), so a cancel_goto() from
+    one thread goes ahead of the position polls of another.
+    """
+
+    command_scheduler = None
+
+    def _send_command_and_validate_response(self, command,
+                                            expected_response_length=0):
+        send = super(ScheduledTelescope, self).\
+            _send_command_and_validate_response
+        if self.command_scheduler is None:
+            return send(command, expected_response_length)
+        return self.command_scheduler.run(
+            classify(command),
+            lambda: send(command, expected_response_length))
+
+    def get_location_lat_long(self):
+        # sends its command without _send_command_and_validate_response
+        get_location = super(ScheduledTelescope, self).get_location_lat_long
+        if self.command_scheduler is None:
+            return get_location()
+        return self.command_scheduler.run(HOUSEKEEPING, get_location)
+
+    def _get_time(self):
+        get_time = super(ScheduledTelescope, self)._get_time
+        if self.command_scheduler is None:
+            return get_time()
+        return self.command_scheduler.run(HOUSEKEEPING, get_time)
+
+
+class ScheduledNexStarSLT130(ScheduledTelescope, NexStarSLT130):
+
+    def __init__(self, device, serial_port=None, command_scheduler=None):
+        """
+        :param command_scheduler: scheduler shared by the callers. Default
+                                  is a new CommandScheduler.
+        """
+        super(ScheduledNexStarSLT130, self).__init__(device, serial_port)
+        self.command_scheduler = command_scheduler or CommandScheduler()
@@ -0,0 +1,200 @@
+import numpy as np
+
+_HEX_DIGITS = np.array([ord(c) for c in '0123456789ABCDEF'], dtype=np.uint32)
+_HEX_VALUES = np.full(128, -1, dtype=np.int64)
+_HEX_VALUES[[ord(c) for c in '0123456789']] = np.arange(10)
+_HEX_VALUES[[ord(c) for c in 'ABCDEF']] = np.arange(10, 16)
+_HEX_VALUES[[ord(c) for c in 'abcdef']] = np.arange(10, 16)
+_SEPARATORS = str.maketrans({':': ' ', 'h': ' ', 'm': ' ', 's': ' ',
+                             'd': ' ', u'\xb0': ' ', "'": ' ', '"': ' ',
+                             ',': ' '})
+
+
+def wrap_degrees(degrees, correction=0.0):
+    """Adds correction to degrees and wraps the result into [0, 360)"""
+    return np.mod(np.asarray(degrees, dtype=float) + correction, 360.0)
+
+
+def _characters(strings):
+    """Returns the characters of equal length strings as integers
+
+    :param strings: sequence of str or bytes
+    :return array of shape (n, length)
+    """
+    if not isinstance(strings, np.ndarray) and len(strings) and \
+            isinstance(strings[0], bytes):
+        length = len(strings[0])
+        return np.frombuffer(b''.join(strings), dtype=np.uint8).reshape(
+            -1, length)
+    strings = np.asarray(strings)
+    if strings.dtype.kind == 'S':
+        return strings.reshape(-1).view(np.uint8).reshape(
+            -1, strings.dtype.itemsize)
+    length = strings.dtype.itemsize // 4
+    return strings.reshape(-1).view(np.uint32).reshape(-1, length)
+
+
+def _strings(characters):
+    """Inverse of _characters"""
+    characters = np.ascontiguousarray(characters, dtype=np.uint32)
+    return characters.view('<U%d' % characters.shape[1]).reshape(-1)
+
+
+def _decimal_digits(values, width):
+    """Code points of the width last decimal digits of integer values"""
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    return (values[:, None] // powers % 10 + ord('0')).astype(np.uint32)
+
+
+def degrees_to_hex(degrees, digits=8):
+    """Encodes angles as hex fractions of a revolution
+
+    Array version of
+    NexStarSLT130._convert_degrees_to_percentage_of_revolution_in_hex.
+    Angles are wrapped into [0, 360) first, so 360 encodes as 0.
+
+    :param degrees: array of angles in degrees
+    :param digits: number of hex digits, 8 for precise commands and 4 for
+                   the low precision ones
+    :return array of strings
+    """
+    revolution = 16 ** digits
+    values = np.round(np.mod(np.asarray(degrees, dtype=float).ravel(),
+                             360.0) / 360.0 * revolution).astype(np.int64)
+    values %= revolution
+    shifts = 4 * np.arange(digits - 1, -1, -1, dtype=np.int64)
+    return _strings(_HEX_DIGITS[(values[:, None] >> shifts) & 0xF])
+
+
+def hex_to_degrees(strings):
+    """Decodes hex fractions of a revolution into angles in degrees
+
+    Array version of
+    NexStarSLT130._convert_hex_percentage_of_revolution_to_degrees. All
+    strings must have the same number of digits.
+
+    :param strings: array of str or bytes
+    :return array of angles in degrees
+    """
+    characters = _characters(strings)
+    values = _HEX_VALUES[np.minimum(characters, 127)]
+    if np.any(values < 0):
+        raise ValueError('invalid hex digit')
+    digits = characters.shape[1]
+    powers = 16 ** np.arange(digits - 1, -1, -1, dtype=np.int64)
+    return values.dot(powers) / float(16 ** digits) * 360.0
+
+
+def decode_positions(response):
+    """Decodes a NexStar position response of any number of positions
+
+    :param response: bytes like b'34AB0500,12CE0500#' as returned by the
+                     'e' and 'z' commands
+    :return array of angles in degrees
+    """
+    fields = response.rstrip(b'#').split(b',')
+    return hex_to_degrees(np.array(fields))
+
+
+def _sexagesimal(values, precision, wrap=None):
+    """Splits values into sign and integer units, minutes, seconds
+
+    Rounding is done on the smallest printed unit, with the carries
+    propagated, so 59.9999 seconds never prints as 60.
+
+    :param wrap: units the rounded values wrap at, like 24 hours
+    """
+    values = np.asarray(values, dtype=float).ravel()
+    scale = 10 ** precision
+    total = np.round(np.abs(values) * 3600 * scale).astype(np.int64)
+    if wrap is not None:
+        total %= wrap * 3600 * scale
+    fraction = total % scale
+    seconds = total // scale
+    return (values < 0, seconds // 3600, seconds // 60 % 60, seconds % 60,
+            fraction)
+
+
+def _format_sexagesimal(values, precision, unit_digits, separators, sign,
+                        wrap=None):
+    negative, units, minutes, seconds, fraction = _sexagesimal(
+        values, precision, wrap)
+    n = len(units)
+    # widen the units field rather than drop digits, as '%02d' would
+    if n:
+        unit_digits = max(unit_digits, len(str(int(units.max()))))
+    columns = []
+    if sign:
+        columns.append(np.where(negative, ord('-'), ord('+'))[:, None])
+    columns.append(_decimal_digits(units, unit_digits))
+    columns.append(np.full((n, 1), ord(separators[0])))
+    columns.append(_decimal_digits(minutes, 2))
+    columns.append(np.full((n, 1), ord(separators[1])))
+    columns.append(_decimal_digits(seconds, 2))
+    if precision:
+        columns.append(np.full((n, 1), ord('.')))
+        columns.append(_decimal_digits(fraction, precision))
+    if len(separators) > 2:
+        columns.append(np.full((n, 1), ord(separators[2])))
+    return _strings(np.concatenate(columns, axis=1))
+
+
+def format_dms(degrees, precision=0, degree_digits=2, separators='::',
+               sign=True):
+    """Formats angles as [+-]DD:MM:SS[.sss]
+
+    :param degrees: array of angles in degrees
+    :param precision: decimals of the seconds
+    :param degree_digits: minimum digits of the degrees, 3 for azimuths.
+                          All strings get more digits when an angle
+                          needs them, like 123.5 with the default.
+    :param separators: characters following the degrees, the minutes and
+                       optionally the seconds
+    :param sign: always print the sign, otherwise it is dropped
+    :return array of strings
+    """
+    return _format_sexagesimal(degrees, precision, degree_digits, separators,
+                               sign)
+
+
+def format_hms(degrees, precision=1, separators='::'):
+    """Formats right ascensions in degrees as HH:MM:SS[.s]
+
+    Right ascensions are wrapped into [0, 360) first.
+    """
+    hours = np.mod(np.asarray(degrees, dtype=float), 360.0) / 15.0
+    return _format_sexagesimal(hours, precision, 2, separators, False,
+                               wrap=24)
+
+
+def parse_dms(strings):
+    """Parses sexagesimal strings into decimal values
+
+    Accepts "D:M:S", "D M S", "DdMmSs" or "D°M'S\"" with optional
+    sign and decimals on any field. Missing fields count as 0, so "D:M"
+    and "D" are accepted too.
+
+    :param strings: sequence of strings
+    :return array of values in the unit of the first field
+    """
+    text = '\n'.join(strings).translate(_SEPARATORS)
+    counts = np.fromiter(map(len, map(str.split, text.split('\n'))),
+                         dtype=np.int64, count=len(strings))
+    tokens = np.array(text.split(), dtype=float)
+    fields = np.zeros((len(counts), 3))
+    rows = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    columns = np.arange(len(tokens)) - np.repeat(starts, counts)
+    if np.any(columns > 2):
+        raise ValueError('more than 3 fields in a sexagesimal string')
+    fields[rows, columns] = tokens
+    # the sign is on the first field, including -0 as in "-0:30:00"
+    negative = np.signbit(fields[:, 0])
+    fields = np.abs(fields)
+    values = fields[:, 0] + fields[:, 1] / 60.0 + fields[:, 2] / 3600.0
+    return np.where(negative, -values, values)
+
+
+def parse_hms(strings):
+    """Parses right ascensions in hours into degrees"""
+    return parse_dms(strings) * 15.0
@@ -0,0 +1,207 @@
+import collections
+import concurrent.futures
+import time
+
+from astroscope.telescopes.nextstar_telescopes import NexStarSLT130
+
+
+class FleetResult(object):
+    """Outcome of an operation executed on several telescopes
+
+    results, errors and latencies are dictionaries keyed by telescope name.
+    A telescope appears in either results or errors, never both.
+    """
+
+    def __init__(self, results, errors, latencies, elapsed):
+        self.results = results
+        self.errors = errors
+        self.latencies = latencies
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    @property
+    def slowest(self):
+        """Name of the telescope which took the longest to answer"""
+        if not self.latencies:
+            return None
+        return max(self.latencies, key=self.latencies.get)
+
+    @property
+    def sequential_latency(self):
+        """Time the operation would have taken running one mount at a time"""
+        return sum(self.latencies.values())
+
+    def __repr__(self):
+        return ('FleetResult(ok={}, elapsed={:.3f}s, '
+                'sequential={:.3f}s)'.format(self.ok, self.elapsed,
+                                             self.sequential_latency))
+
+
+class TelescopeFleet(object):
+    """Operates several telescopes concurrently
+
+    Every telescope gets its own single worker thread, which acts as the
+    telescope's command queue: commands for one mount run in the order
+    they were submitted, while different mounts run in parallel. A fleet
+    wide operation therefore takes as long as the slowest mount.
+    """
+
+    def __init__(self, devices=(), telescopes=None,
+                 telescope_class=NexStarSLT130, timeout=30.0):
+        """
+        :param devices: serial devices of the telescopes, either a list or
+                        a dictionary of name -> device
+        :param telescopes: dictionary of name -> already created telescopes
+        :param telescope_class: class used to create the telescopes
+                                attached to devices
+        :param timeout: default time in seconds to wait for an operation
+        """
+        self.timeout = timeout
+        self._telescopes = collections.OrderedDict()
+        if not hasattr(devices, 'items'):
+            devices = collections.OrderedDict((d, d) for d in devices)
+        for name, device in devices.items():
+            self._telescopes[name] = telescope_class(device)
+        for name, telescope in (telescopes or {}).items():
+            self._telescopes[name] = telescope
+        self._queues = dict(
+            (name, concurrent.futures.ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='fleet-' + str(name)))
+            for name in self._telescopes)
+
+    def __len__(self):
+        return len(self._telescopes)
+
+    def __getitem__(self, name):
+        return self._telescopes[name]
+
+    @property
+    def names(self):
+        return list(self._telescopes)
+
+    def submit(self, name, method, *args, **kwargs):
+        """Queues a call of method on telescope name
+
+        :param name: name of the telescope
+        :param method: name of the telescope method or a callable taking
+                       the telescope as first argument
+        :return future resolving to (result, latency in seconds). The
+                latency includes the time spent waiting in the queue.
+        """
+        telescope = self._telescopes[name]
+        if callable(method):
+            call = lambda: method(telescope, *args, **kwargs)
+        else:
+            call = lambda: getattr(telescope, method)(*args, **kwargs)
+        submitted = time.perf_counter()
+
+        def timed_call():
+            result = call()
+            return result, time.perf_counter() - submitted
+        return self._queues[name].submit(timed_call)
+
+    def broadcast(self, method, *args, **kwargs):
+        """Calls method on all (or some) telescopes in parallel
+
+        Accepts the keyword arguments ``names``, selecting the telescopes
+        to use, and ``timeout``. Everything else is passed to method.
+
+        A telescope which does not answer within timeout is reported in
+        the errors of the result. Its call is not interrupted, so later
+        commands for that telescope queue behind it.
+
+        :return FleetResult
+        """
+        names = kwargs.pop('names', None) or self.names
+        timeout = kwargs.pop('timeout', self.timeout)
+        start = time.perf_counter()
+        futures = dict((name, self.submit(name, method, *args, **kwargs))
+                       for name in names)
+        concurrent.futures.wait(futures.values(), timeout=timeout)
+        results, errors, latencies = {}, {}, {}
+        for name, future in futures.items():
+            if not future.done():
+                errors[name] = concurrent.futures.TimeoutError(
+                    '{} did not answer within {}s'.format(name, timeout))
+                latencies[name] = time.perf_counter() - start
+            elif future.exception() is not None:
+                errors[name] = future.exception()
+                latencies[name] = time.perf_counter() - start
+            else:
+                results[name], latencies[name] = future.result()
+        return FleetResult(results, errors, latencies,
+                           time.perf_counter() - start)
+
+    def goto_ra_dec(self, ra, dec, **kwargs):
+        """Points all telescopes to the same spherical coordinates"""
+        return self.broadcast('goto_ra_dec', ra, dec, **kwargs)
+
+    def goto_az_alt(self, az, alt, **kwargs):
+        """Points all telescopes to the same Horizontal coordinates"""
+        return self.broadcast('goto_az_alt', az, alt, **kwargs)
+
+    def cancel_goto(self, **kwargs):
+        return self.broadcast('cancel_goto', **kwargs)
+
+    def goto_in_progress(self, **kwargs):
+        return self.broadcast('goto_in_progress', **kwargs)
+
+    @staticmethod
+    def _snapshot(telescope):
+        return {'az_alt': telescope.get_az_alt(),
+                'ra_dec': telescope.get_ra_dec(),
+                'goto_in_progress': telescope.goto_in_progress()}
+
+    def snapshot(self, **kwargs):
+        """Reads position and goto state of all telescopes
+
+        :return FleetResult whose results are dictionaries with the keys
+                az_alt, ra_dec and goto_in_progress
+        """
+        return self.broadcast(self._snapshot, **kwargs)
+
+    def wait_for_gotos(self, poll_interval=0.5, timeout=None):
+        """Waits until no telescope reports a goto in progress
+
+        A telescope whose goto_in_progress() fails is not polled again, so
+        one broken mount cannot keep the wait going forever.
+
+        :return FleetResult with results True for the telescopes whose goto
+                finished, and in errors the exception of the telescopes
+                which failed or a TimeoutError for those still moving at
+                timeout. ok is True once all gotos finished.
+        """
+        start = time.perf_counter()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        names = self.names
+        results, errors, latencies = {}, {}, {}
+        while names:
+            result = self.goto_in_progress(names=names)
+            errors.update(result.errors)
+            for name in names:
+                if name in result.results and not result.results[name]:
+                    results[name] = True
+                    latencies[name] = time.perf_counter() - start
+            names = [name for name in names
+                     if name not in results and name not in errors]
+            if not names:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                for name in names:
+                    errors[name] = concurrent.futures.TimeoutError(
+                        '{} goto did not finish within {}s'.format(
+                            name, timeout))
+                break
+            time.sleep(poll_interval)
+        for name in errors:
+            latencies[name] = time.perf_counter() - start
+        return FleetResult(results, errors, latencies,
+                           time.perf_counter() - start)
+
+    def close(self):
+        """Stops the worker threads after pending commands completed"""
+        for queue in self._queues.values():
+            queue.shutdown(wait=True)
@@ -1,7 +1,13 @@
-from nextstar_telescopes import NexStarSLT130
-from astropy_telescope import AstropyTelescope
+from astroscope.telescopes.nextstar_telescopes import NexStarSLT130
+from astroscope.telescopes.astropy_telescope import AstropyTelescope
 from astroscope.computers.local import LocalComputer
+from astroscope.telescopes.pointing_model import PointingCorrectedTelescope
 
 
 class AstropyNexStarSLT130(LocalComputer, AstropyTelescope, NexStarSLT130):
     pass
+
+
+class PointingAstropyNexStarSLT130(PointingCorrectedTelescope, LocalComputer,
+                                   AstropyTelescope, NexStarSLT130):
+    pass
@@ -1,5 +1,6 @@
 import serial
 
+from astroscope import tracing
 from astroscope.telescopes.base_telescope import BaseTelescope
 
 
@@ -15,9 +16,17 @@ class TelescopeCommand(object):
 class NexStarSLT130(BaseTelescope):
     time_format = 'isot'
 
-    def __init__(self, device):
+    def __init__(self, device, serial_port=None):
+        """
+        :param device: serial device the telescope is attached to
+        :param serial_port: already opened serial-like object to use instead
+                            of opening device. Used to replay recorded
+                            sessions or talk to emulated telescopes.
+        """
         super(NexStarSLT130, self).__init__(device)
-        self.serial = serial.Serial(device, baudrate=9600, timeout=2)
+        if serial_port is None:
+            serial_port = serial.Serial(device, baudrate=9600, timeout=2)
+        self.serial = serial_port
         self.DIR_AZIMUTH = 0
         self.DIR_ELEVATION = 1
 
@@ -29,7 +38,10 @@ class NexStarSLT130(BaseTelescope):
                     must asure cmd is valid and validate response 
                     if necessary
         """
-        self.serial.write(cmd.encode())
+        # latin-1 maps chr(0)-chr(255) to single bytes, as binary commands
+        # like the slew commands need
+        with tracing.span('serial write', 'serial'):
+            self.serial.write(cmd.encode('latin-1'))
 
     def read_response(self, n_bytes=1):
         """ Reads response from telescope
@@ -38,7 +50,8 @@ class NexStarSLT130(BaseTelescope):
                         response
         :return : n_bytes number of bytes from response or None if error
         """
-        return self.serial.read(n_bytes)
+        with tracing.span('serial read', 'serial'):
+            return self.serial.read(n_bytes)
 
     @staticmethod
     def _validate_response(response):
@@ -57,6 +70,13 @@ class NexStarSLT130(BaseTelescope):
 
         :return response: Response returned by telescope
         """
+        if tracing.tracer() is None:
+            return self._exchange(command, expected_response_length)
+        # the span name is only built while tracing
+        with tracing.span('command ' + command[:1], 'nexstar'):
+            return self._exchange(command, expected_response_length)
+
+    def _exchange(self, command, expected_response_length):
         self.send_command(command)
         response = self.read_response(expected_response_length + 1)
         self._validate_response(response)
@@ -168,11 +188,12 @@ class NexStarSLT130(BaseTelescope):
         
         :param direction: axis of slew. either DIR_AZIMUTH or DIR_ELEVATION
         
-        :param rate: rate of slew 
+        :param rate: rate of slew in arcseconds per second, with a
+                     resolution of 0.25
         """
         negative_rate = True if rate < 0 else False
-        track_rate_high = (int(abs(rate)) * 4) / 256
-        track_rate_low = (int(abs(rate)) * 4) % 256
+        track_rate_high = int(round(abs(rate) * 4)) // 256
+        track_rate_low = int(round(abs(rate) * 4)) % 256
         direction_char = chr(16) if direction == self.DIR_AZIMUTH else chr(17)
         sign_char = chr(7) if negative_rate is True else chr(6)
         command = ('P' + chr(3) + direction_char + sign_char +
@@ -0,0 +1,420 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    device TEXT,
+    description TEXT
+);
+CREATE TABLE IF NOT EXISTS commands (
+    session INTEGER NOT NULL,
+    time REAL NOT NULL,
+    command TEXT NOT NULL,
+    response BLOB,
+    duration REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS positions (
+    session INTEGER NOT NULL,
+    time REAL NOT NULL,
+    system TEXT NOT NULL,
+    a REAL NOT NULL,
+    b REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS gotos (
+    session INTEGER NOT NULL,
+    time REAL NOT NULL,
+    system TEXT NOT NULL,
+    a REAL NOT NULL,
+    b REAL NOT NULL,
+    target TEXT,
+    duration REAL
+);
+CREATE TABLE IF NOT EXISTS syncs (
+    session INTEGER NOT NULL,
+    time REAL NOT NULL,
+    ra REAL NOT NULL,
+    dec REAL NOT NULL,
+    target TEXT
+);
+CREATE TABLE IF NOT EXISTS frames (
+    session INTEGER NOT NULL,
+    time REAL NOT NULL,
+    filename TEXT,
+    exposure REAL,
+    ra REAL,
+    dec REAL,
+    target TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_time ON sessions (time);
+CREATE INDEX IF NOT EXISTS commands_time ON commands (time);
+CREATE INDEX IF NOT EXISTS positions_time ON positions (time);
+CREATE INDEX IF NOT EXISTS gotos_time ON gotos (time);
+CREATE INDEX IF NOT EXISTS gotos_target ON gotos (target, time);
+CREATE INDEX IF NOT EXISTS syncs_time ON syncs (time);
+CREATE INDEX IF NOT EXISTS syncs_target ON syncs (target, time);
+CREATE INDEX IF NOT EXISTS frames_time ON frames (time);
+CREATE INDEX IF NOT EXISTS frames_target ON frames (target, time);
+"""
+
+TABLES = ('sessions', 'commands', 'positions', 'gotos', 'syncs', 'frames')
+
+# tables which can be queried by target
+TARGET_TABLES = ('gotos', 'syncs', 'frames')
+
+# gotos older than this are not completed by a later goto_in_progress
+_GOTO_TIMEOUT = 600.0
+
+
+def _connect(filename, check_same_thread=True):
+    connection = sqlite3.connect(filename,
+                                 check_same_thread=check_same_thread)
+    # readers do not block the writer and the other way around
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    return connection
+
+
+class ObservingLog(object):
+    """SQLite database recording everything done during observing sessions
+
+    Every instance adds a row to the sessions table, and the other tables
+    refer to it. Rows are queued and written by a background thread, in
+    one transaction per batch, so logging does not slow down the serial
+    communication with the telescope.
+    """
+
+    def __init__(self, filename, device=None, description=None,
+                 batch_size=500, flush_interval=0.5):
+        """
+        :param filename: database file, created if it does not exist
+        :param device: device of the telescope being logged
+        :param description: free text describing the session
+        :param batch_size: largest number of rows written per transaction
+        :param flush_interval: longest time in seconds a row waits in the
+                               queue
+        """
+        self.filename = filename
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._connection = _connect(filename, check_same_thread=False)
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+            self.session = self._connection.execute(
+                'INSERT INTO sessions (time, device, description) '
+                'VALUES (?, ?, ?)',
+                (time.time(), device, description)).lastrowid
+        self.device = device
+        # number of failed batch writes and the last error, the rows of a
+        # failed batch are lost
+        self.write_errors = 0
+        self.last_write_error = None
+        self._queue = queue.Queue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run,
+                                        name='observing-log-writer')
+        self._writer.daemon = True
+        self._writer.start()
+
+    def _put(self, sql, parameters):
+        if self._closed:
+            raise RuntimeError('ObservingLog is closed')
+        self._queue.put((sql, parameters))
+
+    def _take_batch(self):
+        """Blocks for the first row then takes what is queued
+
+        :return (rows, markers) where markers are flush events and None
+                for close
+        """
+        rows = []
+        markers = []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            if item is None or isinstance(item, threading.Event):
+                markers.append(item)
+                break
+            rows.append(item)
+            if len(rows) >= self.batch_size:
+                break
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+        return rows, markers
+
+    def _write(self, rows):
+        with self._connection:
+            start = 0
+            # consecutive rows of one statement go in one executemany
+            for end in range(1, len(rows) + 1):
+                if end == len(rows) or rows[end][0] != rows[start][0]:
+                    self._connection.executemany(
+                        rows[start][0], [r[1] for r in rows[start:end]])
+                    start = end
+
+    def _run(self):
+        while True:
+            rows, markers = self._take_batch()
+            try:
+                if rows:
+                    self._write(rows)
+            except Exception as e:
+                # the writer must survive, or flush() and close() hang
+                self.write_errors += 1
+                self.last_write_error = e
+            finally:
+                for marker in markers:
+                    if marker is not None:
+                        marker.set()
+            if None in markers:
+                return
+
+    def log_command(self, command, response, duration, error=None,
+                    unix_time=None):
+        """Records a command sent to the telescope
+
+        :param command: command string
+        :param response: bytes received, None if the command failed
+        :param duration: seconds from sending the command to validating
+                         the response
+        :param error: description of the failure, if any
+        """
+        if response is not None:
+            response = bytes(response)
+        self._put('INSERT INTO commands VALUES (?, ?, ?, ?, ?, ?)',
+                  (self.session, unix_time or time.time(), command,
+                   response, duration, error))
+
+    def log_position(self, system, a, b, unix_time=None):
+        """Records a position read from the telescope
+
+        :param system: 'azalt' or 'radec'
+        """
+        self._put('INSERT INTO positions VALUES (?, ?, ?, ?, ?)',
+                  (self.session, unix_time or time.time(), system, float(a),
+                   float(b)))
+
+    def log_goto(self, system, a, b, target=None, unix_time=None):
+        """Records the start of a goto
+
+        Its duration is filled in by the next goto_finished().
+        """
+        self._put('INSERT INTO gotos VALUES (?, ?, ?, ?, ?, ?, NULL)',
+                  (self.session, unix_time or time.time(), system, float(a),
+                   float(b), target))
+
+    def goto_finished(self, unix_time=None):
+        """Sets the duration of the gotos of this device still running
+
+        Gotos started by earlier sessions on the same device are included,
+        as the command line starts a goto and checks on it in separate
+        processes.
+        """
+        unix_time = unix_time or time.time()
+        self._put('UPDATE gotos SET duration = ? - time '
+                  'WHERE duration IS NULL AND time > ? AND session IN '
+                  '(SELECT id FROM sessions WHERE device IS ? OR id = ?)',
+                  (unix_time, unix_time - _GOTO_TIMEOUT, self.device,
+                   self.session))
+
+    def log_sync(self, ra, dec, target=None, unix_time=None):
+        self._put('INSERT INTO syncs VALUES (?, ?, ?, ?, ?)',
+                  (self.session, unix_time or time.time(), float(ra),
+                   float(dec), target))
+
+    def log_frame(self, filename, exposure=None, ra=None, dec=None,
+                  target=None, unix_time=None):
+        """Records a captured picture
+
+        :param filename: file the picture was saved to
+        :param exposure: exposure time in seconds
+        """
+        self._put('INSERT INTO frames VALUES (?, ?, ?, ?, ?, ?, ?)',
+                  (self.session, unix_time or time.time(), filename,
+                   exposure, ra, dec, target))
+
+    def flush(self, timeout=None):
+        """Waits until everything logged so far is in the database"""
+        event = threading.Event()
+        self._queue.put(event)
+        return event.wait(timeout)
+
+    def close(self):
+        """Writes the queued rows and closes the database"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def query(filename, table, start=None, end=None, target=None, limit=None):
+    """Reads rows of an observing log
+
+    The time range and target use the indexes, so queries stay fast on
+    logs of many sessions.
+
+    :param filename: database written by an ObservingLog
+    :param table: one of TABLES
+    :param start: earliest unix time included
+    :param end: unix time the range ends, excluded
+    :param target: only rows of this target, for TARGET_TABLES
+    :param limit: largest number of rows returned, the most recent ones
+    :return list of sqlite3.Row, oldest first
+    """
+    if table not in TABLES:
+        raise ValueError('unknown table {}'.format(table))
+    if target is not None and table not in TARGET_TABLES:
+        raise ValueError('{} has no target'.format(table))
+    if not os.path.exists(filename):
+        raise IOError('{} does not exist'.format(filename))
+    conditions = []
+    parameters = []
+    if start is not None:
+        conditions.append('time >= ?')
+        parameters.append(start)
+    if end is not None:
+        conditions.append('time < ?')
+        parameters.append(end)
+    if target is not None:
+        conditions.append('target = ?')
+        parameters.append(target)
+    sql = 'SELECT * FROM {}'.format(table)
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += ' ORDER BY time DESC'
+    if limit is not None:
+        sql += ' LIMIT ?'
+        parameters.append(int(limit))
+    connection = _connect(filename)
+    try:
+        connection.row_factory = sqlite3.Row
+        rows = connection.execute(sql, parameters).fetchall()
+    finally:
+        connection.close()
+    rows.reverse()
+    return rows
+
+
+def goto_statistics(filename, start=None, end=None):
+    """Durations of the completed gotos, per target
+
+    :return list of (target, count, mean, max) with durations in seconds
+    """
+    conditions = ['duration IS NOT NULL']
+    parameters = []
+    if start is not None:
+        conditions.append('time >= ?')
+        parameters.append(start)
+    if end is not None:
+        conditions.append('time < ?')
+        parameters.append(end)
+    connection = _connect(filename)
+    try:
+        return connection.execute(
+            'SELECT target, COUNT(*), AVG(duration), MAX(duration) '
+            'FROM gotos WHERE {} GROUP BY target ORDER BY target'.format(
+                ' AND '.join(conditions)), parameters).fetchall()
+    finally:
+        connection.close()
+
+
+class LoggingTelescope(object):
+    """Telescope mixin recording its activity to an ObservingLog
+
+    Every command sent, position read, goto and sync is logged while
+    observing_log is set. Gotos and syncs are tagged with
+    observing_target.
+    """
+
+    observing_log = None
+    observing_target = None
+
+    def _send_command_and_validate_response(self, command,
+                                            expected_response_length=0):
+        if self.observing_log is None:
+            return super(LoggingTelescope, self).\
+                _send_command_and_validate_response(command,
+                                                    expected_response_length)
+        started = time.perf_counter()
+        try:
+            response = super(LoggingTelescope, self).\
+                _send_command_and_validate_response(command,
+                                                    expected_response_length)
+        except Exception as e:
+            self.observing_log.log_command(
+                command, None, time.perf_counter() - started,
+                error=repr(e))
+            raise
+        self.observing_log.log_command(command, response,
+                                       time.perf_counter() - started)
+        return response
+
+    def get_az_alt(self):
+        _az, _alt = super(LoggingTelescope, self).get_az_alt()
+        if self.observing_log is not None:
+            self.observing_log.log_position('azalt', _az, _alt)
+        return _az, _alt
+
+    def get_ra_dec(self):
+        _ra, _dec = super(LoggingTelescope, self).get_ra_dec()
+        if self.observing_log is not None:
+            self.observing_log.log_position('radec', _ra, _dec)
+        return _ra, _dec
+
+    def goto_az_alt(self, az, alt):
+        if self.observing_log is not None:
+            self.observing_log.log_goto('azalt', az, alt,
+                                        self.observing_target)
+        return super(LoggingTelescope, self).goto_az_alt(az, alt)
+
+    def goto_ra_dec(self, ra, dec):
+        if self.observing_log is not None:
+            self.observing_log.log_goto('radec', ra, dec,
+                                        self.observing_target)
+        return super(LoggingTelescope, self).goto_ra_dec(ra, dec)
+
+    def goto_in_progress(self):
+        in_progress = super(LoggingTelescope, self).goto_in_progress()
+        if self.observing_log is not None and not in_progress:
+            self.observing_log.goto_finished()
+        return in_progress
+
+    def sync(self, ra, dec):
+        if self.observing_log is not None:
+            self.observing_log.log_sync(ra, dec, self.observing_target)
+        return super(LoggingTelescope, self).sync(ra, dec)
+
+
+_logging_classes = {}
+
+
+def logging_class(telescope_class):
+    """Returns telescope_class with LoggingTelescope mixed in
+
+    The command line tools pick their telescope class at run time, so the
+    logging variant is built when needed instead of declared for every
+    combination of mixins.
+    """
+    if telescope_class not in _logging_classes:
+        _logging_classes[telescope_class] = type(
+            'Logging' + telescope_class.__name__,
+            (LoggingTelescope, telescope_class), {})
+    return _logging_classes[telescope_class]
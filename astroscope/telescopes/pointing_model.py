@@ -0,0 +1,323 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from astroscope.telescopes.nextstar_telescopes import NexStarSLT130
+
+TERMS = ('IA', 'IE', 'CA', 'NPAE', 'AN', 'AW')
+# (observations, terms) fitted by default: every observation gives two
+# equations, and the terms are only fitted with clearly more equations than
+# unknowns, so a few nearly aligned stars cannot give an arbitrary model
+DEFAULT_TERMS = ((7, TERMS), (4, ('IA', 'IE', 'AN', 'AW')),
+                 (1, ('IA', 'IE')))
+
+
+def _julian_date(unix_time):
+    return np.asarray(unix_time, dtype=float) / 86400.0 + 2440587.5
+
+
+def local_sidereal_time(lon, unix_time):
+    """Local mean sidereal time in degrees"""
+    days = _julian_date(unix_time) - 2451545.0
+    centuries = days / 36525.0
+    gmst = (280.46061837 + 360.98564736629 * days +
+            0.000387933 * centuries ** 2 - centuries ** 3 / 38710000.0)
+    return np.mod(gmst + lon, 360.0)
+
+
+def precess_from_j2000(ra, dec, unix_time):
+    """Precesses J2000 coordinates to the mean equator of unix_time
+
+    IAU 1976 precession, good to about an arc second over decades.
+    """
+    t = (_julian_date(unix_time) - 2451545.0) / 36525.0
+    zeta = np.radians((2306.2181 * t + 0.30188 * t ** 2 +
+                       0.017998 * t ** 3) / 3600.0)
+    z = np.radians((2306.2181 * t + 1.09468 * t ** 2 +
+                    0.018203 * t ** 3) / 3600.0)
+    theta = np.radians((2004.3109 * t - 0.42665 * t ** 2 -
+                        0.041833 * t ** 3) / 3600.0)
+    ra, dec = np.radians(ra), np.radians(dec)
+    a = np.cos(dec) * np.sin(ra + zeta)
+    b = (np.cos(theta) * np.cos(dec) * np.cos(ra + zeta) -
+         np.sin(theta) * np.sin(dec))
+    c = (np.sin(theta) * np.cos(dec) * np.cos(ra + zeta) +
+         np.cos(theta) * np.sin(dec))
+    return (np.mod(np.degrees(np.arctan2(a, b) + z), 360.0),
+            np.degrees(np.arcsin(np.clip(c, -1.0, 1.0))))
+
+
+def refraction(alt):
+    """Atmospheric refraction in degrees at apparent altitude alt
+
+    Bennett's formula for standard temperature and pressure.
+    """
+    alt = np.maximum(np.asarray(alt, dtype=float), -1.0)
+    return 1.0 / np.tan(np.radians(alt + 7.31 / (alt + 4.4))) / 60.0
+
+
+def radec_to_azalt(ra, dec, lat, lon, unix_time, apparent=False):
+    """Converts equatorial to Horizontal coordinates without astropy
+
+    Vectorized over its arguments. Azimuth is measured from north through
+    east.
+
+    :param apparent: precess J2000 ra, dec to the date and add refraction,
+                     giving where a star is actually seen
+    :return (az, alt) in degrees
+    """
+    if apparent:
+        ra, dec = precess_from_j2000(ra, dec, unix_time)
+    hour_angle = np.radians(local_sidereal_time(lon, unix_time) - ra)
+    dec, lat = np.radians(dec), np.radians(lat)
+    alt = np.arcsin(np.clip(np.sin(dec) * np.sin(lat) +
+                            np.cos(dec) * np.cos(lat) * np.cos(hour_angle),
+                            -1.0, 1.0))
+    az = np.arctan2(-np.cos(dec) * np.sin(hour_angle),
+                    np.sin(dec) * np.cos(lat) -
+                    np.cos(dec) * np.sin(lat) * np.cos(hour_angle))
+    alt = np.degrees(alt)
+    if apparent:
+        # refraction is a function of the apparent altitude, one fixed
+        # point iteration is enough
+        alt = alt + refraction(alt + refraction(alt))
+    return np.mod(np.degrees(az), 360.0), alt
+
+
+def azalt_to_radec(az, alt, lat, lon, unix_time):
+    """Converts Horizontal to equatorial coordinates without astropy
+
+    Inverse of radec_to_azalt with apparent=False.
+
+    :return (ra, dec) in degrees
+    """
+    az, alt, lat = np.radians(az), np.radians(alt), np.radians(lat)
+    dec = np.arcsin(np.clip(np.sin(alt) * np.sin(lat) +
+                            np.cos(alt) * np.cos(lat) * np.cos(az),
+                            -1.0, 1.0))
+    hour_angle = np.arctan2(-np.sin(az) * np.cos(alt),
+                            np.sin(alt) * np.cos(lat) -
+                            np.cos(alt) * np.sin(lat) * np.cos(az))
+    ra = local_sidereal_time(lon, unix_time) - np.degrees(hour_angle)
+    return np.mod(ra, 360.0), np.degrees(dec)
+
+
+def _wrap(degrees):
+    return (np.asarray(degrees) + 180.0) % 360.0 - 180.0
+
+
+class PointingModel(object):
+    """Alt-az mount pointing model fitted from star observations
+
+    Where the mount reports pointing (its encoders) differs from where it
+    actually points by
+
+        dAz  = IA + CA sec(alt) + NPAE tan(alt)
+               + (AN sin(az) + AW cos(az)) tan(alt)
+        dAlt = IE + AN cos(az) - AW sin(az)
+
+    with IA/IE the index errors, CA the collimation error, NPAE the non
+    perpendicularity of the axes and AN/AW the tilt of the azimuth axis
+    to the north and west. The terms are linear in the coefficients,
+    which are fitted by least squares over all observations at once.
+    """
+
+    def __init__(self, coefficients=None, observations=None):
+        """
+        :param coefficients: dictionary of term -> degrees
+        :param observations: list of (az, alt, mount_az, mount_alt) in
+                             degrees
+        """
+        self.coefficients = dict((term, 0.0) for term in TERMS)
+        self.coefficients.update(coefficients or {})
+        self.observations = [tuple(o) for o in (observations or [])]
+        self.rms = None
+
+    def add_observation(self, az, alt, mount_az, mount_alt):
+        """Records that the mount reported mount_az, mount_alt while
+        pointing at az, alt"""
+        self.observations.append((float(az), float(alt), float(mount_az),
+                                  float(mount_alt)))
+
+    @staticmethod
+    def _design(az, alt):
+        """Partial derivatives of (dAz cos(alt), dAlt) for every term"""
+        az, alt = np.radians(az), np.radians(alt)
+        zero, one = np.zeros_like(az), np.ones_like(az)
+        sin_alt = np.sin(alt)
+        az_rows = np.stack([np.cos(alt), zero, one, sin_alt,
+                            np.sin(az) * sin_alt, np.cos(az) * sin_alt],
+                           axis=-1)
+        alt_rows = np.stack([zero, one, zero, zero, np.cos(az),
+                             -np.sin(az)], axis=-1)
+        return az_rows, alt_rows
+
+    def fit(self, terms=None):
+        """Fits the coefficients to the observations
+
+        :param terms: terms to fit, the others are set to 0. Default is all
+                      of them with 7 or more observations, the index
+                      errors and the tilt with 4 or more and only the
+                      index errors otherwise.
+        :return rms of the residuals on the sky, in degrees
+        """
+        if not self.observations:
+            raise ValueError('no observations to fit')
+        if terms is None:
+            terms = next(terms for count, terms in DEFAULT_TERMS
+                         if len(self.observations) >= count)
+        az, alt, mount_az, mount_alt = np.array(self.observations).T
+        az_rows, alt_rows = self._design(az, alt)
+        columns = [TERMS.index(term) for term in terms]
+        design = np.concatenate([az_rows, alt_rows])[:, columns]
+        residuals = np.concatenate([_wrap(mount_az - az) *
+                                    np.cos(np.radians(alt)),
+                                    mount_alt - alt])
+        solution = np.linalg.lstsq(design, residuals, rcond=None)[0]
+        self.coefficients = dict((term, 0.0) for term in TERMS)
+        for term, value in zip(terms, solution):
+            self.coefficients[term] = float(value)
+        fitted = residuals - design.dot(solution)
+        self.rms = float(np.sqrt(np.mean(fitted ** 2)))
+        return self.rms
+
+    def offsets(self, az, alt):
+        """Returns (dAz, dAlt) in degrees for true positions az, alt"""
+        c = self.coefficients
+        az_rows, alt_rows = self._design(az, alt)
+        vector = np.array([c[term] for term in TERMS])
+        cos_alt = np.maximum(np.cos(np.radians(alt)), 1e-6)
+        return az_rows.dot(vector) / cos_alt, alt_rows.dot(vector)
+
+    def correct(self, az, alt):
+        """Converts where the telescope should point to mount coordinates
+
+        :return (mount_az, mount_alt) to command
+        """
+        d_az, d_alt = self.offsets(az, alt)
+        return np.mod(np.asarray(az) + d_az, 360.0), np.asarray(alt) + d_alt
+
+    def uncorrect(self, mount_az, mount_alt, iterations=3):
+        """Converts mount coordinates to where the telescope points"""
+        az, alt = mount_az, mount_alt
+        for _ in range(iterations):
+            d_az, d_alt = self.offsets(az, alt)
+            az = np.mod(np.asarray(mount_az) - d_az, 360.0)
+            alt = np.asarray(mount_alt) - d_alt
+        return az, alt
+
+    def save(self, filename):
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'w') as f:
+            json.dump(dict(coefficients=self.coefficients,
+                           observations=self.observations, rms=self.rms),
+                      f, indent=1)
+        os.replace(tmp_filename, filename)
+
+    @classmethod
+    def load(cls, filename):
+        """Loads a model saved by save(). A missing file gives an empty
+        model."""
+        if not os.path.exists(filename):
+            return cls()
+        with open(filename) as f:
+            content = json.load(f)
+        model = cls(content.get('coefficients'),
+                    content.get('observations'))
+        model.rms = content.get('rms')
+        return model
+
+
+class PointingCorrectedTelescope(object):
+    """Telescope mixin applying a PointingModel
+
+    Gotos are corrected by the model and positions read from the mount, in
+    az/alt and in ra/dec, are corrected back. Syncs are recorded as observations, and the model is
+    refitted and saved to pointing_model_filename if set. They are not
+    sent to the mount: its own sync would move the encoder zero under the
+    observations already recorded.
+    """
+
+    pointing_model = None
+    pointing_model_filename = None
+    _pointing_location = None
+
+    def _location(self):
+        if self._pointing_location is None:
+            self._pointing_location = self.get_location_lat_long()
+        return self._pointing_location
+
+    def get_az_alt(self):
+        _az, _alt = super(PointingCorrectedTelescope, self).get_az_alt()
+        if self.pointing_model is None:
+            return _az, _alt
+        _az, _alt = self.pointing_model.uncorrect(_az, _alt)
+        return float(_az), float(_alt)
+
+    def get_ra_dec(self):
+        """Returns the ra, dec the telescope points at
+
+        The mount converts its encoder positions to ra, dec itself, so the
+        model's correction there is converted into an ra, dec offset.
+        """
+        ra, dec = super(PointingCorrectedTelescope, self).get_ra_dec()
+        if self.pointing_model is None:
+            return ra, dec
+        lat, lon = self._location()
+        now = time.time()
+        mount_az, mount_alt = radec_to_azalt(ra, dec, lat, lon, now)
+        mount = azalt_to_radec(mount_az, mount_alt, lat, lon, now)
+        actual = azalt_to_radec(
+            *(self.pointing_model.uncorrect(mount_az, mount_alt) +
+              (lat, lon, now)))
+        return (float(np.mod(ra + _wrap(actual[0] - mount[0]), 360.0)),
+                float(dec + actual[1] - mount[1]))
+
+    def goto_az_alt(self, az, alt):
+        if self.pointing_model is not None:
+            az, alt = (float(x) for x in self.pointing_model.correct(az, alt))
+        return super(PointingCorrectedTelescope, self).goto_az_alt(az, alt)
+
+    def goto_ra_dec(self, ra, dec):
+        """Points to ra, dec shifted by the model's offset at the target
+
+        The mount converts ra, dec itself, so the model's correction at
+        the target is converted into an ra, dec offset.
+        """
+        if self.pointing_model is not None:
+            lat, lon = self._location()
+            now = time.time()
+            _az, _alt = radec_to_azalt(ra, dec, lat, lon, now)
+            target = azalt_to_radec(_az, _alt, lat, lon, now)
+            corrected = azalt_to_radec(
+                *(self.pointing_model.correct(_az, _alt) + (lat, lon, now)))
+            ra = float(np.mod(ra + _wrap(corrected[0] - target[0]), 360.0))
+            dec = float(dec + corrected[1] - target[1])
+        return super(PointingCorrectedTelescope, self).goto_ra_dec(ra, dec)
+
+    def add_pointing_observation(self, ra, dec):
+        """Records that the telescope is centred on J2000 ra, dec
+
+        :return rms of the refitted model in degrees
+        """
+        if self.pointing_model is None:
+            self.pointing_model = PointingModel()
+        lat, lon = self._location()
+        mount_az, mount_alt = \
+            super(PointingCorrectedTelescope, self).get_az_alt()
+        _az, _alt = radec_to_azalt(ra, dec, lat, lon, time.time(),
+                                   apparent=True)
+        self.pointing_model.add_observation(_az, _alt, mount_az, mount_alt)
+        rms = self.pointing_model.fit()
+        if self.pointing_model_filename:
+            self.pointing_model.save(self.pointing_model_filename)
+        return rms
+
+    def sync(self, ra, dec):
+        return self.add_pointing_observation(ra, dec)
+
+
+class PointingNexStarSLT130(PointingCorrectedTelescope, NexStarSLT130):
+    pass
@@ -0,0 +1,196 @@
+import numpy as np
+from astropy import units as u
+from astropy.coordinates import Angle
+from astropy.coordinates import SkyCoord
+from astropy.time import Time
+
+from astroscope.telescopes.astropy_transforms import altaz_to_icrs
+
+
+class LazyAngle(object):
+    """Angle in degrees which becomes an astropy Angle only when needed
+
+    deg, degree and radian are plain attributes. Any other attribute, like
+    hms or to_string, is read from an astropy Angle built on first use.
+    """
+
+    __slots__ = ('deg', '_angle')
+
+    def __init__(self, degrees):
+        self.deg = degrees
+        self._angle = None
+
+    @property
+    def degree(self):
+        return self.deg
+
+    @property
+    def radian(self):
+        return np.radians(self.deg)
+
+    @property
+    def angle(self):
+        """The astropy Angle"""
+        if self._angle is None:
+            self._angle = Angle(self.deg, u.deg)
+        return self._angle
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.angle, name)
+
+    def __float__(self):
+        return float(self.deg)
+
+    def __repr__(self):
+        return repr(self.angle)
+
+    def __str__(self):
+        return str(self.angle)
+
+
+class _Horizontal(object):
+    """What single and batched Horizontal positions share"""
+
+    __slots__ = ('az_degrees', 'alt_degrees', '_location', '_skycoord')
+
+    @property
+    def az(self):
+        return LazyAngle(self.az_degrees)
+
+    @property
+    def alt(self):
+        return LazyAngle(self.alt_degrees)
+
+    @property
+    def location(self):
+        if callable(self._location):
+            self._location = self._location()
+        return self._location
+
+    @property
+    def skycoord(self):
+        """The Horizontal SkyCoord"""
+        if self._skycoord is None:
+            self._skycoord = SkyCoord(az=self.az_degrees * u.deg,
+                                      alt=self.alt_degrees * u.deg,
+                                      frame='altaz', obstime=self.obstime,
+                                      location=self.location)
+        return self._skycoord
+
+    def transform_to(self, frame):
+        return self.skycoord.transform_to(frame)
+
+    def _icrs(self, unix_times):
+        location = self.location
+        return altaz_to_icrs(np.atleast_1d(self.az_degrees),
+                             np.atleast_1d(self.alt_degrees),
+                             np.atleast_1d(unix_times), location.lat.deg,
+                             location.lon.deg, location.height.to_value(u.m))
+
+    def __getattr__(self, name):
+        # only called for attributes not defined here
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.skycoord, name)
+
+    def __repr__(self):
+        return repr(self.skycoord)
+
+    def __str__(self):
+        return str(self.skycoord)
+
+
+class HorizontalPosition(_Horizontal):
+    """Horizontal coordinates read from a telescope, built lazily
+
+    Holds the raw degrees and the unix time they were read at. The
+    SkyCoord, and the EarthLocation it needs, are only built when an
+    attribute other than az, alt, unix_time or radec() is used, so reading
+    az.deg and alt.deg costs no astropy work. Attributes not defined here
+    are read from the SkyCoord, so a HorizontalPosition can be used where
+    the Horizontal SkyCoord used to be returned.
+    """
+
+    __slots__ = ('unix_time', )
+
+    def __init__(self, az, alt, unix_time, location):
+        """
+        :param az: azimuth in degrees
+        :param alt: altitude in degrees
+        :param unix_time: time the position was read
+        :param location: EarthLocation of the telescope, or a function
+                         returning it, called when first needed
+        """
+        self.az_degrees = az
+        self.alt_degrees = alt
+        self.unix_time = unix_time
+        self._location = location
+        self._skycoord = None
+
+    @property
+    def obstime(self):
+        return Time(self.unix_time, format='unix')
+
+    def radec(self):
+        """ICRS coordinates without building a SkyCoord
+
+        :return (ra, dec) in degrees
+        """
+        ra, dec = self._icrs(self.unix_time)
+        return float(ra[0]), float(dec[0])
+
+
+class HorizontalPositions(_Horizontal):
+    """Array of Horizontal coordinates read at one location
+
+    The batched counterpart of HorizontalPosition: az and alt are arrays,
+    and the SkyCoord, transforms and radec() handle all samples at once.
+    """
+
+    __slots__ = ('unix_times', )
+
+    def __init__(self, az, alt, unix_times, location):
+        """
+        :param az: azimuths in degrees
+        :param alt: altitudes in degrees
+        :param unix_times: times the positions were read
+        :param location: EarthLocation of the telescope, or a function
+                         returning it
+        """
+        self.az_degrees = np.asarray(az, dtype=float)
+        self.alt_degrees = np.asarray(alt, dtype=float)
+        self.unix_times = np.broadcast_to(
+            np.asarray(unix_times, dtype=float), self.az_degrees.shape)
+        self._location = location
+        self._skycoord = None
+
+    @classmethod
+    def from_positions(cls, positions):
+        """Collects HorizontalPosition read at one location"""
+        positions = list(positions)
+        location = positions[0]._location if positions else None
+        return cls([p.az_degrees for p in positions],
+                   [p.alt_degrees for p in positions],
+                   [p.unix_time for p in positions], location)
+
+    def __len__(self):
+        return len(self.az_degrees)
+
+    def __getitem__(self, index):
+        return HorizontalPosition(float(self.az_degrees[index]),
+                                  float(self.alt_degrees[index]),
+                                  float(self.unix_times[index]),
+                                  self._location)
+
+    @property
+    def obstime(self):
+        return Time(self.unix_times, format='unix')
+
+    def radec(self):
+        """ICRS coordinates of all samples in one transform
+
+        :return (ra, dec) arrays in degrees
+        """
+        return self._icrs(self.unix_times)
@@ -0,0 +1,180 @@
+import struct
+import threading
+import time
+
+DIRECTION_WRITE = 0
+DIRECTION_READ = 1
+
+# A session file is the magic string, the wall clock time the recording
+# started and then one record per write/read made on the serial port.
+_MAGIC = b'ASTRSES1'
+_HEADER = struct.Struct('<8sd')
+# seconds since start of recording, direction, payload length
+_RECORD = struct.Struct('<dBH')
+
+
+class SessionMismatchError(Exception):
+    def __init__(self, msg):
+        super(SessionMismatchError, self).__init__(msg)
+        self.msg = msg
+
+
+class SessionRecorder(object):
+    """Serial port wrapper which records every byte written and read
+
+    Any attribute not related to writing or reading is passed through to
+    the wrapped serial port, so a SessionRecorder can replace the
+    ``serial`` attribute of a telescope without the telescope noticing.
+    """
+
+    def __init__(self, serial_port, output_filename):
+        """
+        :param serial_port: serial object being recorded
+        :param output_filename: file the session is recorded to
+        """
+        self._serial = serial_port
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._file = open(output_filename, 'wb')
+        self._file.write(_HEADER.pack(_MAGIC, time.time()))
+
+    def __getattr__(self, name):
+        return getattr(self._serial, name)
+
+    def _record(self, direction, data):
+        data = bytes(data)
+        with self._lock:
+            self._file.write(_RECORD.pack(time.perf_counter() - self._start,
+                                          direction, len(data)))
+            self._file.write(data)
+            self._file.flush()
+
+    def write(self, data):
+        self._record(DIRECTION_WRITE, data)
+        return self._serial.write(data)
+
+    def read(self, n_bytes=1):
+        data = self._serial.read(n_bytes)
+        self._record(DIRECTION_READ, data)
+        return data
+
+    def close(self):
+        """Stops recording. The wrapped serial port is left open"""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def load_session(filename):
+    """Loads a recorded session
+
+    :param filename: file written by a SessionRecorder
+    :return (start_time, events) where start_time is the unix time the
+            recording started and events is a list of
+            (seconds_since_start, direction, data) tuples
+    """
+    with open(filename, 'rb') as f:
+        content = f.read()
+    magic, start_time = _HEADER.unpack_from(content, 0)
+    if magic != _MAGIC:
+        raise SessionMismatchError(
+            '{} is not a recorded session'.format(filename))
+    events = []
+    offset = _HEADER.size
+    while offset < len(content):
+        timestamp, direction, length = _RECORD.unpack_from(content, offset)
+        offset += _RECORD.size
+        events.append((timestamp, direction, content[offset:offset + length]))
+        offset += length
+    return start_time, events
+
+
+class ReplaySerial(object):
+    """Serial port stand-in which plays back a recorded session
+
+    Writes are checked against the recorded writes and reads return the
+    recorded responses. Responses are delayed by the time the real device
+    took to answer, divided by ``speed``.
+    """
+
+    def __init__(self, filename, speed=1.0, strict=True):
+        """
+        :param filename: file written by a SessionRecorder
+        :param speed: replay speed relative to the recording. 1.0 replays
+                      at recorded speed, 10.0 ten times faster and None
+                      replays without any delays.
+        :param strict: raise SessionMismatchError if a write does not match
+                       the recorded one
+        """
+        self.start_time, self._events = load_session(filename)
+        self.speed = speed
+        self.strict = strict
+        self.is_open = True
+        self._position = 0
+        self._pending = b''
+        self._last_write_recorded = 0.0
+        self._last_write_replayed = time.perf_counter()
+
+    def _next_event(self, direction):
+        while self._position < len(self._events):
+            event = self._events[self._position]
+            self._position += 1
+            if event[1] == direction:
+                return event
+            if self.strict:
+                raise SessionMismatchError(
+                    'unexpected {} at event {}'.format(
+                        'write' if direction == DIRECTION_WRITE else 'read',
+                        self._position - 1))
+        return None
+
+    def _wait_until(self, recorded_time):
+        if not self.speed:
+            return
+        delay = ((recorded_time - self._last_write_recorded) / self.speed -
+                 (time.perf_counter() - self._last_write_replayed))
+        if delay > 0:
+            time.sleep(delay)
+
+    def write(self, data):
+        data = bytes(data)
+        event = self._next_event(DIRECTION_WRITE)
+        if event is None:
+            raise SessionMismatchError('write past end of recorded session')
+        if self.strict and event[2] != data:
+            raise SessionMismatchError(
+                'expected write {!r}, got {!r}'.format(event[2], data))
+        self._pending = b''
+        self._last_write_recorded = event[0]
+        self._last_write_replayed = time.perf_counter()
+        return len(data)
+
+    def read(self, n_bytes=1):
+        while len(self._pending) < n_bytes:
+            if (self._position >= len(self._events) or
+                    self._events[self._position][1] != DIRECTION_READ):
+                break
+            event = self._next_event(DIRECTION_READ)
+            self._wait_until(event[0])
+            self._pending += event[2]
+        data, self._pending = self._pending[:n_bytes], self._pending[n_bytes:]
+        return data
+
+    def remaining(self):
+        """Number of recorded events not yet replayed"""
+        return len(self._events) - self._position
+
+    def close(self):
+        self.is_open = False
+
+
+def record_session(telescope, output_filename):
+    """Starts recording all serial traffic of telescope
+
+    :param telescope: telescope with a ``serial`` attribute
+    :param output_filename: file the session is recorded to
+    :return SessionRecorder now used as the telescope's serial port
+    """
+    recorder = SessionRecorder(telescope.serial, output_filename)
+    telescope.serial = recorder
+    return recorder
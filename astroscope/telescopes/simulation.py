@@ -1,8 +1,14 @@
-import astroscope.telescopes
+import collections
+import math
+import threading
 import time
 
+from astroscope.telescopes.base_telescope import BaseTelescope
+from astroscope.telescopes.pointing_model import azalt_to_radec
+from astroscope.telescopes.pointing_model import radec_to_azalt
 
-class FakeTelescope(astroscope.telescopes.BaseTelescope):
+
+class FakeTelescope(BaseTelescope):
 
     _location_lat = 0.0
     _location_long = 0.0
@@ -14,10 +20,16 @@ class FakeTelescope(astroscope.telescopes.BaseTelescope):
     _az = 0.0
     _alt = 0.0
     _operation_in_progress = False
-    _received_commands = []
-    _outputs = []
     _internal_counter = None
 
+    def __init__(self, device="/dev/ttyUSB0", history_size=1000):
+        """
+        :param history_size: number of received commands and outputs kept
+        """
+        super(FakeTelescope, self).__init__(device)
+        self._received_commands = collections.deque(maxlen=history_size)
+        self._outputs = collections.deque(maxlen=history_size)
+
     def read_response(self):
         return self._response
 
@@ -65,3 +77,403 @@ class FakeTelescope(astroscope.telescopes.BaseTelescope):
     def send_command(self, cmd):
             self._received_commands.append(cmd)
 
+
+class VirtualClock(object):
+    """Clock running speed times faster than real time
+
+    With speed None the clock only moves when sleep() or advance() are
+    called, which makes simulations deterministic and as fast as the
+    computer allows.
+    """
+
+    def __init__(self, speed=None, start=None):
+        """
+        :param speed: virtual seconds per real second, or None
+        :param start: unix time the clock starts at. Default is now.
+        """
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._start = time.time() if start is None else start
+        self._offset = 0.0
+        self._real_start = time.monotonic()
+
+    def time(self):
+        """Returns the virtual unix time"""
+        with self._lock:
+            elapsed = self._offset
+            if self.speed is not None:
+                elapsed += (time.monotonic() - self._real_start) * self.speed
+            return self._start + elapsed
+
+    monotonic = time
+
+    def advance(self, seconds):
+        """Moves the clock forward by seconds"""
+        with self._lock:
+            self._offset += seconds
+
+    def sleep(self, seconds):
+        """Waits for seconds of virtual time"""
+        if seconds <= 0:
+            return
+        if self.speed is None:
+            self.advance(seconds)
+        else:
+            time.sleep(seconds / self.speed)
+
+    def sleep_until(self, deadline):
+        self.sleep(deadline - self.time())
+
+
+def _sign(x):
+    return 1.0 if x >= 0 else -1.0
+
+
+class _Axis(object):
+    """One mount axis moving with limited rate and acceleration
+
+    Gotos follow a trapezoidal velocity profile. The motion is computed in
+    closed form phase by phase, so advancing by hours costs the same as
+    advancing by milliseconds.
+    """
+
+    def __init__(self, max_rate, acceleration, wrap=False, position=0.0):
+        """
+        :param max_rate: degrees per second
+        :param acceleration: degrees per second squared
+        :param wrap: positions are angles modulo 360
+        """
+        self.max_rate = max_rate
+        self.acceleration = acceleration
+        self.wrap = wrap
+        self.position = position
+        self.velocity = 0.0
+        self.target = None
+        self.rate = 0.0
+
+    def distance(self, target):
+        distance = target - self.position
+        if self.wrap:
+            distance = (distance + 180.0) % 360.0 - 180.0
+        return distance
+
+    def move_to(self, target):
+        self.target = target % 360.0 if self.wrap else target
+
+    def set_rate(self, rate):
+        """Moves at rate degrees per second, cancelling any goto"""
+        self.target = None
+        self.rate = max(-self.max_rate, min(self.max_rate, rate))
+
+    @property
+    def moving(self):
+        return self.target is not None or self.velocity != 0.0 or \
+            self.rate != 0.0
+
+    def _arrive(self):
+        self.position = self.target
+        self.velocity = 0.0
+        self.target = None
+        self.rate = 0.0
+
+    def _phase(self):
+        """Returns (acceleration, duration, end) of the current phase
+
+        duration is None when the motion is steady, end is called when the
+        phase completes.
+        """
+        a = self.acceleration
+        v = self.velocity
+        if self.target is None:
+            change = self.rate - v
+            if abs(change) < 1e-12:
+                self.velocity = self.rate
+                return 0.0, None, None
+
+            def reach_rate():
+                self.velocity = self.rate
+            return _sign(change) * a, abs(change) / a, reach_rate
+        d = self.distance(self.target)
+        if abs(d) < 1e-9 and abs(v) < 1e-9:
+            self._arrive()
+            return 0.0, None, None
+        direction = _sign(d)
+        if v * direction < 0:
+            # moving away from the target: stop first
+
+            def stopped():
+                self.velocity = 0.0
+            return -_sign(v) * a, abs(v) / a, stopped
+        stopping = v * v / (2 * a)
+        if stopping >= abs(d) - 1e-9:
+            if v == 0.0:
+                self._arrive()
+                return 0.0, None, None
+            # decelerate onto the target
+            return (-direction * v * v / (2 * abs(d)), 2 * abs(d) / abs(v),
+                    self._arrive)
+        if abs(v) < self.max_rate:
+            peak = min(self.max_rate,
+                       math.sqrt((2 * a * abs(d) + v * v) / 2))
+
+            def reach_peak():
+                self.velocity = direction * peak
+            return direction * a, (peak - abs(v)) / a, reach_peak
+        return 0.0, (abs(d) - stopping) / abs(v), None
+
+    def advance(self, dt):
+        """Moves the axis forward by dt seconds"""
+        while dt > 0:
+            acceleration, duration, end = self._phase()
+            step = dt if duration is None else min(dt, duration)
+            self.position += self.velocity * step + \
+                0.5 * acceleration * step * step
+            self.velocity += acceleration * step
+            if self.wrap:
+                self.position %= 360.0
+            dt -= step
+            if duration is not None and step == duration and \
+                    end is not None:
+                end()
+        if self.wrap:
+            self.position %= 360.0
+
+
+class SimulatedMount(BaseTelescope):
+    """Alt-az mount simulated with realistic motion and a virtual clock
+
+    Both axes accelerate, cruise and decelerate within their limits, so
+    gotos take as long as on the hardware. goto_ra_dec targets are tracked
+    while the tracking mode is not 0, with drift added to the tracking
+    rates to simulate imperfect tracking. slew_var and slew_fixed offset
+    the tracked position, as guiding does, or move the axes when not
+    tracking. Rates follow NexStarSLT130: arcseconds per second for
+    slew_var, levels 0 to 9 for slew_fixed.
+
+    All positions are computed from clock on demand, so a night of
+    observing can be simulated in seconds with a VirtualClock.
+    """
+
+    # approximate rate of the fixed slew levels in arcseconds per second
+    FIXED_RATES = (0.0, 30.0, 60.0, 120.0, 240.0, 960.0, 1800.0, 3600.0,
+                   7200.0, 14400.0)
+
+    def __init__(self, device="simulated", clock=None, lat=0.0, lon=0.0,
+                 az=0.0, alt=0.0, max_rate=4.0, acceleration=2.0,
+                 drift=(0.0, 0.0), history_size=1000):
+        """
+        :param clock: object with a time() method. Default is a VirtualClock
+                      only moving when told to.
+        :param lat: latitude of the mount in degrees
+        :param lon: longitude of the mount in degrees
+        :param max_rate: highest axis rate in degrees per second, or a
+                         (az, alt) tuple
+        :param acceleration: axis acceleration in degrees per second squared,
+                             or a (az, alt) tuple
+        :param drift: (az, alt) tracking error in arcseconds per second
+        :param history_size: number of received commands kept
+        """
+        super(SimulatedMount, self).__init__(device)
+        self.clock = VirtualClock() if clock is None else clock
+        self._lat = lat
+        self._lon = lon
+        if not isinstance(max_rate, tuple):
+            max_rate = (max_rate, max_rate)
+        if not isinstance(acceleration, tuple):
+            acceleration = (acceleration, acceleration)
+        self._az = _Axis(max_rate[0], acceleration[0], wrap=True, position=az)
+        self._alt = _Axis(max_rate[1], acceleration[1], position=alt)
+        self.drift = drift
+        self.tracking_mode = 1
+        self._track = None
+        self._settled = None
+        self._guide_rates = (0.0, 0.0)
+        self._guide_offset = (0.0, 0.0)
+        self._sync_offset = (0.0, 0.0)
+        self._received_commands = collections.deque(maxlen=history_size)
+        self._outputs = collections.deque(maxlen=history_size)
+        self._lock = threading.RLock()
+        self._updated = self.clock.time()
+
+    def _record(self, *command):
+        self._received_commands.append((self._updated,) + command)
+
+    def _tracking(self):
+        return self._track is not None and self.tracking_mode != 0
+
+    def _tracked_position(self, now):
+        """Axis positions tracking the target at now, with drift"""
+        az, alt = radec_to_azalt(self._track[0], self._track[1], self._lat,
+                                 self._lon, now)
+        elapsed = 0.0 if self._settled is None else now - self._settled
+        return (float(az) - self._sync_offset[0] + self._guide_offset[0] +
+                self.drift[0] * elapsed / 3600.0,
+                float(alt) - self._sync_offset[1] + self._guide_offset[1] +
+                self.drift[1] * elapsed / 3600.0)
+
+    def _update(self):
+        """Brings the simulation up to the clock"""
+        now = self.clock.time()
+        dt = now - self._updated
+        if dt <= 0:
+            return
+        if not self._tracking():
+            self._az.advance(dt)
+            self._alt.advance(dt)
+        else:
+            t = self._updated
+            # slew to the moving target, aiming at where it will be
+            while self._settled is None and t < now:
+                step = min(1.0, now - t)
+                az, alt = self._tracked_position(t + step)
+                self._az.move_to(az)
+                self._alt.move_to(alt)
+                self._az.advance(step)
+                self._alt.advance(step)
+                t += step
+                if not (self._az.moving or self._alt.moving):
+                    self._settled = t
+            if self._settled is not None:
+                self._guide_offset = (
+                    self._guide_offset[0] + self._guide_rates[0] * dt,
+                    self._guide_offset[1] + self._guide_rates[1] * dt)
+                az, alt = self._tracked_position(now)
+                self._az.position = az % 360.0
+                self._alt.position = alt
+        self._updated = now
+
+    def get_az_alt(self):
+        """Returns (az, alt) in degrees"""
+        with self._lock:
+            self._update()
+            self._record('get_az_alt')
+            return ((self._az.position + self._sync_offset[0]) % 360.0,
+                    self._alt.position + self._sync_offset[1])
+
+    def get_ra_dec(self):
+        """Returns (ra, dec) in degrees"""
+        _az, _alt = self.get_az_alt()
+        ra, dec = azalt_to_radec(_az, _alt, self._lat, self._lon,
+                                 self._updated)
+        return float(ra), float(dec)
+
+    def goto_az_alt(self, az, alt):
+        with self._lock:
+            self._update()
+            self._record('goto_az_alt', az, alt)
+            self._track = None
+            self._settled = None
+            self._az.move_to(az - self._sync_offset[0])
+            self._alt.move_to(alt - self._sync_offset[1])
+
+    def goto_ra_dec(self, ra, dec):
+        with self._lock:
+            self._update()
+            self._record('goto_ra_dec', ra, dec)
+            self._track = (ra, dec)
+            self._settled = None
+            self._guide_offset = (0.0, 0.0)
+            self._guide_rates = (0.0, 0.0)
+            if self.tracking_mode == 0:
+                az, alt = radec_to_azalt(ra, dec, self._lat, self._lon,
+                                         self._updated)
+                self._az.move_to(float(az) - self._sync_offset[0])
+                self._alt.move_to(float(alt) - self._sync_offset[1])
+
+    def sync(self, ra, dec):
+        """Makes the current position read as ra, dec"""
+        with self._lock:
+            self._update()
+            self._record('sync', ra, dec)
+            az, alt = radec_to_azalt(ra, dec, self._lat, self._lon,
+                                     self._updated)
+            self._sync_offset = (
+                (float(az) - self._az.position + 180.0) % 360.0 - 180.0,
+                float(alt) - self._alt.position)
+
+    def goto_in_progress(self):
+        with self._lock:
+            self._update()
+            if self._tracking():
+                return self._settled is None
+            return self._az.target is not None or \
+                self._alt.target is not None
+
+    def cancel_goto(self):
+        with self._lock:
+            self._update()
+            self._record('cancel_goto')
+            self._track = None
+            self._settled = None
+            self._az.set_rate(0.0)
+            self._alt.set_rate(0.0)
+
+    def cancel_current_operation(self):
+        self.cancel_goto()
+
+    def slew_var(self, az_rate, el_rate):
+        """Moves the axes at az_rate and el_rate arcseconds per second"""
+        with self._lock:
+            self._update()
+            self._record('slew_var', az_rate, el_rate)
+            if self._tracking() and self._settled is not None:
+                self._guide_rates = (az_rate / 3600.0, el_rate / 3600.0)
+            else:
+                self._az.set_rate(az_rate / 3600.0)
+                self._alt.set_rate(el_rate / 3600.0)
+
+    def slew_fixed(self, az_rate, el_rate):
+        """Moves the axes at the fixed rate levels az_rate and el_rate
+
+        :param az_rate: -9 to 9, negative values move backwards
+        """
+        assert (az_rate >= -9) and (az_rate <= 9), 'az_rate out of range'
+        assert (el_rate >= -9) and (el_rate <= 9), 'el_rate out of range'
+        self.slew_var(_sign(az_rate) * self.FIXED_RATES[abs(int(az_rate))],
+                      _sign(el_rate) * self.FIXED_RATES[abs(int(el_rate))])
+
+    def get_tracking_mode(self):
+        return self.tracking_mode
+
+    def set_tracking_mode(self, mode):
+        with self._lock:
+            self._update()
+            self._record('set_tracking_mode', mode)
+            if mode == 0 and self._track is not None:
+                # stop where the mount is
+                self._track = None
+                self._settled = None
+                self._az.target = self._alt.target = None
+            self.tracking_mode = mode
+
+    def get_location_lat_long(self):
+        return self._lat, self._lon
+
+    def set_location_lat_long(self, lat, lon):
+        self._lat = lat
+        self._lon = lon
+
+    def get_time_initializer(self):
+        return self.clock.time()
+
+    def set_time_initializer(self, _time):
+        raise NotImplementedError('the clock of a SimulatedMount is set '
+                                  'by its clock object')
+
+    def alignment_complete(self):
+        return True
+
+    def get_model(self):
+        return 'simulated'
+
+    def get_version(self):
+        return 'simulated'
+
+    def echo(self, x):
+        return x
+
+    def display(self, msg):
+        self._outputs.append(msg)
+
+    def send_command(self, cmd):
+        self._received_commands.append((self._updated, 'send_command', cmd))
@@ -0,0 +1,191 @@
+import functools
+import json
+import os
+import threading
+import time
+
+# the Tracer recording spans, None when tracing is disabled
+_tracer = None
+
+
+class _NullSpan(object):
+    """Span returned while tracing is disabled. It does nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span(object):
+    """Timed section of code, recorded as a Chrome trace complete event"""
+
+    def __init__(self, tracer, name, category, args):
+        self._tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args = dict(self.args or {}, error=exc_type.__name__)
+        self._tracer.add_complete(self.name, self.category, self._start,
+                                  end, self.args)
+        return False
+
+    def set(self, **args):
+        """Adds arguments shown with the span"""
+        self.args = dict(self.args or {}, **args)
+
+
+class Tracer(object):
+    """Collects spans from all threads and exports them as Chrome trace
+    event JSON, which chrome://tracing and Perfetto display as a timeline
+    """
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._events = []
+        self._threads = {}
+        self._lock = threading.Lock()
+        self.pid = os.getpid()
+
+    def _microseconds(self, perf_counter):
+        return (perf_counter - self._start) * 1e6
+
+    def _thread(self):
+        thread = threading.current_thread()
+        tid = thread.ident
+        if tid not in self._threads:
+            with self._lock:
+                self._threads[tid] = thread.name
+        return tid
+
+    def add_complete(self, name, category, start, end, args=None):
+        """Records a span which ran from start to end
+
+        :param start: time.perf_counter() when the span started
+        :param end: time.perf_counter() when it ended
+        """
+        event = dict(name=name, cat=category, ph='X', pid=self.pid,
+                     tid=self._thread(), ts=self._microseconds(start),
+                     dur=(end - start) * 1e6)
+        if args:
+            event['args'] = args
+        # list.append is atomic, no lock needed
+        self._events.append(event)
+
+    def instant(self, name, category='', **args):
+        """Records a point in time, like a goto being issued"""
+        event = dict(name=name, cat=category, ph='i', s='t', pid=self.pid,
+                     tid=self._thread(),
+                     ts=self._microseconds(time.perf_counter()))
+        if args:
+            event['args'] = args
+        self._events.append(event)
+
+    def events(self):
+        """Trace events recorded so far, with the thread names"""
+        with self._lock:
+            threads = list(self._threads.items())
+        metadata = [dict(name='thread_name', ph='M', pid=self.pid, tid=tid,
+                         args=dict(name=name)) for tid, name in threads]
+        return metadata + list(self._events)
+
+    def summary(self):
+        """Total time spent per span name
+
+        :return dictionary of name -> dict(count, total) with total in
+                seconds
+        """
+        totals = {}
+        for event in list(self._events):
+            if event['ph'] != 'X':
+                continue
+            total = totals.setdefault(event['name'], dict(count=0,
+                                                          total=0.0))
+            total['count'] += 1
+            total['total'] += event['dur'] / 1e6
+        return totals
+
+    def save(self, filename):
+        """Writes the trace in the Chrome trace event format"""
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'w') as f:
+            json.dump(dict(traceEvents=self.events(),
+                           displayTimeUnit='ms'), f)
+        os.replace(tmp_filename, filename)
+
+
+def enable():
+    """Starts recording spans
+
+    :return the Tracer recording them
+    """
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def disable():
+    """Stops recording spans
+
+    :return the Tracer which was recording, or None
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def tracer():
+    return _tracer
+
+
+def span(name, category='', **args):
+    """Context manager timing the code it wraps
+
+    Costs one global lookup when tracing is disabled.
+
+    :param name: name shown on the timeline
+    :param category: comma separated categories, to filter the timeline
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return Span(_tracer, name, category, args)
+
+
+def instant(name, category='', **args):
+    if _tracer is not None:
+        _tracer.instant(name, category, **args)
+
+
+def traced(name=None, category=''):
+    """Decorator recording every call of a function as a span
+
+    :param name: name of the span. Default is the function's qualified
+                 name.
+    """
+    def decorator(function):
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return function(*args, **kwargs)
+            with Span(_tracer, span_name, category, None):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,35 @@
+"""Cold start time of the command line tools
+
+Every case starts a new interpreter which only prints the help, so it
+measures imports and argument parsing, the time a user waits before the
+first serial command.
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+SCRIPTS = (('telescope', os.path.join(ROOT, 'telescope')),
+           ('astroscope', os.path.join(ROOT, 'astroscope', 'scripts',
+                                       'astroscope')),
+           ('astrolog', os.path.join(ROOT, 'astroscope', 'scripts',
+                                     'astrolog')))
+
+
+def _run(arguments, env):
+    def run():
+        subprocess.check_call([sys.executable] + arguments, env=env,
+                              stdout=subprocess.DEVNULL)
+    return run
+
+
+def run(results):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [ROOT] + [p for p in [env.get('PYTHONPATH')] if p])
+    # what every case pays for before running any of our code
+    results.measure('cli python startup', _run(['-c', 'pass'], env))
+    for name, filename in SCRIPTS:
+        results.measure('cli {} --help'.format(name),
+                        _run([filename, '--help'], env))
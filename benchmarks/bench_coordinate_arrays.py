@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""Compares the array coordinate utilities with the scalar code paths
+
+Part of benchmarks.suite. Run alone, from the top of the repository, it
+prints the speed up of every array utility:
+
+    python -m benchmarks.bench_coordinate_arrays [--count N]
+"""
+import argparse
+import importlib.machinery
+import importlib.util
+import os
+
+import numpy as np
+
+from astroscope.telescopes import coordinate_arrays
+from astroscope.telescopes.nextstar_telescopes import NexStarSLT130
+from benchmarks import harness
+
+COUNT = 10000
+NAMES = ('wrap correction', 'degrees to hex', 'hex to degrees', 'format dms',
+         'parse dms')
+
+
+def load_telescope_script():
+    """Imports the telescope script, which has no .py extension"""
+    filename = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            os.pardir, 'telescope')
+    loader = importlib.machinery.SourceFileLoader('telescope_script',
+                                                  filename)
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+def cases(count=COUNT):
+    """(name, scalar function, array function) of every compared case"""
+    script = load_telescope_script()
+    degrees = np.random.RandomState(0).uniform(0.0, 360.0, count)
+    values = list(degrees)
+    hex_strings = coordinate_arrays.degrees_to_hex(degrees)
+    hex_bytes = [h.encode('ascii') for h in hex_strings]
+    dms_strings = coordinate_arrays.format_dms(degrees, degree_digits=3)
+    return [
+        ('wrap correction',
+         lambda: [script.correct_degrees(x, 1.5) for x in values],
+         lambda: coordinate_arrays.wrap_degrees(degrees, 1.5)),
+        ('degrees to hex',
+         lambda: [NexStarSLT130.
+                  _convert_degrees_to_percentage_of_revolution_in_hex(x)
+                  for x in values],
+         lambda: coordinate_arrays.degrees_to_hex(degrees)),
+        ('hex to degrees',
+         lambda: [NexStarSLT130.
+                  _convert_hex_percentage_of_revolution_to_degrees(h)
+                  for h in hex_bytes],
+         lambda: coordinate_arrays.hex_to_degrees(hex_bytes)),
+        ('format dms',
+         lambda: [script.convert_to_degree_seconds(x) for x in values],
+         lambda: coordinate_arrays.format_dms(degrees)),
+        ('parse dms',
+         lambda: [sum(float(f) / 60 ** i
+                      for i, f in enumerate(s.split(':')))
+                  for s in dms_strings],
+         lambda: coordinate_arrays.parse_dms(dms_strings)),
+    ]
+
+
+def run(results, count=COUNT):
+    if not any(results.wanted('coordinates {} {}'.format(name, path))
+               for name in NAMES for path in ('scalar', 'array')):
+        return
+    for name, scalar, vectorized in cases(count):
+        results.measure('coordinates {} scalar'.format(name), scalar,
+                        items=count)
+        results.measure('coordinates {} array'.format(name), vectorized,
+                        items=count)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=COUNT,
+                        help="Number of coordinates. Default = 10000")
+    args = parser.parse_args()
+
+    results = harness.Results(verbose=False)
+    run(results, args.count)
+    print("{} coordinates".format(args.count))
+    print("{:<16} {:>12} {:>12} {:>8}".format("", "scalar (ms)", "array (ms)",
+                                              "speedup"))
+    for name in NAMES:
+        scalar_time = results.results[
+            'coordinates {} scalar'.format(name)]['best']
+        array_time = results.results[
+            'coordinates {} array'.format(name)]['best']
+        print("{:<16} {:>12.2f} {:>12.2f} {:>7.1f}x".format(
+            name, scalar_time * 1000, array_time * 1000,
+            scalar_time / array_time))
+
+
+if __name__ == '__main__':
+    main()
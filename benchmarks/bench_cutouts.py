@@ -0,0 +1,98 @@
+"""Catalog cutout downloads through a local stand-in of the cutout service
+
+A local HTTP server answers every request with the same picture, so the
+cases measure the client side: requests, streaming and the cache, without
+the network.
+"""
+import http.server
+import shutil
+import tempfile
+import threading
+
+from astropy import units as u
+from astropy.coordinates import SkyCoord
+
+from astroscope.computers import local
+from astroscope.computers.cutout_cache import CutoutCache
+from astroscope.computers.local import LocalComputer
+from astroscope.computers.prefetch import CutoutPrefetcher
+
+# about the size of a 1024 x 1024 SDSS jpeg cutout
+PICTURE_SIZE = 200 * 1024
+TARGETS = 16
+
+
+class _CutoutHandler(http.server.BaseHTTPRequestHandler):
+
+    picture = b'\xff' * PICTURE_SIZE
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(self.picture)))
+        self.end_headers()
+        self.wfile.write(self.picture)
+
+    def log_message(self, *args):
+        pass
+
+
+class CutoutServer(object):
+    """Cutout service stand-in on a free local port"""
+
+    def __init__(self):
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0),
+                                                       _CutoutHandler)
+        self._server.daemon_threads = True
+        self.url = 'http://127.0.0.1:{}/getjpeg.aspx'.format(
+            self._server.server_address[1])
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='cutout server')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _Computer(LocalComputer):
+    """LocalComputer pointing at a fixed position"""
+
+    position = SkyCoord(ra=83.82 * u.deg, dec=-5.39 * u.deg)
+
+    def get_radec(self):
+        return self.position
+
+
+def run(results):
+    if not any(results.wanted(name) for name in (
+            'cutout fetch', 'cutout fetch cached', 'cutout prefetch')):
+        return
+    server = CutoutServer()
+    directory = tempfile.mkdtemp()
+    output = directory + '/view.jpg'
+    computer = _Computer()
+    base_url = local.CUTOUT_BASE_URL
+    local.CUTOUT_BASE_URL = server.url
+    try:
+        results.measure('cutout fetch',
+                        lambda: computer.find_view_in_catalog(output))
+        computer.cutout_cache = CutoutCache(directory + '/cache')
+        results.measure('cutout fetch cached',
+                        lambda: computer.find_view_in_catalog(output),
+                        number=10)
+
+        def prefetch():
+            cache = CutoutCache(tempfile.mkdtemp(dir=directory))
+            prefetcher = CutoutPrefetcher(cache, base_url=server.url)
+            try:
+                prefetcher.prefetch([(80.0 + i, -5.0)
+                                     for i in range(TARGETS)])
+            finally:
+                prefetcher.close()
+        results.measure('cutout prefetch', prefetch, items=TARGETS)
+    finally:
+        local.CUTOUT_BASE_URL = base_url
+        server.close()
+        shutil.rmtree(directory)
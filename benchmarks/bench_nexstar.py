@@ -0,0 +1,118 @@
+"""NexStar protocol encoding and serial round trips
+
+Encoding and decoding are timed in process. Round trips go through a
+pseudo terminal to a thread emulating the hand controller, so they
+include pyserial and the kernel tty layer but not the 9600 baud line.
+"""
+import os
+import threading
+import tty
+
+import numpy as np
+
+from astroscope.telescopes import coordinate_arrays
+from astroscope.telescopes.nextstar_telescopes import NexStarSLT130
+
+COUNT = 10000
+
+# length of the commands by first character, the others are one character
+_COMMAND_LENGTHS = {'r': 18, 'b': 18, 's': 18, 'R': 18, 'B': 18,
+                    'T': 2, 'K': 2, 'P': 8}
+
+
+class EmulatedNexStar(object):
+    """Hand controller answering on the master side of a pseudo terminal
+
+    Positions are fixed, gotos and syncs are acknowledged. Open device
+    with pyserial like a real telescope.
+    """
+
+    def __init__(self, ra=83.82, dec=-5.39, az=120.5, alt=45.25):
+        self._positions = {
+            'e': self._encode(ra, dec), 'E': self._encode(ra, dec),
+            'z': self._encode(az, alt), 'Z': self._encode(az, alt)}
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.device = os.ttyname(self._slave)
+        self.commands = 0
+        self._thread = threading.Thread(target=self._serve,
+                                        name='emulated nexstar')
+        self._thread.daemon = True
+        self._thread.start()
+
+    @staticmethod
+    def _encode(first, second):
+        convert = NexStarSLT130.\
+            _convert_degrees_to_percentage_of_revolution_in_hex
+        return (convert(first) + ',' + convert(second)).encode('ascii')
+
+    def _answer(self, command):
+        if command[:1] in self._positions:
+            return self._positions[command[:1]] + b'#'
+        if command[:1] == 'K':
+            return command[1:2].encode('latin-1') + b'#'
+        if command[:1] == 't':
+            return b'\x02#'
+        return b'#'
+
+    def _serve(self):
+        pending = ''
+        while True:
+            try:
+                data = os.read(self._master, 1024)
+            except OSError:
+                return
+            if not data:
+                return
+            pending += data.decode('latin-1')
+            while pending:
+                length = _COMMAND_LENGTHS.get(pending[0], 1)
+                if len(pending) < length:
+                    break
+                command, pending = pending[:length], pending[length:]
+                self.commands += 1
+                os.write(self._master, self._answer(command))
+
+    def close(self):
+        for fd in (self._slave, self._master):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def run(results):
+    degrees = np.random.RandomState(0).uniform(0.0, 360.0, COUNT)
+    values = list(degrees)
+    hex_bytes = [h.encode('ascii')
+                 for h in coordinate_arrays.degrees_to_hex(degrees)]
+    encode = NexStarSLT130._convert_degrees_to_percentage_of_revolution_in_hex
+    decode = NexStarSLT130._convert_hex_percentage_of_revolution_to_degrees
+    results.measure('nexstar encode degrees',
+                    lambda: [encode(x) for x in values], items=COUNT)
+    results.measure('nexstar decode degrees',
+                    lambda: [decode(h) for h in hex_bytes], items=COUNT)
+    results.measure('nexstar encode degrees array',
+                    lambda: coordinate_arrays.degrees_to_hex(degrees),
+                    items=COUNT)
+    results.measure('nexstar decode degrees array',
+                    lambda: coordinate_arrays.hex_to_degrees(hex_bytes),
+                    items=COUNT)
+
+    if not any(results.wanted(name) for name in (
+            'nexstar round trip get_ra_dec', 'nexstar round trip goto',
+            'nexstar round trip slew_var')):
+        return
+    emulator = EmulatedNexStar()
+    telescope = NexStarSLT130(emulator.device)
+    try:
+        results.measure('nexstar round trip get_ra_dec',
+                        telescope.get_ra_dec, number=20)
+        results.measure('nexstar round trip goto',
+                        lambda: telescope.goto_ra_dec(83.82, -5.39),
+                        number=20)
+        results.measure('nexstar round trip slew_var',
+                        lambda: telescope.slew_var(12.5, -3.25), number=10)
+    finally:
+        telescope.serial.close()
+        emulator.close()
@@ -0,0 +1,48 @@
+"""Cost of converting telescope positions between alt-az and ICRS
+
+The telescope answers instantly, so the cases only measure the astropy
+work AstropyTelescope does on top of the position query.
+"""
+import time
+
+import numpy as np
+from astropy import units as u
+from astropy.coordinates import AltAz
+from astropy.coordinates import SkyCoord
+from astropy.time import Time
+
+from astroscope.telescopes.astropy_telescope import AstropyTelescope
+from astroscope.telescopes.astropy_transforms import altaz_to_icrs
+
+LAT, LON = 38.0, -121.0
+COUNT = 1000
+
+
+class _InstantTelescope(AstropyTelescope):
+
+    def get_az_alt(self):
+        return 120.5, 45.25
+
+    def get_location_lat_long(self):
+        return LAT, LON
+
+
+def run(results):
+    telescope = _InstantTelescope()
+    results.measure('transform get_azalt radec',
+                    lambda: telescope.get_azalt().radec())
+    results.measure('transform get_azalt skycoord icrs',
+                    lambda: telescope.get_azalt().transform_to('icrs'))
+    # what pointing at a catalog object costs before the goto command
+    frame = AltAz(obstime=Time.now(),
+                  location=telescope.get_earth_location())
+    target = SkyCoord(ra=83.82 * u.deg, dec=-5.39 * u.deg)
+    results.measure('transform icrs to altaz',
+                    lambda: target.transform_to(frame))
+    rng = np.random.RandomState(0)
+    az = rng.uniform(0.0, 360.0, COUNT)
+    alt = rng.uniform(10.0, 90.0, COUNT)
+    times = time.time() + np.arange(COUNT) * 1.0
+    results.measure('transform altaz_to_icrs batch',
+                    lambda: altaz_to_icrs(az, alt, times, LAT, LON),
+                    items=COUNT)
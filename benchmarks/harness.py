@@ -0,0 +1,145 @@
+import collections
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import time
+import timeit
+
+_FORMAT_VERSION = 1
+
+
+def time_calls(function, number=1, repeat=5):
+    """Seconds per call of function, for every repeat"""
+    return [t / number for t in timeit.repeat(function, number=number,
+                                              repeat=repeat)]
+
+
+class Results(object):
+    """Timings of the benchmarks of one run of the suite
+
+    Benchmark modules call measure() for every case; cases whose name does
+    not match pattern are skipped, so set up only costs what runs.
+    """
+
+    def __init__(self, pattern=None, repeat=5, verbose=True):
+        """
+        :param pattern: shell style pattern of the names of the cases to
+                        run, like 'nexstar*'. Default runs all of them.
+        :param repeat: number of timings of every case
+        :param verbose: prints every case when measured
+        """
+        self.pattern = pattern
+        self.repeat = repeat
+        self.verbose = verbose
+        self.results = collections.OrderedDict()
+
+    def wanted(self, name):
+        return self.pattern is None or fnmatch.fnmatch(name, self.pattern)
+
+    def measure(self, name, function, number=1, items=None):
+        """Times function and records the result as name
+
+        :param number: calls per timing, for functions too fast to time
+                       one call at a time
+        :param items: number of items function processes, to report a
+                      throughput
+        """
+        if not self.wanted(name):
+            return None
+        function()
+        times = time_calls(function, number, self.repeat)
+        result = dict(best=min(times), median=statistics.median(times),
+                      number=number, repeat=self.repeat)
+        if items:
+            result['items'] = items
+        self.results[name] = result
+        if self.verbose:
+            print(format_result(name, result))
+        return result
+
+    def as_dict(self):
+        return dict(version=_FORMAT_VERSION, created=time.time(),
+                    python=platform.python_version(),
+                    machine=platform.machine(), node=platform.node(),
+                    results=self.results)
+
+    def save(self, filename):
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'w') as f:
+            json.dump(self.as_dict(), f, indent=1, sort_keys=True)
+        os.replace(tmp_filename, filename)
+
+
+def format_result(name, result):
+    line = "{:<40} {:>12.3f} ms {:>12.3f} ms".format(
+        name, result['best'] * 1000, result['median'] * 1000)
+    if result.get('items'):
+        line += " {:>12.0f}/s".format(result['items'] / result['best'])
+    return line
+
+
+def load_results(filename):
+    """Reads results saved by Results.save
+
+    :return dictionary of name -> result
+    """
+    with open(filename) as f:
+        saved = json.load(f)
+    if saved.get('version') != _FORMAT_VERSION:
+        raise ValueError('unsupported results version {} in {}'.format(
+            saved.get('version'), filename))
+    return saved['results']
+
+
+Comparison = collections.namedtuple('Comparison',
+                                    'name baseline current ratio status')
+
+
+def compare(baseline, current, threshold=0.2, statistic='best'):
+    """Compares two sets of results
+
+    :param baseline: dictionary of name -> result, as load_results returns
+    :param current: dictionary of name -> result
+    :param threshold: relative slow down flagged as a regression. 0.2
+                      flags cases more than 20% slower.
+    :param statistic: 'best' or 'median' timing compared
+    :return list of Comparison, with status one of 'regression',
+            'improvement', 'ok', 'new' and 'missing'
+    """
+    comparisons = []
+    for name in list(baseline) + [n for n in current if n not in baseline]:
+        if name not in current:
+            comparisons.append(Comparison(name, baseline[name][statistic],
+                                          None, None, 'missing'))
+            continue
+        if name not in baseline:
+            comparisons.append(Comparison(name, None,
+                                          current[name][statistic], None,
+                                          'new'))
+            continue
+        before = baseline[name][statistic]
+        after = current[name][statistic]
+        ratio = after / before if before else float('inf')
+        if ratio > 1.0 + threshold:
+            status = 'regression'
+        elif ratio < 1.0 / (1.0 + threshold):
+            status = 'improvement'
+        else:
+            status = 'ok'
+        comparisons.append(Comparison(name, before, after, ratio, status))
+    return comparisons
+
+
+def format_comparison(comparison):
+    def milliseconds(seconds):
+        if seconds is None:
+            return "{:>12}".format("-")
+        return "{:>9.3f} ms".format(seconds * 1000)
+
+    ratio = "{:>7.2f}x".format(comparison.ratio) \
+        if comparison.ratio is not None else "{:>8}".format("-")
+    return "{:<40} {} {} {} {}".format(
+        comparison.name, milliseconds(comparison.baseline),
+        milliseconds(comparison.current), ratio, comparison.status)
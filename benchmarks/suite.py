@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""Runs the benchmarks of the hot paths and compares them with a baseline
+
+Usage, from the top of the repository:
+
+    python -m benchmarks.suite run [-k 'nexstar*'] [--output results.json]
+    python -m benchmarks.suite run --save_baseline
+    python -m benchmarks.suite compare [baseline.json] results.json
+    python -m benchmarks.suite run --compare
+
+Baselines are machine specific: save one on the machine the telescope is
+driven from, then compare later runs on the same machine against it.
+compare exits with status 1 when a case got slower than the threshold.
+"""
+import argparse
+import os
+import platform
+import sys
+
+from benchmarks import bench_cli
+from benchmarks import bench_coordinate_arrays
+from benchmarks import bench_cutouts
+from benchmarks import bench_nexstar
+from benchmarks import bench_transforms
+from benchmarks import harness
+
+MODULES = (bench_cli, bench_nexstar, bench_transforms, bench_coordinate_arrays,
+           bench_cutouts)
+
+BASELINE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  'baselines')
+
+
+def default_baseline():
+    """Baseline of this machine, benchmarks/baselines/<host name>.json"""
+    return os.path.join(BASELINE_DIRECTORY,
+                        '{}.json'.format(platform.node() or 'default'))
+
+
+def run(pattern=None, repeat=5):
+    """Runs the cases of all benchmark modules whose names match pattern
+
+    :return Results
+    """
+    results = harness.Results(pattern, repeat)
+    print("{:<40} {:>15} {:>15}".format("", "best", "median"))
+    for module in MODULES:
+        module.run(results)
+    return results
+
+
+def print_comparison(baseline, current, threshold, statistic):
+    """Prints the comparison of current with baseline
+
+    :return number of regressions
+    """
+    comparisons = harness.compare(baseline, current, threshold, statistic)
+    print("{:<40} {:>12} {:>12} {:>8}".format("", "baseline", "current",
+                                              "ratio"))
+    for comparison in comparisons:
+        print(harness.format_comparison(comparison))
+    regressions = [c for c in comparisons if c.status == 'regression']
+    if regressions:
+        print("{} regression(s) beyond {:.0%}".format(len(regressions),
+                                                      threshold))
+    return len(regressions)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the command line start up, the NexStar "
+                    "protocol, the coordinate transforms and arrays and the "
+                    "cutout downloads.")
+    commands = parser.add_subparsers(dest="command")
+    run_parser = commands.add_parser("run", help="Runs the benchmarks.")
+    run_parser.add_argument("-k", metavar="pattern", dest="pattern",
+                            help="Only runs the cases matching this shell "
+                                 "style pattern, like 'nexstar*'.")
+    run_parser.add_argument("--repeat", type=int, default=5,
+                            help="Timings per case. Default = 5")
+    run_parser.add_argument("--output", metavar="filename",
+                            help="Saves the results to filename.")
+    run_parser.add_argument("--save_baseline", action="store_true",
+                            help="Saves the results as the baseline of "
+                                 "this machine.")
+    run_parser.add_argument("--compare", nargs="?", const="",
+                            metavar="baseline",
+                            help="Compares the results with baseline. "
+                                 "Default is the baseline of this machine.")
+    compare_parser = commands.add_parser(
+        "compare", help="Compares saved results with a baseline.")
+    compare_parser.add_argument("files", nargs="+", metavar="filename",
+                                help="baseline and results, or only the "
+                                     "results to compare with the baseline "
+                                     "of this machine.")
+    for _parser in (run_parser, compare_parser):
+        _parser.add_argument("--threshold", type=float, default=0.2,
+                             help="Slow down flagged as a regression. "
+                                  "Default = 0.2, 20%%")
+        _parser.add_argument("--statistic", choices=("best", "median"),
+                             default="best",
+                             help="Timing compared. Default = best")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        if len(args.files) > 2:
+            parser.error("compare takes at most two files")
+        baseline = args.files[0] if len(args.files) == 2 else \
+            default_baseline()
+        current = harness.load_results(args.files[-1])
+        sys.exit(1 if print_comparison(harness.load_results(baseline),
+                                       current, args.threshold,
+                                       args.statistic) else 0)
+    if args.command != "run":
+        parser.print_help()
+        return
+
+    results = run(args.pattern, args.repeat)
+    if args.output:
+        results.save(args.output)
+    if args.save_baseline:
+        if not os.path.isdir(BASELINE_DIRECTORY):
+            os.makedirs(BASELINE_DIRECTORY)
+        results.save(default_baseline())
+        print("baseline saved to {}".format(default_baseline()))
+    if args.compare is not None:
+        baseline = args.compare or default_baseline()
+        if not os.path.exists(baseline):
+            raise SystemExit("{} does not exist. Save one with "
+                             "--save_baseline".format(baseline))
+        # cases left out with -k are not missing
+        baseline = dict((name, result) for name, result
+                        in harness.load_results(baseline).items()
+                        if results.wanted(name))
+        print("")
+        sys.exit(1 if print_comparison(baseline, results.results,
+                                       args.threshold,
+                                       args.statistic) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,16 @@
-from distutils.core import setup
+from setuptools import setup
 setup(name='astroscope',
       version='0.1.2',
       packages=['astroscope',
                 'astroscope.cameras',
+                'astroscope.catalogs',
                 'astroscope.computers',
+                'astroscope.guiding',
+                'astroscope.planning',
                 'astroscope.telescopes'],
-      scripts=['astroscope/scripts/astroscope', 'telescope']
+      scripts=['astroscope/scripts/astroscope',
+               'astroscope/scripts/astrolog',
+               'telescope'],
+      extras_require={'satellites': ['sgp4>=2.7']}
       )
 
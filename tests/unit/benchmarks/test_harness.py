@@ -0,0 +1,70 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from benchmarks import harness
+
+
+def _result(best, median=None):
+    return dict(best=best, median=best if median is None else median,
+                number=1, repeat=5)
+
+
+class TestHarness(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'results.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_compare(self):
+        baseline = {'slower': _result(1.0), 'faster': _result(1.0),
+                    'same': _result(1.0), 'gone': _result(1.0)}
+        current = {'slower': _result(1.3), 'faster': _result(0.5),
+                   'same': _result(1.1), 'added': _result(2.0)}
+        comparisons = dict((c.name, c) for c in
+                           harness.compare(baseline, current, threshold=0.2))
+        self.assertEqual(dict((name, c.status)
+                              for name, c in comparisons.items()),
+                         {'slower': 'regression', 'faster': 'improvement',
+                          'same': 'ok', 'gone': 'missing', 'added': 'new'})
+        self.assertAlmostEqual(comparisons['slower'].ratio, 1.3)
+        self.assertEqual(comparisons['gone'],
+                         harness.Comparison('gone', 1.0, None, None,
+                                            'missing'))
+        self.assertEqual(comparisons['added'],
+                         harness.Comparison('added', None, 2.0, None, 'new'))
+
+    def test_compare_statistic(self):
+        baseline = {'case': _result(1.0, median=1.0)}
+        current = {'case': _result(1.0, median=2.0)}
+        self.assertEqual(harness.compare(baseline, current)[0].status, 'ok')
+        self.assertEqual(
+            harness.compare(baseline, current, statistic='median')[0].status,
+            'regression')
+
+    def test_load_results(self):
+        results = harness.Results(verbose=False, repeat=2)
+        results.measure('case', lambda: None, items=3)
+        results.save(self.filename)
+        loaded = harness.load_results(self.filename)
+        self.assertEqual(list(loaded), ['case'])
+        self.assertEqual(loaded['case']['items'], 3)
+        self.assertEqual(loaded['case']['repeat'], 2)
+        self.assertFalse(os.path.exists(self.filename + '.tmp'))
+
+    def test_load_results_version_mismatch(self):
+        with open(self.filename, 'w') as f:
+            json.dump(dict(version=harness._FORMAT_VERSION + 1,
+                           results={'case': _result(1.0)}), f)
+        self.assertRaises(ValueError, harness.load_results, self.filename)
+
+    def test_measure_pattern(self):
+        results = harness.Results('nexstar*', repeat=1, verbose=False)
+        self.assertIsNone(results.measure('cutout fetch', lambda: None))
+        self.assertIsNotNone(results.measure('nexstar goto', lambda: None))
+        self.assertEqual(list(results.results), ['nexstar goto'])
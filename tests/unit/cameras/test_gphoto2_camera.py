@@ -0,0 +1,57 @@
+from unittest import TestCase
+
+import mock
+
+from astroscope.cameras import gphoto2_camera
+from astroscope.cameras.cameras import CameraError
+
+
+class TestGPhoto2Camera(TestCase):
+
+    def setUp(self):
+        self.camera = gphoto2_camera.GPhoto2Camera(port='usb:001,004')
+        self.camera.run = mock.Mock(return_value='')
+
+    def test_set_exposure(self):
+        self.camera.set_exposure(0.01)
+        self.camera.run.assert_called_with('--set-config-value',
+                                           'shutterspeed=1/100')
+        self.camera.set_exposure(2)
+        self.camera.run.assert_called_with('--set-config-value',
+                                           'shutterspeed=2')
+        self.assertEqual(self.camera.exposure, 2)
+
+    def test_wait_for_exposure(self):
+        self.camera.run.return_value = (
+            'UNKNOWN PTP Property d1d3 changed\n'
+            'FILEADDED IMG_0042.CR2 /store_00020001/DCIM/100CANON\n')
+        handle = self.camera.trigger()
+        image = self.camera.wait_for_exposure(handle - 10)
+        self.assertEqual(image, ('/store_00020001/DCIM/100CANON',
+                                 'IMG_0042.CR2'))
+        self.assertEqual(self.camera.image_extension(image), '.cr2')
+
+    def test_wait_for_exposure_without_picture(self):
+        self.assertRaises(CameraError, self.camera.wait_for_exposure, 0)
+
+    @mock.patch.object(gphoto2_camera.subprocess, 'Popen')
+    def test_run(self, mocked_popen):
+        camera = gphoto2_camera.GPhoto2Camera(port='usb:001,004')
+        mocked_popen.return_value.communicate.return_value = (b'ok', None)
+        mocked_popen.return_value.returncode = 0
+        self.assertEqual(camera.run('--reset'), 'ok')
+        self.assertEqual(mocked_popen.call_args[0][0],
+                         ['gphoto2', '--port', 'usb:001,004', '--reset'])
+        mocked_popen.return_value.returncode = 1
+        self.assertRaises(CameraError, camera.run, '--reset')
+
+    def test_bulb_commands(self):
+        self.camera.mirror_up()
+        self.camera.run.assert_called_with('--set-config', 'eosremoterelease=2',
+                                           '--set-config', 'eosremoterelease=4')
+        self.camera.open_shutter()
+        self.camera.run.assert_called_with('--set-config',
+                                           'eosremoterelease=2')
+        self.camera.close_shutter()
+        self.camera.run.assert_called_with('--set-config', 'eosremoterelease=4',
+                                           '--set-config', 'eosremoterelease=0')
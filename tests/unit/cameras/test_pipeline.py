@@ -0,0 +1,61 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import mock
+import numpy as np
+
+from astroscope.cameras import pipeline
+from astroscope.cameras.simulation import FakeCamera
+
+
+class TestCapturePipeline(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.camera = FakeCamera(shape=(16, 16), download_time=0.1, seed=1)
+        self.camera.set_exposure(0.1)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_run(self):
+        consumer = mock.Mock()
+        dut = pipeline.CapturePipeline(self.camera, self.tmpdir,
+                                       frame_consumers=[consumer])
+        frames = dut.run(3)
+        self.assertEqual([f.index for f in frames], [0, 1, 2])
+        self.assertEqual(sorted(os.listdir(self.tmpdir)),
+                         ['frame_0000.npy', 'frame_0001.npy',
+                          'frame_0002.npy'])
+        image = np.load(frames[0].filename)
+        self.assertEqual(image.shape, (16, 16))
+        self.assertEqual(consumer.call_count, 3)
+        data = consumer.call_args[0][1]
+        self.assertEqual(np.load(io.BytesIO(data)).shape, (16, 16))
+
+    def test_frames_logged(self):
+        dut = pipeline.CapturePipeline(self.camera, self.tmpdir)
+        dut.observing_log = mock.Mock()
+        dut.observing_target = 'M31'
+        frames = dut.run(2)
+        self.assertEqual(dut.observing_log.log_frame.call_args_list,
+                         [mock.call(f.filename, 0.1, target='M31')
+                          for f in frames])
+
+    def test_download_overlaps_exposure(self):
+        dut = pipeline.CapturePipeline(self.camera, self.tmpdir)
+        frames = dut.run(4)
+        # the next exposure starts before the previous download finished
+        for previous, frame in zip(frames, frames[1:]):
+            self.assertLess(frame.triggered, previous.downloaded)
+        elapsed = frames[-1].written - frames[0].triggered
+        self.assertLess(elapsed, 4 * 0.2)
+
+    def test_error_stops_pipeline(self):
+        self.camera.download_image = mock.Mock(side_effect=IOError('usb'))
+        dut = pipeline.CapturePipeline(self.camera, self.tmpdir)
+        self.assertRaises(IOError, dut.run, 5)
+        self.assertLess(len(self.camera.triggered), 5)
@@ -0,0 +1,104 @@
+import time
+from unittest import TestCase
+
+import mock
+
+from astroscope.cameras import sequencer
+from astroscope.cameras.simulation import FakeCamera
+
+
+class _Clock(object):
+    """Clock only moving when slept on or advanced"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep_until(self, deadline):
+        self.now = max(self.now, deadline)
+        return self.now
+
+
+class TestExposureSequencer(TestCase):
+
+    def setUp(self):
+        self.camera = FakeCamera(shape=(8, 8), seed=1)
+        self.camera.set_trigger_delay(0.05)
+        self.dut = sequencer.ExposureSequencer(self.camera, exposure=0.1)
+
+    def test_sleep_until(self):
+        deadline = time.monotonic() + 0.02
+        reached = sequencer.sleep_until(deadline)
+        self.assertGreaterEqual(reached, deadline)
+        self.assertLess(reached - deadline, 0.01)
+
+    def test_expose(self):
+        start = time.monotonic()
+        image = self.dut.expose()
+        self.assertEqual(image[1].shape, (8, 8))
+        self.assertEqual(self.camera.mirror_ups, 1)
+        self.assertAlmostEqual(self.camera.last_exposure, 0.1, delta=0.01)
+        self.assertEqual([e.name for e in self.dut.events],
+                         ['mirror_up', 'shutter_open', 'shutter_close'])
+        self.assertAlmostEqual(self.dut.events[1].planned, start + 0.05,
+                               delta=0.01)
+        for error in self.dut.timing_errors():
+            self.assertLess(error, 0.01)
+
+    def test_run_waits_for_mount(self):
+        telescope = mock.Mock()
+        telescope.goto_in_progress.side_effect = [True, False, False]
+        with mock.patch.object(sequencer.time, 'sleep') as mocked_sleep:
+            images = self.dut.run(2, telescope=telescope)
+        self.assertEqual(len(images), 2)
+        self.assertEqual(telescope.goto_in_progress.call_count, 3)
+        self.assertIn(mock.call(0.2), mocked_sleep.call_args_list)
+
+    def test_run_logs_frames(self):
+        self.dut.observing_log = mock.Mock()
+        self.dut.run(2)
+        self.assertEqual(self.dut.observing_log.log_frame.call_args_list,
+                         [mock.call(None, 0.1, target=None)] * 2)
+
+    def test_run_logs_consumer_filenames(self):
+        self.dut.observing_log = mock.Mock()
+        self.dut.observing_target = 'M31'
+        self.dut.consumer = mock.Mock(side_effect=['a.npy', 'b.npy'])
+        images = self.dut.run(2)
+        self.assertEqual(self.dut.consumer.call_args_list,
+                         [mock.call(0, images[0]), mock.call(1, images[1])])
+        self.assertEqual(self.dut.observing_log.log_frame.call_args_list,
+                         [mock.call('a.npy', 0.1, target='M31'),
+                          mock.call('b.npy', 0.1, target='M31')])
+
+    def test_run_with_interval(self):
+        clock = _Clock(100.0)
+        dut = sequencer.ExposureSequencer(self.camera, 1.0, mirror_delay=2.0,
+                                          clock=clock,
+                                          sleep_until=clock.sleep_until)
+        dut.run(2, download=False, interval=10.0)
+        planned = [e.planned for e in dut.events]
+        self.assertEqual(planned, [100.0, 102.0, 103.0,
+                                   110.0, 112.0, 113.0])
+        statistics = dut.statistics()
+        self.assertEqual(statistics['shutter_open']['max'], 0.0)
+        self.assertEqual(statistics['exposure']['count'], 2)
+
+    def test_camera_latency(self):
+        clock = _Clock(100.0)
+        camera = mock.Mock()
+
+        def slow_open():
+            clock.now += 0.3
+        camera.open_shutter.side_effect = slow_open
+        dut = sequencer.ExposureSequencer(camera, 1.0, mirror_delay=2.0,
+                                          clock=clock,
+                                          sleep_until=clock.sleep_until)
+        dut.expose()
+        opened, closed = dut.events[1], dut.events[2]
+        # the open latency is reported and does not shorten the exposure
+        self.assertAlmostEqual(opened.actual - opened.planned, 0.3)
+        self.assertAlmostEqual(closed.planned, 103.3)
+        self.assertAlmostEqual(closed.actual - opened.actual, 1.0)
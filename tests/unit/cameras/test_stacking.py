@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from astroscope.cameras import stacking
+from astroscope.cameras.pipeline import CapturePipeline
+from astroscope.cameras.simulation import FakeCamera
+
+
+class TestStreamingStacker(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.random = np.random.RandomState(3)
+        self.frames = self.random.normal(100.0, 5.0, (20, 10, 12))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_mean_without_rejection(self):
+        dut = stacking.StreamingStacker(self.tmpdir, (10, 12), sigma=None,
+                                        block_rows=3)
+        for frame in self.frames:
+            dut.add(frame)
+        np.testing.assert_allclose(dut.mean, self.frames.mean(axis=0))
+        np.testing.assert_allclose(dut.std(), self.frames.std(axis=0, ddof=1))
+
+    def test_sigma_clipping(self):
+        dut = stacking.StreamingStacker(self.tmpdir, (10, 12), sigma=3.0)
+        self.frames[10, 4, :] = 60000.0  # satellite trail
+        for frame in self.frames:
+            dut.add(frame)
+        self.assertGreaterEqual(dut.rejected, 12)
+        self.assertLess(dut.rejected, 40)
+        self.assertLess(abs(dut.mean[4].mean() - 100.0), 5.0)
+
+    def test_resume(self):
+        dut = stacking.StreamingStacker(self.tmpdir, (10, 12), sigma=None)
+        for frame in self.frames[:10]:
+            dut.add(frame)
+        dut.flush()
+        del dut
+        dut = stacking.StreamingStacker(self.tmpdir, (10, 12), sigma=None,
+                                        resume=True)
+        for frame in self.frames[10:]:
+            dut.add(frame)
+        self.assertEqual(dut.frames, 20)
+        np.testing.assert_allclose(dut.mean, self.frames.mean(axis=0))
+
+    def test_wrong_shape(self):
+        dut = stacking.StreamingStacker(self.tmpdir, (10, 12))
+        self.assertRaises(ValueError, dut.add, np.zeros((12, 10)))
+
+    def test_frame_consumer(self):
+        camera = FakeCamera(shape=(16, 16), seed=2)
+        camera.set_exposure(0.0)
+        dut = stacking.StreamingStacker(os.path.join(self.tmpdir, 'stack'),
+                                        (16, 16))
+        CapturePipeline(camera, os.path.join(self.tmpdir, 'frames'),
+                        frame_consumers=[dut.frame_consumer()]).run(4)
+        self.assertEqual(dut.frames, 4)
+        preview = dut.preview()
+        self.assertEqual(preview.dtype, np.uint8)
+        self.assertEqual(preview.max(), 255)
@@ -0,0 +1,165 @@
+import math
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+import mock
+import numpy as np
+
+from astroscope.cameras.simulation import FakeCamera
+from astroscope.catalogs import plate_solver
+from astroscope.catalogs import star_catalog
+
+RA, DEC = 150.0, 30.0
+SHAPE = (300, 400)
+SCALE = 6.0
+ROTATION = 30.0
+
+
+def render_field(catalog_ra, catalog_dec, mag, ra, dec, parity=-1,
+                 seed=3):
+    """FakeCamera looking at ra, dec, with north rotated by ROTATION"""
+    xi, eta = plate_solver._radec_to_tangent(catalog_ra, catalog_dec, ra,
+                                             dec)
+    angle = math.radians(ROTATION)
+    u = (math.cos(angle) * xi + math.sin(angle) * eta) * 3600.0 / SCALE
+    v = (-math.sin(angle) * xi + math.cos(angle) * eta) * 3600.0 / SCALE
+    x = (SHAPE[1] - 1) / 2.0 + u
+    y = (SHAPE[0] - 1) / 2.0 + parity * v
+    inside = (x > -5) & (x < SHAPE[1] + 5) & (y > -5) & (y < SHAPE[0] + 5)
+    flux = 200.0 * 10 ** (-0.4 * (mag - 12.0))
+    return FakeCamera(shape=SHAPE, noise=5.0, seed=seed,
+                      stars=list(zip(x[inside], y[inside], flux[inside])))
+
+
+class TestQuadCodes(TestCase):
+
+    def test_invariance(self):
+        rng = np.random.RandomState(1)
+        x, y = rng.uniform(0, 100, (50, 4)), rng.uniform(0, 100, (50, 4))
+        codes, order, diameters = plate_solver.quad_codes(x, y)
+        # rotated, scaled, moved and shuffled quads have the same codes
+        z = (x + 1j * y) * 2.5 * np.exp(1j * 1.1) + (30 - 7j)
+        shuffle = rng.permutation(4)
+        z = z[:, shuffle]
+        moved, moved_order, moved_diameters = plate_solver.quad_codes(
+            z.real, z.imag)
+        np.testing.assert_allclose(moved, codes, atol=1e-9)
+        np.testing.assert_allclose(moved_diameters, diameters * 2.5)
+        np.testing.assert_array_equal(shuffle[moved_order], order)
+        # mirrored quads have conjugate codes
+        mirrored, _, _ = plate_solver.quad_codes(x, -y)
+        np.testing.assert_allclose(mirrored, codes * [1, -1, 1, -1],
+                                   atol=1e-9)
+
+    def test_tangent_plane(self):
+        xi, eta = plate_solver._radec_to_tangent(151.0, 31.5, RA, DEC)
+        ra, dec = plate_solver._tangent_to_radec(xi, eta, RA, DEC)
+        self.assertAlmostEqual(float(ra), 151.0)
+        self.assertAlmostEqual(float(dec), 31.5)
+
+
+class TestPlateSolver(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        rng = np.random.RandomState(11)
+        n = 6000
+        cls.ra = rng.uniform(RA - 4.0, RA + 4.0, n)
+        cls.dec = rng.uniform(DEC - 3.5, DEC + 3.5, n)
+        cls.mag = rng.uniform(6.0, 12.0, n)
+        catalog_directory = cls.tmpdir + '/catalog'
+        star_catalog.build_catalog(catalog_directory, cls.ra, cls.dec,
+                                   cls.mag, ['S%d' % i for i in range(n)])
+        cls.index_directory = cls.tmpdir + '/index'
+        plate_solver.build_quad_index(
+            star_catalog.StarCatalog(catalog_directory), cls.index_directory,
+            field_size=0.5, stars_per_cell=8)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def _solve(self, ra, dec, hint_ra, hint_dec, parity=-1, **kwargs):
+        camera = render_field(self.ra, self.dec, self.mag, ra, dec, parity)
+        solver = plate_solver.PlateSolver(self.index_directory, **kwargs)
+        return solver.solve(camera.render(), hint_ra, hint_dec)
+
+    def test_solve(self):
+        start = time.perf_counter()
+        solution = self._solve(150.4, 29.8, RA, DEC, arcsec_per_pixel=5.5)
+        elapsed = time.perf_counter() - start
+        self.assertLess(star_catalog.angular_separation(
+            solution.ra, solution.dec, 150.4, 29.8) * 3600.0, 2 * SCALE)
+        self.assertAlmostEqual(solution.scale, SCALE, delta=0.05)
+        self.assertAlmostEqual(solution.rotation, ROTATION, delta=0.5)
+        self.assertEqual(solution.parity, -1)
+        self.assertGreaterEqual(solution.matches, 6)
+        self.assertLess(solution.rms, SCALE)
+        self.assertLess(elapsed, 5.0)
+
+    def test_solve_mirrored_without_scale(self):
+        solution = self._solve(149.2, 31.1, 148.0, 32.0, parity=1)
+        self.assertLess(star_catalog.angular_separation(
+            solution.ra, solution.dec, 149.2, 31.1) * 3600.0, 2 * SCALE)
+        self.assertEqual(solution.parity, 1)
+
+    def test_too_far(self):
+        self.assertRaises(plate_solver.PlateSolveError, self._solve,
+                          150.4, 29.8, RA + 3.0, DEC, radius=1.0)
+
+    def test_empty_picture(self):
+        solver = plate_solver.PlateSolver(self.index_directory)
+        self.assertRaises(plate_solver.PlateSolveError, solver.solve,
+                          np.zeros(SHAPE), RA, DEC)
+
+    def test_missing_index(self):
+        solver = plate_solver.PlateSolver(self.tmpdir + '/missing')
+        self.assertRaises(plate_solver.PlateSolveError, solver.solve,
+                          np.zeros(SHAPE), RA, DEC)
+
+    def test_solve_and_sync(self):
+        camera = render_field(self.ra, self.dec, self.mag, 150.4, 29.8)
+        telescope = mock.Mock()
+        telescope.get_ra_dec.return_value = (RA, DEC)
+        solver = plate_solver.PlateSolver(self.index_directory,
+                                          arcsec_per_pixel=SCALE)
+        solution = plate_solver.solve_and_sync(telescope, camera, solver)
+        telescope.sync.assert_called_once_with(solution.ra, solution.dec)
+        self.assertLess(star_catalog.angular_separation(
+            solution.ra, solution.dec, 150.4, 29.8) * 3600.0, 2 * SCALE)
+
+
+class TestPlateSolverAtRaZero(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        rng = np.random.RandomState(11)
+        n = 6000
+        cls.ra = rng.uniform(-4.0, 4.0, n) % 360.0
+        cls.dec = rng.uniform(DEC - 3.5, DEC + 3.5, n)
+        cls.mag = rng.uniform(6.0, 12.0, n)
+        catalog_directory = cls.tmpdir + '/catalog'
+        star_catalog.build_catalog(catalog_directory, cls.ra, cls.dec,
+                                   cls.mag, ['S%d' % i for i in range(n)])
+        cls.index_directory = cls.tmpdir + '/index'
+        plate_solver.build_quad_index(
+            star_catalog.StarCatalog(catalog_directory), cls.index_directory,
+            field_size=0.5, stars_per_cell=8)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def test_solve_across_ra_zero(self):
+        camera = render_field(self.ra, self.dec, self.mag, 0.05, 29.8)
+        solver = plate_solver.PlateSolver(self.index_directory,
+                                          arcsec_per_pixel=SCALE)
+        # a mean of the right ascensions of the stars found the antipode
+        solution = solver.solve(camera.render(), 359.8, DEC)
+        self.assertLess(star_catalog.angular_separation(
+            solution.ra, solution.dec, 0.05, 29.8) * 3600.0, 2 * SCALE)
+        self.assertLess(solution.rms, SCALE)
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from astroscope.catalogs import star_catalog
+
+
+class TestStarCatalog(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        rng = np.random.RandomState(7)
+        n = 20000
+        self.ra = rng.uniform(0.0, 360.0, n)
+        self.dec = np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, n)))
+        self.names = ['HIP %d' % i for i in range(n)]
+        star_catalog.build_catalog(self.tmpdir, self.ra, self.dec,
+                                   rng.uniform(0.0, 12.0, n), self.names,
+                                   zone_height=2.0)
+        self.catalog = star_catalog.StarCatalog(self.tmpdir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _brute_force(self, ra, dec, radius):
+        separation = star_catalog.angular_separation(ra, dec, self.ra,
+                                                     self.dec)
+        return np.count_nonzero(separation <= radius)
+
+    def test_lazy_load(self):
+        catalog = star_catalog.StarCatalog(
+            os.path.join(self.tmpdir, 'missing'))
+        self.assertRaises(star_catalog.CatalogError, len, catalog)
+
+    def test_cone_search(self):
+        for ra, dec, radius in ((10.0, 20.0, 3.0), (359.5, 0.0, 2.0),
+                                (0.1, 89.0, 4.0), (200.0, -87.0, 6.0),
+                                (90.0, 45.0, 60.0)):
+            found = self.catalog.cone_search(ra, dec, radius)
+            self.assertEqual(len(found), self._brute_force(ra, dec, radius))
+            separations = [entry.separation for entry in found]
+            self.assertEqual(separations, sorted(separations))
+
+    def test_nearest(self):
+        i = 1234
+        nearest = self.catalog.nearest(self.ra[i] + 0.001, self.dec[i], 3)
+        self.assertEqual(len(nearest), 3)
+        self.assertEqual(nearest[0].name, self.names[i])
+        separation = star_catalog.angular_separation(
+            self.ra[i] + 0.001, self.dec[i], self.ra, self.dec)
+        self.assertAlmostEqual(nearest[2].separation,
+                               np.sort(separation)[2])
+
+    def test_find(self):
+        entry = self.catalog.find('hip 42')
+        self.assertEqual(entry.name, 'HIP 42')
+        self.assertAlmostEqual(entry.ra, self.ra[42])
+        self.assertAlmostEqual(entry.dec, self.dec[42])
+        self.assertIsNone(self.catalog.find('HIP 999999'))
+
+    def test_build_catalog_from_csv(self):
+        csv_filename = os.path.join(self.tmpdir, 'objects.csv')
+        with open(csv_filename, 'w') as f:
+            f.write('name,ra,dec,mag\nM31,10.6847,41.2690,3.4\n'
+                    'M42,83.8221,-5.3911,4.0\n')
+        directory = os.path.join(self.tmpdir, 'messier')
+        star_catalog.build_catalog_from_csv(csv_filename, directory)
+        catalog = star_catalog.StarCatalog(directory)
+        self.assertEqual(len(catalog), 2)
+        self.assertEqual(catalog.nearest(83.0, -5.0)[0].name, 'M42')
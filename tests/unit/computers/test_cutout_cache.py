@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import mock
+
+from astroscope.computers import cutout_cache
+from astroscope.computers import local
+
+
+class TestCutoutCache(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = cutout_cache.CutoutCache(
+            os.path.join(self.tmpdir, 'cache'), max_bytes=25)
+        self.params = cutout_cache.cutout_params(150.0, 2.0)
+        self.output = os.path.join(self.tmpdir, 'out.jpg')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_cutout_params(self):
+        self.assertEqual(self.params['width'], 1024)
+        self.assertAlmostEqual(self.params['scale'], 720.0 / 1024)
+
+    def test_quantize(self):
+        nearby = dict(self.params, ra=150.001, dec=2.001)
+        self.assertEqual(self.cache.quantize(nearby),
+                         self.cache.quantize(self.params))
+        self.assertEqual(self.cache.quantize(dict(self.params,
+                                                  ra=359.999))['ra'], 0.0)
+
+    def test_put_and_get(self):
+        self.assertIsNone(self.cache.get(self.params))
+        self.cache.put(self.params, [b'abc', b'def'])
+        nearby = dict(self.params, ra=150.001)
+        self.assertIn(nearby, self.cache)
+        with self.cache.get(nearby) as mapped:
+            self.assertEqual(mapped[:], b'abcdef')
+        self.assertTrue(self.cache.copy_to(self.params, self.output))
+        with open(self.output, 'rb') as f:
+            self.assertEqual(f.read(), b'abcdef')
+
+    def test_lru_eviction(self):
+        first = dict(self.params, ra=10.0)
+        second = dict(self.params, ra=20.0)
+        third = dict(self.params, ra=30.0)
+        self.cache.put(first, [b'1' * 10])
+        self.cache.put(second, [b'2' * 10])
+        self.cache.get(first).close()
+        self.cache.put(third, [b'3' * 10])
+        self.assertIn(first, self.cache)
+        self.assertNotIn(second, self.cache)
+        self.assertIn(third, self.cache)
+        self.assertEqual(self.cache.size, 20)
+
+    def test_failed_put_leaves_no_entry(self):
+        def chunks():
+            yield b'abc'
+            raise IOError('connection lost')
+        self.assertRaises(IOError, self.cache.put, self.params, chunks())
+        self.assertNotIn(self.params, self.cache)
+        self.assertEqual(os.listdir(self.cache.directory), [])
+
+    def test_reload(self):
+        self.cache.put(self.params, [b'abc'])
+        reloaded = cutout_cache.CutoutCache(self.cache.directory)
+        self.assertIn(self.params, reloaded)
+        self.assertEqual(reloaded.size, 3)
+
+
+class TestFindViewInCatalog(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.output = os.path.join(self.tmpdir, 'out.jpg')
+        self.computer = local.LocalComputer()
+        self.computer.get_radec = mock.Mock()
+        self.computer.get_radec.return_value.ra.deg = 150.0
+        self.computer.get_radec.return_value.dec.deg = 2.0
+        self.computer.cutout_cache = cutout_cache.CutoutCache(
+            os.path.join(self.tmpdir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    @mock.patch.object(local.requests, 'get')
+    def test_find_view_in_catalog_uses_cache(self, mocked_get):
+        mocked_get.return_value.iter_content.return_value = [b'jpeg']
+        self.computer.find_view_in_catalog(self.output)
+        self.computer.find_view_in_catalog(self.output)
+        self.assertEqual(mocked_get.call_count, 1)
+        with open(self.output, 'rb') as f:
+            self.assertEqual(f.read(), b'jpeg')
+
+    @mock.patch.object(local.requests, 'get')
+    def test_find_view_in_catalog_evicted(self, mocked_get):
+        mocked_get.return_value.iter_content.return_value = [b'jp', b'eg']
+        cache = self.computer.cutout_cache
+        put = cache.put
+
+        def put_and_evict(params, chunks):
+            # a concurrent prefetch evicts the cutout right after put()
+            size = put(params, chunks)
+            cache.clear()
+            return size
+        with mock.patch.object(cache, 'put', side_effect=put_and_evict):
+            self.computer.find_view_in_catalog(self.output)
+        with open(self.output, 'rb') as f:
+            self.assertEqual(f.read(), b'jpeg')
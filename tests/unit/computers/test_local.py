@@ -1,5 +1,10 @@
 from unittest import TestCase
 
+import mock
+
+from astroscope.computers.local import LocalComputer
+from astroscope.computers.prefetch import PrefetchError
+
 
 class TestLocalComputer(TestCase):
     def test_get_time(self):
@@ -19,3 +24,11 @@ class TestLocalComputer(TestCase):
 
     def test_SkyCoordRaDec(self):
         self.fail()
+
+    def test_prefetch_views_without_cache(self):
+        computer = LocalComputer()
+        with mock.patch('astroscope.computers.local.CutoutPrefetcher') as \
+                prefetcher:
+            self.assertRaises(PrefetchError,
+                              computer.prefetch_views_in_catalog, [(1, 2)])
+        prefetcher.assert_not_called()
@@ -0,0 +1,85 @@
+import http.server
+import os
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+
+from astroscope.computers import cutout_cache
+from astroscope.computers import prefetch
+
+
+class _CutoutHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            fail = server.failures > 0
+            if fail:
+                server.failures -= 1
+        if fail:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = self.path.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCutoutPrefetcher(TestCase):
+
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0),
+                                                      _CutoutHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = 0
+        self.server.failures = 0
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = cutout_cache.CutoutCache(self.tmpdir)
+        self.prefetcher = prefetch.CutoutPrefetcher(
+            self.cache,
+            base_url='http://127.0.0.1:{}/getjpeg'.format(
+                self.server.server_address[1]),
+            max_workers=3, retries=2, backoff=0.01, timeout=5.0)
+
+    def tearDown(self):
+        self.prefetcher.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_prefetch(self):
+        targets = [(10.0 * i, 5.0) for i in range(6)]
+        results = self.prefetcher.prefetch(targets)
+        self.assertTrue(all(r > 0 for r in results))
+        self.assertEqual(len(self.cache), 6)
+        with self.cache.get(cutout_cache.cutout_params(20.0, 5.0)) as mapped:
+            self.assertIn(b'ra=20.0', mapped[:])
+
+    def test_prefetch_skips_cached(self):
+        self.prefetcher.prefetch([(10.0, 5.0)])
+        self.assertEqual(self.prefetcher.prefetch([(10.0, 5.0)]), [0])
+        self.assertEqual(self.server.requests, 1)
+
+    def test_fetch_retries(self):
+        self.server.failures = 2
+        self.assertGreater(self.prefetcher.fetch(10.0, 5.0), 0)
+        self.assertEqual(self.server.requests, 3)
+
+    def test_prefetch_reports_errors(self):
+        self.server.failures = 3
+        results = self.prefetcher.prefetch([(10.0, 5.0)])
+        self.assertIsInstance(results[0], prefetch.PrefetchError)
+        self.assertEqual(len(self.cache), 0)
@@ -0,0 +1,44 @@
+from unittest import TestCase
+
+import numpy as np
+
+from astroscope.cameras.simulation import FakeCamera
+from astroscope.guiding import detection
+
+
+class TestDetection(TestCase):
+
+    def setUp(self):
+        self.stars = [(20.3, 30.7, 4000.0), (50.6, 12.2, 2000.0),
+                      (40.0, 50.5, 1000.0)]
+        self.camera = FakeCamera(shape=(64, 80), stars=self.stars, seed=4)
+        self.image = self.camera.render()
+
+    def test_estimate_background(self):
+        background, noise = detection.estimate_background(self.image, 16)
+        self.assertEqual(background.shape, self.image.shape)
+        self.assertAlmostEqual(np.median(background), 100.0, delta=2.0)
+        self.assertAlmostEqual(noise, 5.0, delta=1.0)
+
+    def test_find_stars(self):
+        stars = detection.find_stars(self.image, threshold=8.0)
+        self.assertEqual(len(stars.x), 3)
+        for (x, y, _flux), found_x, found_y in zip(self.stars, stars.x,
+                                                   stars.y):
+            self.assertAlmostEqual(found_x, x, delta=0.2)
+            self.assertAlmostEqual(found_y, y, delta=0.2)
+        self.assertTrue(np.all(np.diff(stars.flux) <= 0))
+
+    def test_find_stars_empty(self):
+        stars = detection.find_stars(np.full((32, 32), 10.0))
+        self.assertEqual(len(stars.x), 0)
+
+    def test_centroid(self):
+        image = np.zeros((9, 9))
+        image[4, 4] = 2.0
+        image[4, 5] = 1.0
+        image[5, 4] = 1.0
+        stars = detection.centroid(image, [4], [4], radius=2)
+        self.assertAlmostEqual(stars.x[0], 4.25)
+        self.assertAlmostEqual(stars.y[0], 4.25)
+        self.assertAlmostEqual(stars.flux[0], 4.0)
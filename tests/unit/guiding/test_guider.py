@@ -0,0 +1,82 @@
+from unittest import TestCase
+
+import mock
+
+from astroscope.cameras.simulation import FakeCamera
+from astroscope.guiding import guider
+
+
+class TestGuideController(TestCase):
+
+    def setUp(self):
+        self.telescope = mock.Mock()
+        self.dut = guider.GuideController(self.telescope, arcsec_per_pixel=2.0,
+                                          gain=0.5, pulse=1.0, altitude=0.0)
+
+    def test_rates(self):
+        az_rate, alt_rate = self.dut.rates(3.0, -2.0)
+        self.assertAlmostEqual(az_rate, -3.0)
+        self.assertAlmostEqual(alt_rate, 2.0)
+        self.dut.angle = 90.0
+        az_rate, alt_rate = self.dut.rates(3.0, 0.0)
+        self.assertAlmostEqual(az_rate, 0.0)
+        self.assertAlmostEqual(alt_rate, -3.0)
+
+    def test_rates_are_limited(self):
+        self.assertEqual(self.dut.rates(1000.0, -1000.0), (-30.0, 30.0))
+
+    def test_correct(self):
+        self.dut.pulse = 0.05
+        self.dut.correct(0.1, 0.0)
+        timer = self.dut._timer
+        self.telescope.slew_var.assert_called_with(-2.0, 0.0)
+        timer.join()
+        self.telescope.slew_var.assert_called_with(0, 0)
+
+    def test_late_timer_keeps_next_correction(self):
+        self.dut.pulse = 10.0
+        self.dut.correct(0.1, 0.0)
+        first = self.dut._timer
+        self.dut.correct(0.2, 0.0)
+        second = self.dut._timer
+        # the first timer fires after the second correction replaced it
+        first.function(*first.args)
+        self.telescope.slew_var.assert_called_with(*self.dut.rates(0.2, 0.0))
+        self.assertIs(self.dut._timer, second)
+        self.assertTrue(second.is_alive())
+        self.dut.stop()
+        self.telescope.slew_var.assert_called_with(0, 0)
+        self.assertTrue(second.finished.is_set())
+
+
+class TestGuider(TestCase):
+
+    def setUp(self):
+        self.camera = FakeCamera(shape=(48, 48), seed=5,
+                                 stars=[(24.0, 24.0, 5000.0)])
+        self.camera.set_exposure(0.0)
+        self.controller = mock.Mock()
+        self.controller.correct.return_value = (0.0, 0.0)
+        self.dut = guider.Guider(self.camera, self.controller)
+
+    def test_step(self):
+        first = self.dut.step()
+        self.assertAlmostEqual(first.dx, 0.0)
+        self.camera.offset = (1.5, -0.5)
+        second = self.dut.step()
+        self.assertAlmostEqual(second.dx, 1.5, delta=0.2)
+        self.assertAlmostEqual(second.dy, -0.5, delta=0.2)
+        self.controller.correct.assert_called_with(second.dx, second.dy)
+
+    def test_lost_star(self):
+        self.dut.step()
+        self.camera.offset = (40.0, 0.0)
+        self.assertIsNone(self.dut.step())
+
+    def test_run_and_latency(self):
+        self.dut.run(iterations=3)
+        self.assertEqual(len(self.dut.steps), 3)
+        latency = self.dut.latency()
+        self.assertLess(latency['detect']['max'], 1.0)
+        self.assertGreaterEqual(latency['total']['mean'],
+                                latency['detect']['mean'])
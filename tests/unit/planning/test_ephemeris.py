@@ -0,0 +1,57 @@
+import time
+from unittest import TestCase
+
+import mock
+import numpy as np
+from astropy import units as u
+from astropy.coordinates import EarthLocation
+from astropy.coordinates import SkyCoord
+from astropy.coordinates import get_body
+from astropy.time import Time
+
+from astroscope.planning.ephemeris import EphemerisCache
+from astroscope.telescopes.astropy_telescope import AstropyTelescope
+from astroscope.telescopes.base_telescope import BaseTelescope
+
+
+class Telescope(AstropyTelescope, BaseTelescope):
+    pass
+
+
+class TestEphemerisCache(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.location = EarthLocation(lat=38.0 * u.deg, lon=-121.0 * u.deg)
+        cls.start = time.time() - 3600.0
+        cls.cache = EphemerisCache(cls.location, cls.start, 6 * 3600.0,
+                                   bodies=('moon',), segment=3 * 3600.0)
+
+    def test_radec(self):
+        times = self.start + np.linspace(0.0, 6 * 3600.0, 7) + 123.0
+        times[-1] = self.cache.end
+        ra, dec = self.cache.radec('moon', times)
+        expected = get_body('moon', Time(times, format='unix'), self.location)
+        separation = expected.separation(SkyCoord(ra, dec, unit='deg',
+                                                  frame=expected.frame))
+        self.assertLess(separation.arcsec.max(), 0.01)
+        self.assertLess(self.cache.accuracy['moon'], 0.01)
+
+    def test_scalar(self):
+        ra, dec = self.cache.radec('moon', self.start + 10.0)
+        self.assertIsInstance(ra, float)
+        self.assertIsInstance(dec, float)
+
+    def test_errors(self):
+        self.assertRaises(KeyError, self.cache.radec, 'pluto', self.start)
+        self.assertRaises(ValueError, self.cache.radec, 'moon',
+                          self.start - 1.0)
+
+    def test_goto_body(self):
+        telescope = Telescope()
+        telescope.goto_ra_dec = mock.Mock()
+        telescope.goto_body('moon', self.cache)
+        ra, dec = telescope.goto_ra_dec.call_args[0]
+        expected = self.cache.radec('moon', time.time())
+        self.assertAlmostEqual(ra, expected[0], places=2)
+        self.assertAlmostEqual(dec, expected[1], places=2)
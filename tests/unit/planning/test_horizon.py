@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import mock
+import numpy as np
+from astropy import units as u
+from astropy.coordinates import EarthLocation
+from astropy.time import Time
+
+from astroscope.planning import horizon
+from astroscope.telescopes.astropy_telescope import AstropyTelescope
+
+START_ISOT = '2026-01-15T00:00:00'
+START = Time(START_ISOT).unix
+TARGETS = {'polar': (37.95, 89.26), 'south': (100.0, -80.0),
+           'equator': (120.0, 0.0)}
+
+
+class TestHorizonMask(TestCase):
+
+    def test_min_altitude_wraps(self):
+        mask = horizon.HorizonMask([10.0, 90.0, 350.0], [20.0, 0.0, 10.0])
+        self.assertAlmostEqual(float(mask.min_altitude(0.0)), 15.0)
+        self.assertAlmostEqual(float(mask.min_altitude(370.0)), 20.0)
+        self.assertAlmostEqual(float(mask.min_altitude(50.0)), 10.0)
+        np.testing.assert_array_equal(mask.is_visible([50.0, 50.0],
+                                                      [5.0, 15.0]),
+                                      [False, True])
+
+    def test_load(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = os.path.join(directory, 'horizon.txt')
+        with open(filename, 'w') as f:
+            f.write('# trees\n0 5\n\n180, 30  # house\n')
+        mask = horizon.HorizonMask.load(filename)
+        self.assertAlmostEqual(float(mask.min_altitude(90.0)), 17.5)
+
+
+class TestVisibilityIndex(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.location = EarthLocation(lat=38.0 * u.deg, lon=-121.0 * u.deg)
+        cls.index = horizon.VisibilityIndex.build(TARGETS, cls.location,
+                                                  START, 24 * 3600.0, 600.0)
+
+    def test_intervals(self):
+        self.assertEqual(self.index.intervals['polar'],
+                         [(self.index.start, self.index.end)])
+        self.assertEqual(self.index.intervals['south'], [])
+        rise, _set = self.index.intervals['equator'][0]
+        # on the equator, up for half a day
+        self.assertAlmostEqual(_set - rise, 12 * 3600.0, delta=600.0)
+        for crossing in (rise, _set):
+            _az, _alt = horizon.altaz_grid([120.0], [0.0], [crossing],
+                                           self.location)
+            self.assertAlmostEqual(float(_alt[0, 0]), 0.0, delta=0.05)
+
+    def test_observable(self):
+        rise, _set = self.index.intervals['equator'][0]
+        self.assertEqual(self.index.observable(rise + 60.0),
+                         ['equator', 'polar'])
+        self.assertEqual(self.index.observable(rise - 60.0), ['polar'])
+        self.assertEqual(self.index.observable(rise - 3600.0, rise + 60.0),
+                         ['equator', 'polar'])
+        self.assertEqual(self.index.observable(rise - 3600.0, rise + 60.0,
+                                               min_duration=120.0),
+                         ['polar'])
+        self.assertTrue(self.index.is_visible('equator', rise + 60.0))
+        self.assertFalse(self.index.is_visible('south', rise + 60.0))
+
+    def test_next_rise(self):
+        rise, _set = self.index.intervals['equator'][0]
+        self.assertEqual(self.index.next_rise('equator', rise - 10.0), rise)
+        self.assertEqual(self.index.next_rise('equator', rise + 10.0),
+                         rise + 10.0)
+        self.assertIsNone(self.index.next_rise('south', START))
+
+    def test_horizon_mask(self):
+        wall = horizon.HorizonMask.flat(89.9)
+        index = horizon.VisibilityIndex.build(TARGETS, self.location, START,
+                                              3600.0, 600.0, horizon=wall)
+        self.assertEqual(index.observable(START), [])
+
+    def test_save_load(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = os.path.join(directory, 'index.json')
+        self.index.save(filename)
+        loaded = horizon.VisibilityIndex.load(filename)
+        self.assertEqual(loaded.intervals, self.index.intervals)
+        rise = self.index.intervals['equator'][0][0]
+        self.assertEqual(loaded.observable(rise + 60.0),
+                         ['equator', 'polar'])
+
+    def test_astropy_telescope(self):
+        telescope = AstropyTelescope()
+        telescope.get_location_lat_long = mock.Mock(
+            return_value=(38.0, -121.0))
+        telescope.get_time_initializer = mock.Mock(return_value=START_ISOT)
+        index = telescope.visibility_index(TARGETS, 3600.0, 600.0)
+        self.assertEqual(index.start, START)
+        self.assertIn('polar', index.observable(START))
@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import mock
+
+from astroscope.cameras.simulation import FakeCamera
+from astroscope.planning import mosaic
+from astroscope.telescopes.simulation import SimulatedMount
+from astroscope.telescopes.simulation import VirtualClock
+
+
+class TestTiling(TestCase):
+
+    def test_tile_region(self):
+        tiles = mosaic.tile_region(180.0, 60.0, 3.0, 2.0, 1.0, 1.0,
+                                   overlap=0.2)
+        # 3 degrees need 4 frames of 1 degree stepping by 0.8
+        self.assertEqual(max(t.column for t in tiles) + 1, 4)
+        self.assertEqual(max(t.row for t in tiles) + 1, 3)
+        by_position = dict(((t.row, t.column), t) for t in tiles)
+        for (row, column), tile in by_position.items():
+            neighbour = by_position.get((row, column + 1))
+            if neighbour is not None:
+                # steps are constant on the sky, not in right ascension
+                self.assertAlmostEqual(
+                    float(mosaic._separation(tile.ra, tile.dec,
+                                             neighbour.ra, neighbour.dec)),
+                    0.8, delta=0.01)
+
+    def test_single_tile(self):
+        tiles = mosaic.tile_region(10.0, -20.0, 0.5, 0.5, 1.0, 1.0)
+        self.assertEqual(len(tiles), 1)
+        self.assertAlmostEqual(tiles[0].ra, 10.0)
+        self.assertAlmostEqual(tiles[0].dec, -20.0)
+
+    def test_serpentine(self):
+        tiles = mosaic.tile_region(0.0, 0.0, 3.0, 3.0, 1.0, 1.0, 0.0)
+        ordered = mosaic.serpentine(tiles)
+        self.assertEqual([(t.row, t.column) for t in ordered],
+                         [(0, 0), (0, 1), (0, 2), (1, 2), (1, 1), (1, 0),
+                          (2, 0), (2, 1), (2, 2)])
+        self.assertAlmostEqual(mosaic.path_length(ordered), 8.0, places=2)
+        self.assertLess(mosaic.path_length(ordered),
+                        mosaic.path_length(tiles))
+
+    def test_nearest_neighbour(self):
+        tiles = mosaic.tile_region(0.0, 0.0, 3.0, 3.0, 1.0, 1.0, 0.0)
+        ordered = mosaic.nearest_neighbour(tiles)
+        self.assertEqual(sorted(ordered), sorted(tiles))
+        self.assertAlmostEqual(mosaic.path_length(ordered), 8.0, places=2)
+
+    def test_camera_fov(self):
+        self.assertAlmostEqual(mosaic.camera_fov(22.3, 650.0), 1.9656,
+                               places=3)
+
+
+class FailingCamera(FakeCamera):
+
+    def __init__(self, failures_after):
+        super(FailingCamera, self).__init__(shape=(8, 8), seed=1)
+        self.set_exposure(0.0)
+        self.failures_after = failures_after
+
+    def capture_image(self):
+        if self.failures_after == 0:
+            raise RuntimeError('battery empty')
+        self.failures_after -= 1
+        return super(FailingCamera, self).capture_image()
+
+
+class TestMosaic(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.checkpoint = os.path.join(self.directory, 'mosaic.json')
+        self.clock = VirtualClock(start=1.7e9)
+        self.mount = SimulatedMount(clock=self.clock, lat=38.0, lon=-121.0)
+        self.tiles = mosaic.serpentine(
+            mosaic.tile_region(100.0, 20.0, 2.0, 2.0, 1.0, 1.0))
+
+    def _run(self, camera, tiles=None):
+        return mosaic.Mosaic(tiles or self.tiles, self.checkpoint).run(
+            self.mount, camera, self.directory, exposures=2,
+            settle_time=1.0, sleep=self.clock.sleep, clock=self.clock.time)
+
+    def test_run(self):
+        completed = self._run(FailingCamera(100))
+        self.assertEqual(len(completed), 9)
+        self.assertTrue(os.path.exists(os.path.join(
+            self.directory, 'tile_02_01_01.npy')))
+        ra, dec = self.mount.get_ra_dec()
+        self.assertAlmostEqual(ra, self.tiles[-1].ra, places=4)
+        self.assertAlmostEqual(dec, self.tiles[-1].dec, places=4)
+
+    def test_frames_logged(self):
+        tiles = self.tiles[:1]
+        dut = mosaic.Mosaic(tiles)
+        dut.observing_log = mock.Mock()
+        completed = dut.run(self.mount, FailingCamera(100), self.directory,
+                            exposures=2, settle_time=1.0,
+                            sleep=self.clock.sleep, clock=self.clock.time)
+        self.assertEqual(
+            dut.observing_log.log_frame.call_args_list,
+            [mock.call(filename, 0.0, tiles[0].ra, tiles[0].dec, None)
+             for filename in completed[tiles[0].index]])
+
+    def test_resume(self):
+        self.assertRaises(RuntimeError, self._run, FailingCamera(7))
+        self.assertEqual(len(mosaic.Mosaic(self.tiles,
+                                           self.checkpoint).remaining()), 6)
+        camera = FailingCamera(100)
+        self._run(camera)
+        # only the 6 missing tiles were taken again
+        self.assertEqual(camera.failures_after, 100 - 12)
+        self.assertEqual(len(mosaic.Mosaic(self.tiles,
+                                           self.checkpoint).remaining()), 0)
+
+    def test_checkpoint_of_another_mosaic(self):
+        self._run(FailingCamera(100))
+        other = mosaic.tile_region(10.0, 20.0, 2.0, 2.0, 1.0, 1.0)
+        self.assertRaises(mosaic.MosaicError, mosaic.Mosaic, other,
+                          self.checkpoint)
+
+    def test_wait_for_settle_timeout(self):
+        telescope = mock.Mock()
+        telescope.goto_in_progress.return_value = True
+        self.assertRaises(mosaic.MosaicError, mosaic.wait_for_settle,
+                          telescope, timeout=10.0, sleep=self.clock.sleep,
+                          clock=self.clock.time)
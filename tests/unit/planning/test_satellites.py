@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+import mock
+import numpy as np
+from astropy import units as u
+from astropy.coordinates import AltAz
+from astropy.coordinates import CartesianRepresentation
+from astropy.coordinates import EarthLocation
+from astropy.coordinates import TEME
+from astropy.time import Time
+
+from astroscope.planning import satellites
+from astroscope.telescopes.simulation import SimulatedMount
+from astroscope.telescopes.simulation import VirtualClock
+
+ISS = ('1 25544U 98067A   19343.69339541  .00001764  00000-0  38792-4 0  9991',
+       '2 25544  51.6439 211.2001 0007417  17.6667  85.6398 15.50103472202482')
+# the same orbit half a revolution ahead
+OTHER = (ISS[0].replace('25544', '99999'),
+         ISS[1].replace('25544', '99999').replace(' 85.6398', '265.6398'))
+EPOCH = 1575909509.363  # 2019-12-09T16:38:29 UTC, the epoch of ISS
+LOCATION = (38.0, -121.0, 100.0)
+
+
+@unittest.skipIf(satellites.SatrecArray is None, 'sgp4 is not installed')
+class TestPassPredictor(TestCase):
+
+    def setUp(self):
+        self.predictor = satellites.PassPredictor(
+            [('ISS', ) + ISS, ('OTHER', ) + OTHER], LOCATION)
+
+    def test_load_tles(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = os.path.join(directory, 'stations.txt')
+        with open(filename, 'w') as f:
+            f.write('ISS (ZARYA)\n{}\n{}\n\n{}\n{}\n'.format(
+                ISS[0], ISS[1], OTHER[0], OTHER[1]))
+        self.assertEqual(satellites.load_tles(filename),
+                         [('ISS (ZARYA)', ) + ISS, ('99999', ) + OTHER])
+        predictor = satellites.PassPredictor.from_file(filename, LOCATION)
+        self.assertEqual(predictor.names, ['ISS (ZARYA)', '99999'])
+
+    def test_azalt_matches_astropy(self):
+        times = EPOCH + np.arange(0.0, 3600.0, 600.0)
+        az, alt = self.predictor.azalt(times, 'ISS')
+        jd, fr = satellites._julian_dates(times)
+        _, r, _ = self.predictor._satrecs[0].sgp4_array(jd, fr)
+        obstime = Time(times, format='unix')
+        location = EarthLocation(lat=LOCATION[0] * u.deg,
+                                 lon=LOCATION[1] * u.deg,
+                                 height=LOCATION[2] * u.m)
+        expected = TEME(CartesianRepresentation(r.T * u.km),
+                        obstime=obstime).transform_to(
+            AltAz(obstime=obstime, location=location))
+        np.testing.assert_allclose(alt, expected.alt.deg, atol=0.01)
+        np.testing.assert_allclose(
+            satellites._wrap(az - expected.az.deg), 0.0, atol=0.01)
+        az, alt = self.predictor.azalt(times)
+        self.assertEqual(alt.shape, (2, len(times)))
+
+    def test_passes(self):
+        passes = self.predictor.passes(EPOCH, 86400.0, min_altitude=10.0)
+        self.assertEqual(set(p.satellite for p in passes), {'ISS', 'OTHER'})
+        self.assertEqual([p.culmination for p in passes],
+                         sorted(p.culmination for p in passes))
+        for p in passes:
+            self.assertLess(p.rise, p.culmination)
+            self.assertLess(p.culmination, p.set)
+            self.assertGreater(p.max_altitude, 10.0)
+            _, alt = self.predictor.azalt([p.rise, p.set], p.satellite)
+            np.testing.assert_allclose(alt, 10.0, atol=0.01)
+            _, alt = self.predictor.azalt(
+                np.arange(p.rise, p.set, 0.5), p.satellite)
+            self.assertAlmostEqual(p.max_altitude, alt.max(), places=3)
+
+    def test_pass_in_progress(self):
+        first = self.predictor.passes(EPOCH, 86400.0)[0]
+        passes = self.predictor.passes(first.culmination, 3600.0)
+        self.assertIsNone(passes[0].rise)
+        self.assertAlmostEqual(passes[0].set, first.set, delta=0.02)
+        passes = self.predictor.passes(first.rise - 600.0, 620.0)
+        self.assertIsNone(passes[0].set)
+
+    def test_track(self):
+        high = [p for p in self.predictor.passes(EPOCH, 86400.0)
+                if p.max_altitude > 60.0][0]
+        track = self.predictor.track(high.satellite, high.rise, high.set)
+        az = np.unwrap(track.az, period=360.0)
+        np.testing.assert_allclose(track.alt_rate[1:-1],
+                                   np.gradient(track.alt)[1:-1] * 3600.0,
+                                   rtol=0.02, atol=10.0)
+        np.testing.assert_allclose(track.az_rate[1:-1],
+                                   np.gradient(az)[1:-1] * 3600.0,
+                                   rtol=0.05, atol=10.0)
+
+    def test_follow_track(self):
+        first = [p for p in self.predictor.passes(EPOCH, 86400.0)
+                 if p.max_altitude > 40.0][0]
+        track = self.predictor.track(first.satellite, first.rise, first.set)
+        clock = VirtualClock(start=first.rise - 120.0)
+        mount = SimulatedMount(clock=clock, lat=LOCATION[0],
+                               lon=LOCATION[1], az=0.0, alt=10.0)
+        errors = satellites.follow_track(mount, track, sleep=clock.sleep,
+                                         clock=clock.time)
+        self.assertLess(np.median(errors), 0.01)
+        self.assertEqual(mount._received_commands[-1][1:],
+                         ('slew_var', 0.0, 0.0))
+
+    def test_without_sgp4(self):
+        with mock.patch.object(satellites, 'SatrecArray', None):
+            self.assertRaises(ImportError, satellites.PassPredictor,
+                              [('ISS', ) + ISS], LOCATION)
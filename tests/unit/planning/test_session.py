@@ -0,0 +1,84 @@
+from unittest import TestCase
+
+import mock
+import numpy as np
+
+from astroscope.cameras.simulation import FakeCamera
+from astroscope.planning import session
+from astroscope.telescopes.simulation import SimulatedMount
+from astroscope.telescopes.simulation import VirtualClock
+
+
+class TestPointings(TestCase):
+
+    def test_dithered(self):
+        pointings = session.dithered(100.0, 60.0, 50, radius=20.0, seed=4)
+        self.assertEqual(len(pointings), 50)
+        ra = np.array([p.a for p in pointings])
+        dec = np.array([p.b for p in pointings])
+        offsets = np.hypot((ra - 100.0) * np.cos(np.radians(60.0)),
+                           dec - 60.0) * 3600
+        self.assertTrue(np.all(offsets <= 20.0 + 1e-6))
+        self.assertGreater(offsets.std(), 1.0)
+        self.assertEqual(pointings, session.dithered(100.0, 60.0, 50,
+                                                     radius=20.0, seed=4))
+
+
+class TestSessionOrchestrator(TestCase):
+
+    def setUp(self):
+        self.mount = SimulatedMount(clock=VirtualClock(speed=1.0), lat=38.0,
+                                    lon=-121.0, az=0.0, alt=45.0,
+                                    max_rate=0.01, acceleration=0.05)
+        self.mount.tracking_mode = 0
+        self.camera = FakeCamera(shape=(16, 16), download_time=0.2)
+        self.camera.set_exposure(0.1)
+        self.consumer = mock.Mock()
+
+    def test_run_overlaps_slews_and_downloads(self):
+        orchestrator = session.SessionOrchestrator(
+            self.mount, self.camera, self.consumer, settle_time=0.05,
+            poll_interval=0.01)
+        pointings = [session.azalt(0.0, 45.0 + 0.002 * i) for i in range(4)]
+        records = orchestrator.run(pointings)
+        self.assertEqual([r.index for r in records], [0, 1, 2, 3])
+        self.assertEqual(self.consumer.call_count, 4)
+        az, alt = self.mount.get_az_alt()
+        self.assertAlmostEqual(alt, 45.006, places=4)
+        for previous, record in zip(records, records[1:]):
+            # the next slew starts before the download of the previous frame
+            # has finished
+            self.assertLess(record.slew_start, previous.download_end)
+            self.assertGreaterEqual(record.exposure_start,
+                                    previous.exposure_end)
+        statistics = orchestrator.statistics()
+        self.assertEqual(statistics['frames'], 4)
+        self.assertLess(statistics['dead_time'],
+                        statistics['sequential_dead_time'])
+        self.assertGreater(statistics['saved'], 0.4)
+
+    def test_radec_pointings(self):
+        telescope = mock.Mock()
+        telescope.goto_in_progress.return_value = False
+        consumer = mock.Mock(side_effect=lambda index, data:
+                             'frame{}.npy'.format(index))
+        orchestrator = session.SessionOrchestrator(
+            telescope, self.camera, consumer, settle_time=0.0)
+        orchestrator.run(session.dithered(10.0, 20.0, 2, seed=1))
+        self.assertEqual(telescope.goto_ra_dec.call_count, 2)
+        self.assertFalse(telescope.goto_az_alt.called)
+        # frames go to the observing log of a logging telescope
+        log_frame = telescope.observing_log.log_frame
+        self.assertEqual(log_frame.call_count, 2)
+        filename, exposure, ra, dec, target = log_frame.call_args[0]
+        # frames are logged once the consumer saved them
+        self.assertEqual(filename, 'frame1.npy')
+        self.assertAlmostEqual(ra, 10.0, places=2)
+        self.assertAlmostEqual(dec, 20.0, places=2)
+        self.assertIs(target, telescope.observing_target)
+
+    def test_unknown_pointing(self):
+        orchestrator = session.SessionOrchestrator(mock.Mock(), self.camera)
+        self.assertRaises(ValueError, orchestrator.run,
+                          [session.Pointing('galactic', 0.0, 0.0)])
+        self.assertEqual(orchestrator.statistics(), {})
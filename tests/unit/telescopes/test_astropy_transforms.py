@@ -0,0 +1,85 @@
+import concurrent.futures
+import time
+from unittest import TestCase
+
+import mock
+from astropy import units as u
+from astropy.coordinates import EarthLocation
+from astropy.coordinates import SkyCoord
+from astropy.time import Time
+
+from astroscope.telescopes import astropy_transforms
+from astroscope.telescopes.astropy_telescope import AstropyTelescope
+
+
+class TestTransformService(TestCase):
+
+    def setUp(self):
+        self.executor = concurrent.futures.ThreadPoolExecutor(1)
+        self.service = astropy_transforms.TransformService(
+            executor=self.executor, batch_size=3, max_delay=0.05)
+        self.location = (38.0, -121.0)
+        self.obstime = time.time()
+
+    def tearDown(self):
+        self.service.shutdown()
+
+    def _expected(self, az, alt):
+        _altaz = SkyCoord(az=az * u.deg, alt=alt * u.deg, frame='altaz',
+                          obstime=Time(self.obstime, format='unix'),
+                          location=EarthLocation(lat=38.0 * u.deg,
+                                                 lon=-121.0 * u.deg))
+        _radec = _altaz.transform_to('icrs')
+        return _radec.ra.deg, _radec.dec.deg
+
+    def test_altaz_to_icrs(self):
+        ra, dec = astropy_transforms.altaz_to_icrs(
+            [10.0, 200.0], [45.0, 60.0], [self.obstime] * 2, 38.0, -121.0)
+        self.assertAlmostEqual(ra[1], self._expected(200.0, 60.0)[0])
+        self.assertAlmostEqual(dec[1], self._expected(200.0, 60.0)[1])
+
+    def test_submit_batches(self):
+        with mock.patch.object(astropy_transforms, 'altaz_to_icrs',
+                               wraps=astropy_transforms.altaz_to_icrs) \
+                as mocked_transform:
+            futures = [self.service.submit(az, 45.0, self.location,
+                                           self.obstime)
+                       for az in (10.0, 20.0, 30.0)]
+            results = [f.result(timeout=30) for f in futures]
+        self.assertEqual(mocked_transform.call_count, 1)
+        for az, (ra, dec) in zip((10.0, 20.0, 30.0), results):
+            expected_ra, expected_dec = self._expected(az, 45.0)
+            self.assertAlmostEqual(ra, expected_ra)
+            self.assertAlmostEqual(dec, expected_dec)
+
+    def test_submit_flushes_after_max_delay(self):
+        future = self.service.submit(10.0, 45.0, self.location, self.obstime)
+        self.assertAlmostEqual(future.result(timeout=30)[1],
+                               self._expected(10.0, 45.0)[1])
+
+    def test_submit_many(self):
+        ra, dec = self.service.submit_many(
+            [10.0, 20.0], [45.0, 45.0], self.location,
+            [self.obstime] * 2).result(timeout=30)
+        self.assertEqual(len(ra), 2)
+
+    def test_get_radec_future(self):
+        telescope = AstropyTelescope()
+        telescope.get_az_alt = mock.Mock(return_value=(10.0, 45.0))
+        telescope.get_location_lat_long = mock.Mock(
+            return_value=self.location)
+        ra, dec = telescope.get_radec_future(self.service).result(timeout=30)
+        self.assertAlmostEqual(dec, self._expected(10.0, 45.0)[1], places=3)
+
+
+class TestTransformServiceProcessPool(TestCase):
+
+    def test_submit(self):
+        service = astropy_transforms.TransformService(max_delay=0.0)
+        try:
+            ra, dec = service.submit(10.0, 45.0, (38.0, -121.0)).result(
+                timeout=120)
+        finally:
+            service.shutdown()
+        self.assertTrue(0.0 <= ra < 360.0)
+        self.assertTrue(-90.0 <= dec <= 90.0)
@@ -0,0 +1,126 @@
+import threading
+import time
+from unittest import TestCase
+
+import mock
+
+from astroscope.telescopes import command_scheduler
+from astroscope.telescopes.command_scheduler import CommandScheduler
+
+
+class TestClassify(TestCase):
+
+    def test_classify(self):
+        self.assertEqual(command_scheduler.classify('M'),
+                         command_scheduler.EMERGENCY)
+        self.assertEqual(command_scheduler.classify('r12AB0000,40000000'),
+                         command_scheduler.MOTION)
+        self.assertEqual(command_scheduler.classify('P' + chr(3) + chr(16)),
+                         command_scheduler.GUIDING)
+        self.assertEqual(command_scheduler.classify('P' + chr(2) + chr(16)),
+                         command_scheduler.MOTION)
+        self.assertEqual(command_scheduler.classify('e'),
+                         command_scheduler.TELEMETRY)
+        self.assertEqual(command_scheduler.classify('V'),
+                         command_scheduler.HOUSEKEEPING)
+
+
+class TestCommandScheduler(TestCase):
+
+    def _wait_for(self, scheduler, name, count):
+        for _ in range(500):
+            if scheduler.waiting()[name] >= count:
+                return
+            time.sleep(0.002)
+        self.fail('commands were not queued')
+
+    def test_priority(self):
+        scheduler = CommandScheduler(rate_limits={})
+        release = threading.Event()
+        order = []
+
+        def submit(priority, name, deadline=None):
+            thread = threading.Thread(target=scheduler.run, args=(
+                priority, lambda: order.append(name), deadline))
+            thread.start()
+            return thread
+
+        blocker = threading.Thread(target=scheduler.run, args=(
+            command_scheduler.MOTION, release.wait))
+        blocker.start()
+        while not scheduler._busy:
+            time.sleep(0.001)
+        threads = [submit(command_scheduler.TELEMETRY, 'poll{}'.format(i))
+                   for i in range(5)]
+        self._wait_for(scheduler, 'telemetry', 5)
+        threads.append(submit(command_scheduler.GUIDING, 'late guide', 5.0))
+        threads.append(submit(command_scheduler.GUIDING, 'guide', 0.1))
+        self._wait_for(scheduler, 'guiding', 2)
+        threads.append(submit(command_scheduler.EMERGENCY, 'cancel'))
+        self._wait_for(scheduler, 'emergency', 1)
+        release.set()
+        for thread in threads + [blocker]:
+            thread.join()
+        self.assertEqual(order[:3], ['cancel', 'guide', 'late guide'])
+        self.assertEqual(sorted(order[3:]),
+                         ['poll{}'.format(i) for i in range(5)])
+        statistics = scheduler.statistics()
+        self.assertEqual(statistics['telemetry']['count'], 5)
+        self.assertEqual(statistics['emergency']['count'], 1)
+        self.assertGreater(statistics['telemetry']['mean_delay'],
+                           statistics['emergency']['mean_delay'])
+        self.assertEqual(statistics['emergency']['late'], 0)
+
+    def test_rate_limit(self):
+        scheduler = CommandScheduler(
+            rate_limits={command_scheduler.TELEMETRY: (50.0, 1)})
+        started = time.monotonic()
+        for _ in range(6):
+            scheduler.run(command_scheduler.TELEMETRY, lambda: None)
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+        # motion is not rate limited
+        started = time.monotonic()
+        for _ in range(6):
+            scheduler.run(command_scheduler.MOTION, lambda: None)
+        self.assertLess(time.monotonic() - started, 0.05)
+
+    def test_rate_limited_class_does_not_block_others(self):
+        scheduler = CommandScheduler(
+            rate_limits={command_scheduler.TELEMETRY: (2.0, 1)})
+        scheduler.run(command_scheduler.TELEMETRY, lambda: None)
+        poll = threading.Thread(target=scheduler.run, args=(
+            command_scheduler.TELEMETRY, lambda: None))
+        poll.start()
+        self._wait_for(scheduler, 'telemetry', 1)
+        started = time.monotonic()
+        scheduler.run(command_scheduler.MOTION, lambda: None)
+        self.assertLess(time.monotonic() - started, 0.1)
+        poll.join()
+
+    def test_exceptions_and_nesting(self):
+        scheduler = CommandScheduler()
+
+        def fail():
+            raise ValueError('no answer')
+        self.assertRaises(ValueError, scheduler.run,
+                          command_scheduler.MOTION, fail)
+        # a failed command frees the line, and nested commands do not wait
+        # for themselves
+        self.assertEqual(scheduler.run(
+            command_scheduler.MOTION,
+            lambda: scheduler.run(command_scheduler.TELEMETRY,
+                                  lambda: 42)), 42)
+
+
+class TestScheduledTelescope(TestCase):
+
+    def test_commands_go_through_scheduler(self):
+        serial = mock.Mock()
+        serial.read.side_effect = [b'#', b'\x00#']
+        telescope = command_scheduler.ScheduledNexStarSLT130(
+            '/dev/null', serial_port=serial)
+        telescope.cancel_goto()
+        self.assertFalse(telescope.goto_in_progress())
+        statistics = telescope.command_scheduler.statistics()
+        self.assertEqual(statistics['emergency']['count'], 1)
+        self.assertEqual(statistics['telemetry']['count'], 1)
@@ -0,0 +1,94 @@
+from unittest import TestCase
+
+import numpy as np
+
+from astroscope.telescopes import coordinate_arrays
+from astroscope.telescopes.nextstar_telescopes import NexStarSLT130
+
+
+class TestCoordinateArrays(TestCase):
+
+    def setUp(self):
+        self.degrees = np.random.RandomState(3).uniform(0.0, 360.0, 200)
+
+    def test_wrap_degrees(self):
+        np.testing.assert_allclose(
+            coordinate_arrays.wrap_degrees([359.0, -1.0, 10.0], 2.0),
+            [1.0, 1.0, 12.0])
+
+    def test_degrees_to_hex(self):
+        expected = [NexStarSLT130.
+                    _convert_degrees_to_percentage_of_revolution_in_hex(x)
+                    for x in self.degrees]
+        self.assertEqual(
+            list(coordinate_arrays.degrees_to_hex(self.degrees)), expected)
+        self.assertEqual(list(coordinate_arrays.degrees_to_hex([360.0, 90.0],
+                                                               4)),
+                         ['0000', '4000'])
+
+    def test_hex_to_degrees(self):
+        strings = coordinate_arrays.degrees_to_hex(self.degrees)
+        expected = [NexStarSLT130.
+                    _convert_hex_percentage_of_revolution_to_degrees(h)
+                    for h in strings]
+        np.testing.assert_allclose(
+            coordinate_arrays.hex_to_degrees(strings), expected)
+        np.testing.assert_allclose(
+            coordinate_arrays.hex_to_degrees(
+                [h.encode('ascii') for h in strings]), expected)
+        np.testing.assert_allclose(
+            coordinate_arrays.hex_to_degrees(['4000', 'c000']), [90.0, 270.0])
+        self.assertRaises(ValueError, coordinate_arrays.hex_to_degrees,
+                          ['12G4'])
+
+    def test_decode_positions(self):
+        np.testing.assert_allclose(
+            coordinate_arrays.decode_positions(b'40000000,80000000#'),
+            [90.0, 180.0])
+
+    def test_format_dms(self):
+        self.assertEqual(
+            list(coordinate_arrays.format_dms([-10.5, 45.123456, 89.9999999],
+                                              precision=1)),
+            ['-10:30:00.0', '+45:07:24.4', '+90:00:00.0'])
+        self.assertEqual(
+            list(coordinate_arrays.format_dms([5.5], degree_digits=3,
+                                              separators='d\'"',
+                                              sign=False)),
+            ['005d30\'00"'])
+
+    def test_format_dms_hundreds(self):
+        # the degrees field is widened instead of losing the hundreds
+        self.assertEqual(
+            list(coordinate_arrays.format_dms([123.5, -0.5, 359.99999])),
+            ['+123:30:00', '-000:30:00', '+360:00:00'])
+        self.assertEqual(
+            list(coordinate_arrays.format_dms([359.9999999], precision=2,
+                                              degree_digits=3,
+                                              sign=False)),
+            ['360:00:00.00'])
+        np.testing.assert_allclose(
+            coordinate_arrays.parse_dms(
+                coordinate_arrays.format_dms([123.5, 245.25])),
+            [123.5, 245.25])
+
+    def test_format_hms(self):
+        self.assertEqual(
+            list(coordinate_arrays.format_hms([83.633333, 359.99999999])),
+            ['05:34:32.0', '00:00:00.0'])
+
+    def test_parse_dms(self):
+        np.testing.assert_allclose(
+            coordinate_arrays.parse_dms(['-0:30:00', '45d07m24.4s', '12 30',
+                                         u'5\xb03\'7"', '7']),
+            [-0.5, 45.1234444, 12.5, 5.0519444, 7.0])
+        self.assertRaises(ValueError, coordinate_arrays.parse_dms,
+                          ['1:2:3:4'])
+
+    def test_round_trip(self):
+        strings = coordinate_arrays.format_dms(self.degrees - 180.0, 2, 3)
+        np.testing.assert_allclose(coordinate_arrays.parse_dms(strings),
+                                   self.degrees - 180.0, atol=0.01 / 3600)
+        strings = coordinate_arrays.format_hms(self.degrees, 2)
+        np.testing.assert_allclose(coordinate_arrays.parse_hms(strings),
+                                   self.degrees, atol=0.15 / 3600)
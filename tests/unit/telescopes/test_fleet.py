@@ -0,0 +1,78 @@
+import time
+from unittest import TestCase
+
+import mock
+
+from astroscope.telescopes.fleet import TelescopeFleet
+
+
+class TestTelescopeFleet(TestCase):
+
+    def setUp(self):
+        self.telescopes = dict((name, mock.Mock()) for name in ('a', 'b'))
+        self.fleet = TelescopeFleet(telescopes=self.telescopes, timeout=2.0)
+
+    def tearDown(self):
+        self.fleet.close()
+
+    def test___init__(self):
+        telescope_class = mock.Mock()
+        fleet = TelescopeFleet(['/dev/ttyUSB0', '/dev/ttyUSB1'],
+                               telescope_class=telescope_class)
+        self.assertEqual(fleet.names, ['/dev/ttyUSB0', '/dev/ttyUSB1'])
+        telescope_class.assert_any_call('/dev/ttyUSB1')
+        fleet.close()
+
+    def test_goto_ra_dec(self):
+        result = self.fleet.goto_ra_dec(10.0, 20.0)
+        self.assertTrue(result.ok)
+        for telescope in self.telescopes.values():
+            telescope.goto_ra_dec.assert_called_once_with(10.0, 20.0)
+
+    def test_broadcast_runs_in_parallel(self):
+        for telescope in self.telescopes.values():
+            telescope.get_az_alt.side_effect = lambda: time.sleep(0.2)
+        result = self.fleet.broadcast('get_az_alt')
+        self.assertLess(result.elapsed, result.sequential_latency)
+        self.assertIn(result.slowest, ('a', 'b'))
+
+    def test_broadcast_errors_and_timeouts(self):
+        self.telescopes['a'].get_model.side_effect = AssertionError('down')
+        self.telescopes['b'].get_model.side_effect = lambda: time.sleep(0.3)
+        result = self.fleet.broadcast('get_model', timeout=0.05)
+        self.assertFalse(result.ok)
+        self.assertIsInstance(result.errors['a'], AssertionError)
+        self.assertIn('b', result.errors)
+
+    def test_snapshot(self):
+        self.telescopes['a'].get_az_alt.return_value = (1.0, 2.0)
+        self.telescopes['a'].goto_in_progress.return_value = False
+        result = self.fleet.snapshot(names=['a'])
+        self.assertEqual(list(result.results), ['a'])
+        self.assertEqual(result.results['a']['az_alt'], (1.0, 2.0))
+        self.assertFalse(result.results['a']['goto_in_progress'])
+
+    def test_wait_for_gotos(self):
+        self.telescopes['a'].goto_in_progress.side_effect = [True, False]
+        self.telescopes['b'].goto_in_progress.return_value = False
+        result = self.fleet.wait_for_gotos(poll_interval=0.01)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.results, {'a': True, 'b': True})
+        self.assertEqual(self.telescopes['a'].goto_in_progress.call_count, 2)
+        self.assertEqual(self.telescopes['b'].goto_in_progress.call_count, 1)
+
+    def test_wait_for_gotos_drops_failed_mounts(self):
+        self.telescopes['a'].goto_in_progress.side_effect = [True, False]
+        self.telescopes['b'].goto_in_progress.side_effect = IOError('gone')
+        result = self.fleet.wait_for_gotos(poll_interval=0.01)
+        self.assertFalse(result.ok)
+        self.assertEqual(result.results, {'a': True})
+        self.assertIsInstance(result.errors['b'], IOError)
+        self.assertEqual(self.telescopes['b'].goto_in_progress.call_count, 1)
+
+    def test_wait_for_gotos_timeout(self):
+        self.telescopes['a'].goto_in_progress.return_value = True
+        self.telescopes['b'].goto_in_progress.return_value = False
+        result = self.fleet.wait_for_gotos(poll_interval=0.01, timeout=0.05)
+        self.assertEqual(result.results, {'b': True})
+        self.assertEqual(list(result.errors), ['a'])
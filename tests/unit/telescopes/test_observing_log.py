@@ -0,0 +1,146 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from unittest import TestCase
+
+import mock
+
+from astroscope.telescopes import observing_log
+from astroscope.telescopes.nextstar_telescopes import NexStarSLT130
+
+
+class TestObservingLog(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.filename = os.path.join(self.tmpdir, 'log.db')
+
+    def test_batched_writes(self):
+        log = observing_log.ObservingLog(self.filename, '/dev/ttyUSB0',
+                                         batch_size=100)
+        with mock.patch.object(log, '_write', wraps=log._write) as write:
+            for i in range(250):
+                log.log_position('azalt', i, 45.0, unix_time=1000.0 + i)
+            log.flush()
+            # 250 rows in 3 transactions, not 250
+            self.assertEqual(write.call_count, 3)
+        log.close()
+        rows = observing_log.query(self.filename, 'positions', start=1100.0,
+                                   end=1110.0)
+        self.assertEqual([r['a'] for r in rows], list(range(100, 110)))
+        rows = observing_log.query(self.filename, 'positions', limit=2)
+        self.assertEqual([r['a'] for r in rows], [248, 249])
+
+    def test_sessions_and_targets(self):
+        with observing_log.ObservingLog(self.filename, 'a') as log:
+            log.log_goto('radec', 10.0, 20.0, 'M31', unix_time=100.0)
+            log.log_frame('m31_1.cr2', 30.0, 10.0, 20.0, 'M31',
+                          unix_time=110.0)
+        with observing_log.ObservingLog(self.filename, 'a') as log:
+            log.log_goto('radec', 30.0, 40.0, 'M42', unix_time=200.0)
+        self.assertEqual(len(observing_log.query(self.filename,
+                                                 'sessions')), 2)
+        rows = observing_log.query(self.filename, 'gotos', target='M31')
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['session'], 1)
+        frames = observing_log.query(self.filename, 'frames', target='M31')
+        self.assertEqual(frames[0]['filename'], 'm31_1.cr2')
+        self.assertRaises(ValueError, observing_log.query, self.filename,
+                          'commands', target='M31')
+        self.assertRaises(ValueError, observing_log.query, self.filename,
+                          'stars')
+
+    def test_indexes(self):
+        observing_log.ObservingLog(self.filename).close()
+        connection = sqlite3.connect(self.filename)
+        plan = connection.execute(
+            'EXPLAIN QUERY PLAN SELECT * FROM gotos WHERE target = ? AND '
+            'time >= ?', ('M31', 0.0)).fetchall()
+        connection.close()
+        self.assertIn('gotos_target', str(plan))
+
+    def test_goto_finished_by_later_session(self):
+        now = time.time()
+        with observing_log.ObservingLog(self.filename, 'a') as log:
+            log.log_goto('azalt', 10.0, 20.0, unix_time=now - 30.0)
+        with observing_log.ObservingLog(self.filename, 'b') as log:
+            log.goto_finished(now)
+        with observing_log.ObservingLog(self.filename, 'a') as log:
+            log.goto_finished(now)
+            log.goto_finished(now + 10.0)
+        rows = observing_log.query(self.filename, 'gotos')
+        self.assertAlmostEqual(rows[0]['duration'], 30.0)
+        self.assertEqual(observing_log.goto_statistics(self.filename),
+                         [(None, 1, 30.0, 30.0)])
+
+    def test_write_error(self):
+        log = observing_log.ObservingLog(self.filename)
+        with mock.patch.object(log, '_write',
+                               side_effect=sqlite3.OperationalError('full')):
+            log.log_sync(1.0, 2.0)
+            # the writer survives and flush does not hang
+            self.assertTrue(log.flush(timeout=5.0))
+        self.assertEqual(log.write_errors, 1)
+        self.assertIsInstance(log.last_write_error, sqlite3.OperationalError)
+        log.log_sync(3.0, 4.0)
+        log.close()
+        rows = observing_log.query(self.filename, 'syncs')
+        self.assertEqual([r['ra'] for r in rows], [3.0])
+
+    def test_closed(self):
+        log = observing_log.ObservingLog(self.filename)
+        log.close()
+        self.assertRaises(RuntimeError, log.log_sync, 1.0, 2.0)
+
+
+class TestLoggingTelescope(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.filename = os.path.join(self.tmpdir, 'log.db')
+        self.serial = mock.Mock()
+        telescope_class = observing_log.logging_class(NexStarSLT130)
+        self.assertIs(telescope_class,
+                      observing_log.logging_class(NexStarSLT130))
+        self.telescope = telescope_class('/dev/null',
+                                         serial_port=self.serial)
+        self.telescope.observing_log = observing_log.ObservingLog(
+            self.filename, '/dev/null')
+
+    def test_logging(self):
+        self.serial.read.side_effect = [b'20000000,40000000#', b'#',
+                                        b'\x00#', b'#', b'']
+        self.assertEqual(self.telescope.get_az_alt(), (45.0, 90.0))
+        self.telescope.observing_target = 'Vega'
+        self.telescope.goto_ra_dec(279.23, 38.78)
+        self.assertFalse(self.telescope.goto_in_progress())
+        self.telescope.sync(279.23, 38.78)
+        self.assertRaises(IndexError, self.telescope.cancel_goto)
+        self.telescope.observing_log.close()
+
+        commands = observing_log.query(self.filename, 'commands')
+        self.assertEqual([c['command'][0] for c in commands],
+                         ['z', 'r', 'L', 's', 'M'])
+        self.assertEqual(commands[0]['response'], b'20000000,40000000#')
+        self.assertIsNone(commands[-1]['response'])
+        self.assertIn('IndexError', commands[-1]['error'])
+        positions = observing_log.query(self.filename, 'positions')
+        self.assertEqual([(p['system'], p['a'], p['b']) for p in positions],
+                         [('azalt', 45.0, 90.0)])
+        gotos = observing_log.query(self.filename, 'gotos', target='Vega')
+        self.assertEqual(len(gotos), 1)
+        self.assertIsNotNone(gotos[0]['duration'])
+        syncs = observing_log.query(self.filename, 'syncs', target='Vega')
+        self.assertAlmostEqual(syncs[0]['dec'], 38.78)
+
+    def test_no_log(self):
+        self.telescope.observing_log.close()
+        self.telescope.observing_log = None
+        self.serial.read.return_value = b'#'
+        self.telescope.cancel_goto()
+        self.assertEqual(len(observing_log.query(self.filename,
+                                                 'commands')), 0)
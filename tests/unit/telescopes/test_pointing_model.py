@@ -0,0 +1,202 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+import mock
+import numpy as np
+from astropy import units as u
+from astropy.coordinates import AltAz
+from astropy.coordinates import EarthLocation
+from astropy.coordinates import SkyCoord
+from astropy.time import Time
+
+from astroscope.telescopes import pointing_model
+from astroscope.telescopes.pointing_model import PointingModel
+
+COEFFICIENTS = dict(IA=0.3, IE=-0.2, CA=0.05, NPAE=-0.03, AN=0.02,
+                    AW=-0.04)
+
+
+def _observations(count=12, seed=0):
+    random = np.random.RandomState(seed)
+    az = random.uniform(0.0, 360.0, count)
+    alt = random.uniform(15.0, 80.0, count)
+    mount_az, mount_alt = PointingModel(COEFFICIENTS).correct(az, alt)
+    return list(zip(az, alt, mount_az, mount_alt))
+
+
+class TestConversions(TestCase):
+
+    def setUp(self):
+        self.lat, self.lon = 38.0, -121.0
+        self.now = time.time()
+
+    def test_radec_to_azalt(self):
+        ra, dec = np.array([10.0, 150.0, 300.0]), np.array([20.0, 60.0, -5.0])
+        az, alt = pointing_model.radec_to_azalt(ra, dec, self.lat, self.lon,
+                                                self.now, apparent=True)
+        frame = AltAz(obstime=Time(self.now, format='unix'),
+                      location=EarthLocation(lat=self.lat * u.deg,
+                                             lon=self.lon * u.deg),
+                      pressure=1010 * u.hPa, temperature=10 * u.deg_C,
+                      relative_humidity=0.0, obswl=0.55 * u.micron)
+        expected = SkyCoord(ra=ra * u.deg, dec=dec * u.deg).transform_to(frame)
+        visible = expected.alt.deg > 10.0
+        separation = expected[visible].separation(SkyCoord(
+            az=az[visible] * u.deg, alt=alt[visible] * u.deg, frame=frame))
+        self.assertTrue(np.all(separation.deg < 0.02))
+
+    def test_azalt_to_radec_inverts_radec_to_azalt(self):
+        az, alt = pointing_model.radec_to_azalt(120.0, 35.0, self.lat,
+                                                self.lon, self.now)
+        ra, dec = pointing_model.azalt_to_radec(az, alt, self.lat, self.lon,
+                                                self.now)
+        self.assertAlmostEqual(float(ra), 120.0)
+        self.assertAlmostEqual(float(dec), 35.0)
+
+
+class TestPointingModel(TestCase):
+
+    def test_fit(self):
+        model = PointingModel(observations=_observations())
+        rms = model.fit()
+        self.assertLess(rms, 1e-9)
+        for term, value in COEFFICIENTS.items():
+            self.assertAlmostEqual(model.coefficients[term], value)
+
+    def test_fit_few_observations(self):
+        model = PointingModel(observations=_observations(3))
+        model.fit()
+        self.assertEqual(model.coefficients['CA'], 0.0)
+        self.assertEqual(model.coefficients['AN'], 0.0)
+        self.assertNotEqual(model.coefficients['IA'], 0.0)
+        # 3 stars would fit all the terms exactly, whatever the mount does
+        self.assertGreater(model.rms, 0.0)
+        model = PointingModel(observations=_observations(6))
+        model.fit()
+        self.assertEqual(model.coefficients['CA'], 0.0)
+        self.assertEqual(model.coefficients['NPAE'], 0.0)
+        self.assertNotEqual(model.coefficients['AN'], 0.0)
+        model = PointingModel(observations=_observations(7))
+        model.fit()
+        self.assertAlmostEqual(model.coefficients['CA'],
+                               COEFFICIENTS['CA'])
+
+    def test_fit_without_observations(self):
+        self.assertRaises(ValueError, PointingModel().fit)
+
+    def test_uncorrect(self):
+        model = PointingModel(COEFFICIENTS)
+        mount_az, mount_alt = model.correct([359.9, 100.0], [30.0, 70.0])
+        az, alt = model.uncorrect(mount_az, mount_alt)
+        np.testing.assert_allclose(az, [359.9, 100.0], atol=1e-6)
+        np.testing.assert_allclose(alt, [30.0, 70.0], atol=1e-6)
+
+    def test_save_load(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = os.path.join(directory, 'model.json')
+        self.assertEqual(PointingModel.load(filename).observations, [])
+        model = PointingModel(observations=_observations())
+        model.fit()
+        model.save(filename)
+        loaded = PointingModel.load(filename)
+        self.assertEqual(loaded.coefficients, model.coefficients)
+        self.assertEqual(len(loaded.observations), 12)
+        self.assertEqual(loaded.rms, model.rms)
+
+
+class Telescope(object):
+
+    def __init__(self):
+        self.goto_az_alt = mock.Mock()
+        self.goto_ra_dec = mock.Mock()
+        self.get_ra_dec = mock.Mock(return_value=(150.0, 30.0))
+        self.sync = mock.Mock()
+        self.get_az_alt = mock.Mock(return_value=(100.0, 40.0))
+        self.get_location_lat_long = mock.Mock(return_value=(38.0, -121.0))
+
+
+class Mount(object):
+    """Stand in for the telescope the mixin is mixed with"""
+
+    def __init__(self):
+        self.mock = Telescope()
+
+    def get_az_alt(self):
+        return self.mock.get_az_alt()
+
+    def goto_az_alt(self, az, alt):
+        return self.mock.goto_az_alt(az, alt)
+
+    def goto_ra_dec(self, ra, dec):
+        return self.mock.goto_ra_dec(ra, dec)
+
+    def get_ra_dec(self):
+        return self.mock.get_ra_dec()
+
+    def sync(self, ra, dec):
+        return self.mock.sync(ra, dec)
+
+    def get_location_lat_long(self):
+        return self.mock.get_location_lat_long()
+
+
+class PointingMount(pointing_model.PointingCorrectedTelescope, Mount):
+    pass
+
+
+class TestPointingCorrectedTelescope(TestCase):
+
+    def setUp(self):
+        self.telescope = PointingMount()
+        self.telescope.pointing_model = PointingModel(COEFFICIENTS)
+
+    def test_goto_az_alt(self):
+        self.telescope.goto_az_alt(100.0, 40.0)
+        az, alt = self.telescope.mock.goto_az_alt.call_args[0]
+        expected = PointingModel(COEFFICIENTS).correct(100.0, 40.0)
+        self.assertAlmostEqual(az, float(expected[0]))
+        self.assertAlmostEqual(alt, float(expected[1]))
+
+    def test_get_az_alt(self):
+        self.telescope.mock.get_az_alt.return_value = tuple(
+            float(x) for x in PointingModel(COEFFICIENTS).correct(100.0, 40.0))
+        az, alt = self.telescope.get_az_alt()
+        self.assertAlmostEqual(az, 100.0)
+        self.assertAlmostEqual(alt, 40.0)
+
+    def test_goto_ra_dec(self):
+        self.telescope.goto_ra_dec(150.0, 30.0)
+        ra, dec = self.telescope.mock.goto_ra_dec.call_args[0]
+        self.assertNotAlmostEqual(ra, 150.0)
+        self.assertLess(abs(ra - 150.0) + abs(dec - 30.0), 2.0)
+        self.telescope.pointing_model = None
+        self.telescope.goto_ra_dec(150.0, 30.0)
+        self.telescope.mock.goto_ra_dec.assert_called_with(150.0, 30.0)
+
+    def test_get_ra_dec(self):
+        # the mount reports the position the model sent it to
+        self.telescope.goto_ra_dec(150.0, 30.0)
+        self.telescope.mock.get_ra_dec.return_value = \
+            self.telescope.mock.goto_ra_dec.call_args[0]
+        ra, dec = self.telescope.get_ra_dec()
+        self.assertAlmostEqual(ra, 150.0, places=3)
+        self.assertAlmostEqual(dec, 30.0, places=3)
+        self.telescope.pointing_model = None
+        self.assertEqual(self.telescope.get_ra_dec(),
+                         self.telescope.mock.get_ra_dec.return_value)
+
+    def test_sync(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = os.path.join(directory, 'model.json')
+        self.telescope.pointing_model = None
+        self.telescope.pointing_model_filename = filename
+        self.telescope.sync(150.0, 30.0)
+        self.assertFalse(self.telescope.mock.sync.called)
+        self.assertEqual(len(self.telescope.pointing_model.observations), 1)
+        self.assertEqual(len(PointingModel.load(filename).observations), 1)
+        self.telescope.mock.get_location_lat_long.assert_called_once_with()
@@ -0,0 +1,93 @@
+import time
+from unittest import TestCase
+
+import mock
+import numpy as np
+from astropy import units as u
+from astropy.coordinates import EarthLocation
+from astropy.coordinates import SkyCoord
+from astropy.time import Time
+
+from astroscope.telescopes.astropy_telescope import AstropyTelescope
+from astroscope.telescopes.base_telescope import BaseTelescope
+from astroscope.telescopes.positions import HorizontalPosition
+from astroscope.telescopes.positions import HorizontalPositions
+
+LOCATION = EarthLocation(lat=38.0 * u.deg, lon=-121.0 * u.deg)
+
+
+class Telescope(AstropyTelescope, BaseTelescope):
+
+    def __init__(self):
+        super(Telescope, self).__init__('/dev/null')
+        self.get_az_alt = mock.Mock(return_value=(120.0, 45.0))
+        self.get_location_lat_long = mock.Mock(return_value=(38.0, -121.0))
+
+
+class TestHorizontalPosition(TestCase):
+
+    def setUp(self):
+        self.now = time.time()
+        self.location = mock.Mock(return_value=LOCATION)
+        self.position = HorizontalPosition(120.0, 45.0, self.now,
+                                           self.location)
+
+    def _expected(self):
+        return SkyCoord(az=120.0 * u.deg, alt=45.0 * u.deg, frame='altaz',
+                        obstime=Time(self.now, format='unix'),
+                        location=LOCATION)
+
+    def test_degrees_are_lazy(self):
+        self.assertEqual(self.position.az.deg, 120.0)
+        self.assertEqual(self.position.alt.degree, 45.0)
+        self.assertAlmostEqual(self.position.alt.radian, np.pi / 4)
+        self.assertFalse(self.location.called)
+        self.assertIsNone(self.position._skycoord)
+        self.assertFalse(hasattr(self.position, '__dict__'))
+
+    def test_astropy_attributes(self):
+        self.assertEqual(self.position.az.to_string(unit=u.deg, sep=':'),
+                         '120:00:00')
+        self.assertEqual(self.position.frame.name, 'altaz')
+        self.assertEqual(self.location.call_count, 1)
+        self.assertIn('AltAz', str(self.position))
+        self.assertEqual(self.location.call_count, 1)
+
+    def test_transform_to(self):
+        expected = self._expected().transform_to('icrs')
+        radec = self.position.transform_to('icrs')
+        self.assertAlmostEqual(radec.ra.deg, expected.ra.deg, places=6)
+        self.assertAlmostEqual(radec.dec.deg, expected.dec.deg, places=6)
+        ra, dec = self.position.radec()
+        self.assertAlmostEqual(ra, expected.ra.deg, places=6)
+        self.assertAlmostEqual(dec, expected.dec.deg, places=6)
+
+    def test_batch(self):
+        positions = HorizontalPositions.from_positions(
+            [HorizontalPosition(120.0 + i, 45.0, self.now + i, LOCATION)
+             for i in range(5)])
+        self.assertEqual(len(positions), 5)
+        np.testing.assert_allclose(positions.az.deg, 120.0 + np.arange(5))
+        ra, dec = positions.radec()
+        self.assertEqual(ra.shape, (5, ))
+        self.assertAlmostEqual(positions[0].radec()[0], ra[0], places=6)
+        radec = positions.transform_to('icrs')
+        np.testing.assert_allclose(radec.ra.deg, ra, atol=1e-6)
+        self.assertEqual(positions[2].unix_time, self.now + 2)
+
+
+class TestAstropyTelescope(TestCase):
+
+    def test_get_azalt(self):
+        telescope = Telescope()
+        _altaz = telescope.get_azalt()
+        self.assertEqual((_altaz.az.deg, _altaz.alt.deg), (120.0, 45.0))
+        # the location is queried right away, only the EarthLocation is
+        # built when astropy needs it
+        telescope.get_location_lat_long.assert_called_once_with()
+        self.assertIsNone(_altaz._skycoord)
+        self.assertAlmostEqual(_altaz.location.lat.deg, 38.0)
+        self.assertEqual(telescope.get_location_lat_long.call_count, 1)
+        self.assertAlmostEqual(_altaz.obstime.unix, time.time(), delta=60)
+        self.assertAlmostEqual(_altaz.transform_to('icrs').dec.deg,
+                               _altaz.radec()[1], places=6)
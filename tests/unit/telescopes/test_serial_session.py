@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+import mock
+
+from astroscope.telescopes import serial_session
+from astroscope.telescopes.nextstar_telescopes import NexStarSLT130
+
+
+class TestSerialSession(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'session.bin')
+        self.serial = mock.Mock()
+        self.serial.read.side_effect = [b'12AB0000,40000000#', b'#']
+        self.telescope = NexStarSLT130('/dev/null', serial_port=self.serial)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _record(self):
+        recorder = serial_session.record_session(self.telescope,
+                                                 self.filename)
+        self.telescope.get_az_alt()
+        self.telescope.cancel_goto()
+        recorder.close()
+
+    def test_record_session(self):
+        self._record()
+        start_time, events = serial_session.load_session(self.filename)
+        self.assertAlmostEqual(start_time, time.time(), delta=60)
+        self.assertEqual([(e[1], e[2]) for e in events],
+                         [(serial_session.DIRECTION_WRITE, b'z'),
+                          (serial_session.DIRECTION_READ,
+                           b'12AB0000,40000000#'),
+                          (serial_session.DIRECTION_WRITE, b'M'),
+                          (serial_session.DIRECTION_READ, b'#')])
+        timestamps = [e[0] for e in events]
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_replay_session(self):
+        self._record()
+        replay = serial_session.ReplaySerial(self.filename, speed=None)
+        telescope = NexStarSLT130('/dev/null', serial_port=replay)
+        az, alt = telescope.get_az_alt()
+        self.assertAlmostEqual(alt, 90.0)
+        telescope.cancel_goto()
+        self.assertEqual(replay.remaining(), 0)
+
+    def test_replay_split_reads(self):
+        self._record()
+        replay = serial_session.ReplaySerial(self.filename, speed=None)
+        replay.write(b'z')
+        self.assertEqual(replay.read(8), b'12AB0000')
+        self.assertEqual(replay.read(10), b',40000000#')
+
+    def test_replay_mismatch(self):
+        self._record()
+        replay = serial_session.ReplaySerial(self.filename, speed=None)
+        self.assertRaises(serial_session.SessionMismatchError,
+                          replay.write, b'e')
+
+    def test_replay_speed(self):
+        recorder = serial_session.record_session(self.telescope,
+                                                 self.filename)
+        self.serial.read.side_effect = lambda n: time.sleep(0.05) or b'#'
+        self.telescope.cancel_goto()
+        recorder.close()
+        replay = serial_session.ReplaySerial(self.filename, speed=1.0)
+        start = time.perf_counter()
+        replay.write(b'M')
+        replay.read(1)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.04)
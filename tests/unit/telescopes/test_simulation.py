@@ -0,0 +1,144 @@
+import time
+from unittest import TestCase
+
+from astroscope.telescopes import simulation
+from astroscope.telescopes.pointing_model import radec_to_azalt
+
+
+class TestVirtualClock(TestCase):
+
+    def test_manual(self):
+        clock = simulation.VirtualClock(start=1000.0)
+        self.assertEqual(clock.time(), 1000.0)
+        clock.sleep(3600)
+        clock.advance(1.5)
+        self.assertEqual(clock.time(), 4601.5)
+
+    def test_speed(self):
+        clock = simulation.VirtualClock(speed=1000.0)
+        start = clock.time()
+        real_start = time.monotonic()
+        clock.sleep(20.0)
+        self.assertLess(time.monotonic() - real_start, 1.0)
+        self.assertGreaterEqual(clock.time() - start, 20.0)
+
+
+class TestFakeTelescope(TestCase):
+
+    def test_history_is_per_instance_and_bounded(self):
+        first = simulation.FakeTelescope(history_size=3)
+        second = simulation.FakeTelescope()
+        for i in range(5):
+            first.send_command(str(i))
+        self.assertEqual(list(first._received_commands), ['2', '3', '4'])
+        self.assertEqual(len(second._received_commands), 0)
+
+
+class TestSimulatedMount(TestCase):
+
+    def setUp(self):
+        self.clock = simulation.VirtualClock(start=1.7e9)
+        self.mount = simulation.SimulatedMount(
+            clock=self.clock, lat=38.0, lon=-121.0, max_rate=4.0,
+            acceleration=2.0)
+
+    def _wait(self, interval=0.5):
+        elapsed = 0.0
+        while self.mount.goto_in_progress():
+            self.clock.sleep(interval)
+            elapsed += interval
+        return elapsed
+
+    def test_goto_az_alt_takes_time(self):
+        self.mount.goto_az_alt(90.0, 45.0)
+        self.clock.advance(10.0)
+        az, alt = self.mount.get_az_alt()
+        self.assertTrue(0.0 < az < 90.0)
+        self.assertTrue(self.mount.goto_in_progress())
+        # 90 degrees at 4 degrees/s, plus 2 s lost accelerating
+        self.assertAlmostEqual(self._wait(0.1) + 10.0, 24.5, delta=0.11)
+        az, alt = self.mount.get_az_alt()
+        self.assertAlmostEqual(az, 90.0)
+        self.assertAlmostEqual(alt, 45.0)
+
+    def test_goto_az_alt_takes_shortest_way(self):
+        self.mount.goto_az_alt(350.0, 0.0)
+        self.clock.advance(3.0)
+        self.assertGreater(self.mount.get_az_alt()[0], 340.0)
+
+    def test_short_goto_does_not_reach_max_rate(self):
+        self.mount.goto_az_alt(0.0, 2.0)
+        # triangular profile: 2 * sqrt(d / a)
+        self.assertAlmostEqual(self._wait(0.01), 2.0, delta=0.011)
+
+    def test_tracking_a_night_is_fast(self):
+        start = time.perf_counter()
+        self.mount.goto_ra_dec(100.0, 20.0)
+        self._wait()
+        self.clock.advance(8 * 3600)
+        ra, dec = self.mount.get_ra_dec()
+        self.assertAlmostEqual(ra, 100.0)
+        self.assertAlmostEqual(dec, 20.0)
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+    def test_tracking_drift(self):
+        self.mount.drift = (0.0, 3.6)
+        self.mount.goto_ra_dec(100.0, 20.0)
+        self._wait()
+        self.clock.advance(1000.0)
+        az, alt = self.mount.get_az_alt()
+        expected = radec_to_azalt(100.0, 20.0, 38.0, -121.0,
+                                  self.clock.time())
+        self.assertAlmostEqual(alt - float(expected[1]), 1.0)
+
+    def test_tracking_off(self):
+        self.mount.goto_ra_dec(100.0, 20.0)
+        self._wait()
+        self.mount.set_tracking_mode(0)
+        position = self.mount.get_az_alt()
+        self.clock.advance(600.0)
+        self.assertEqual(self.mount.get_az_alt(), position)
+        self.assertNotAlmostEqual(self.mount.get_ra_dec()[0], 100.0)
+
+    def test_slew_var_guides_while_tracking(self):
+        self.mount.goto_ra_dec(100.0, 20.0)
+        self._wait()
+        self.mount.slew_var(0, 36.0)
+        self.clock.advance(10.0)
+        self.mount.slew_var(0, 0)
+        self.clock.advance(10.0)
+        expected = radec_to_azalt(100.0, 20.0, 38.0, -121.0,
+                                  self.clock.time())
+        self.assertAlmostEqual(self.mount.get_az_alt()[1] - float(expected[1]),
+                               0.1)
+
+    def test_slew_fixed(self):
+        self.mount.set_tracking_mode(0)
+        self.mount.slew_fixed(9, 0)
+        self.clock.advance(10.0)
+        self.mount.cancel_goto()
+        self.clock.advance(10.0)
+        # 4 degrees/s for 10 s, less 4 degrees accelerating, plus 4
+        # degrees decelerating
+        self.assertAlmostEqual(self.mount.get_az_alt()[0], 40.0)
+
+    def test_sync(self):
+        self.mount.goto_ra_dec(100.0, 20.0)
+        self._wait()
+        self.mount.sync(100.5, 20.5)
+        ra, dec = self.mount.get_ra_dec()
+        self.assertAlmostEqual(ra, 100.5)
+        self.assertAlmostEqual(dec, 20.5)
+        self.mount.goto_ra_dec(100.0, 20.0)
+        self._wait()
+        ra, dec = self.mount.get_ra_dec()
+        self.assertAlmostEqual(ra, 100.0)
+        self.assertAlmostEqual(dec, 20.0)
+
+    def test_history(self):
+        mount = simulation.SimulatedMount(clock=self.clock, history_size=2)
+        mount.goto_az_alt(10.0, 10.0)
+        mount.get_az_alt()
+        mount.get_az_alt()
+        self.assertEqual([c[1] for c in mount._received_commands],
+                         ['get_az_alt', 'get_az_alt'])
@@ -0,0 +1,95 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+
+import mock
+
+from astroscope import tracing
+from astroscope.telescopes.nextstar_telescopes import NexStarSLT130
+
+
+class TestTracing(TestCase):
+
+    def setUp(self):
+        self.addCleanup(tracing.disable)
+
+    def test_disabled(self):
+        self.assertIsNone(tracing.tracer())
+        with tracing.span('nothing') as span:
+            span.set(x=1)
+        self.assertIs(span, tracing._NULL_SPAN)
+        tracing.instant('nothing')
+
+    def test_spans(self):
+        tracer = tracing.enable()
+        with tracing.span('outer', 'test', target='M31'):
+            with tracing.span('inner', 'test') as inner:
+                inner.set(bytes=10)
+
+        def other():
+            with tracing.span('other'):
+                pass
+        thread = threading.Thread(target=other, name='worker')
+        thread.start()
+        thread.join()
+        self.assertRaises(ValueError, self._fail)
+        events = dict((e['name'], e) for e in tracer.events()
+                      if e['ph'] == 'X')
+        outer, inner = events['outer'], events['inner']
+        self.assertEqual(outer['args'], dict(target='M31'))
+        self.assertEqual(inner['args'], dict(bytes=10))
+        self.assertLessEqual(outer['ts'], inner['ts'])
+        self.assertGreaterEqual(outer['ts'] + outer['dur'],
+                                inner['ts'] + inner['dur'])
+        self.assertNotEqual(events['other']['tid'], outer['tid'])
+        self.assertEqual(events['failing']['args'], dict(error='ValueError'))
+        names = [e['args']['name'] for e in tracer.events()
+                 if e['ph'] == 'M']
+        self.assertIn('worker', names)
+        self.assertEqual(tracer.summary()['inner']['count'], 1)
+
+    @staticmethod
+    def _fail():
+        with tracing.span('failing'):
+            raise ValueError('boom')
+
+    def test_traced(self):
+        @tracing.traced(category='test')
+        def add(a, b):
+            return a + b
+        self.assertEqual(add(1, 2), 3)
+        tracer = tracing.enable()
+        self.assertEqual(add(2, 2), 4)
+        tracing.disable()
+        self.assertEqual(add(3, 2), 5)
+        self.assertEqual(
+            [e['name'] for e in tracer.events() if e['ph'] == 'X'],
+            ['TestTracing.test_traced.<locals>.add'])
+
+    def test_save(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = os.path.join(directory, 'trace.json')
+        tracer = tracing.enable()
+        serial = mock.Mock()
+        serial.read.return_value = b'12AB0000,40000000#'
+        NexStarSLT130('/dev/null', serial_port=serial).get_az_alt()
+        tracer.save(filename)
+        with open(filename) as f:
+            trace = json.load(f)
+        self.assertEqual(trace['displayTimeUnit'], 'ms')
+        names = [e['name'] for e in trace['traceEvents'] if e['ph'] == 'X']
+        self.assertEqual(names, ['serial write', 'serial read', 'command z'])
+
+    def test_disabled_command_span(self):
+        # the span name is not built from the command while disabled
+        telescope = NexStarSLT130('/dev/null', serial_port=mock.Mock())
+        telescope.send_command = mock.Mock()
+        telescope.read_response = mock.Mock(return_value=b'#')
+        command = mock.Mock(spec=[])
+        self.assertEqual(
+            telescope._send_command_and_validate_response(command), b'#')
+        telescope.send_command.assert_called_once_with(command)